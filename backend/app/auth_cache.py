@@ -0,0 +1,137 @@
+"""
+auth_cache.py — short-lived cache of verified token -> user principal.
+
+get_current_user used to SELECT the user on every authenticated request.
+After the JWT signature check, the principal (the handful of user columns
+handlers read) is now looked up here first. Entries are keyed by a hash of
+the token, expire after AUTH_CACHE_TTL seconds, and are tagged with the
+user's "auth" version, which profile updates, password changes and account
+deletion bump — so those take effect on the very next request.
+
+With Redis reachable, entries are shared by all workers and a lookup is a
+single MGET of (entry, version); otherwise a size-bounded in-process LRU
+is used.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+import os
+
+from app.cache import get_redis, version_stamp, bump_version, _drop_redis, _key
+from app.models import User, RiskProfile, KYCStatus
+
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+ENTRY_PREFIX = "wealvix:auth"
+
+_local: "OrderedDict[str, Tuple[float, tuple, CurrentUser]]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Read-only view of the authenticated user, safe to cache across requests"""
+    id: int
+    name: str
+    email: str
+    risk_profile: Optional[RiskProfile]
+    kyc_status: Optional[KYCStatus]
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            risk_profile=RiskProfile(user.risk_profile) if user.risk_profile else None,
+            kyc_status=KYCStatus(user.kyc_status) if user.kyc_status else None,
+            created_at=user.created_at,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id,
+            "name": self.name,
+            "email": self.email,
+            "risk_profile": self.risk_profile.value if self.risk_profile else None,
+            "kyc_status": self.kyc_status.value if self.kyc_status else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "CurrentUser":
+        data = json.loads(raw)
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            email=data["email"],
+            risk_profile=RiskProfile(data["risk_profile"]) if data["risk_profile"] else None,
+            kyc_status=KYCStatus(data["kyc_status"]) if data["kyc_status"] else None,
+            created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+        )
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def lookup(token: str, user_id: int) -> Tuple[Optional[CurrentUser], object]:
+    """
+    (cached principal or None, current auth version). On a miss, pass the
+    returned version to store() so a concurrent invalidation is not lost.
+    """
+    token_key = _token_key(token)
+    client = get_redis()
+    if client is not None:
+        try:
+            raw_entry, raw_version = client.mget([f"{ENTRY_PREFIX}:{token_key}", _key("auth", user_id)])
+            version = int(raw_version) if raw_version is not None else 0
+            if raw_entry is not None:
+                entry = json.loads(raw_entry)
+                if entry["v"] == version:
+                    return CurrentUser.from_json(entry["p"]), ("redis", version)
+            return None, ("redis", version)
+        except Exception:
+            _drop_redis()
+
+    version = version_stamp(user_id, "auth")
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(token_key)
+        if entry and entry[0] > now and entry[1] == version:
+            _local.move_to_end(token_key)
+            return entry[2], ("local", version)
+        if entry:
+            _local.pop(token_key, None)
+    return None, ("local", version)
+
+
+def store(token: str, principal: CurrentUser, version) -> None:
+    source, value = version
+    token_key = _token_key(token)
+    if source == "redis":
+        client = get_redis()
+        if client is not None:
+            try:
+                payload = json.dumps({"v": value, "p": principal.to_json()})
+                client.set(f"{ENTRY_PREFIX}:{token_key}", payload, ex=AUTH_CACHE_TTL)
+            except Exception:
+                _drop_redis()
+        return
+
+    with _local_lock:
+        _local[token_key] = (time.monotonic() + AUTH_CACHE_TTL, value, principal)
+        _local.move_to_end(token_key)
+        while len(_local) > AUTH_CACHE_SIZE:
+            _local.popitem(last=False)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop every cached principal of the user (all tokens, all workers)"""
+    bump_version("auth", user_id)
@@ -0,0 +1,154 @@
+"""
+cache.py — per-user data version stamps and small in-process result caches.
+
+Write paths bump a (namespace, user_id) version after committing; readers
+tag cached results with the version they were computed at, so a result is
+only served while nothing it depends on has been written since. Versions
+live in Redis when REDIS_URL is reachable (a bump from a Celery worker is
+then visible to every web worker) and fall back to a process-local dict.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+KEY_PREFIX = "wealvix:v"
+REDIS_RETRY_SECONDS = 30
+
+_redis = None
+_redis_next_attempt = 0.0
+_redis_lock = threading.Lock()
+# Incremented whenever the version source switches between Redis and the
+# local dict, so stamps taken from one can never match stamps from the other.
+_source_epoch = 0
+# Process-local versions restart at 0 on every boot; this nonce keeps a stamp
+# handed out before a restart (e.g. an ETag) from matching one taken after it.
+_BOOT_ID = uuid.uuid4().hex
+
+_local_versions: Dict[Tuple[str, int], int] = {}
+_local_lock = threading.Lock()
+
+
+def get_redis():
+    """Shared Redis client, or None if unconfigured/unreachable (retried every 30s)."""
+    global _redis, _redis_next_attempt, _source_epoch
+    if not REDIS_URL:
+        return None
+    if _redis is not None:
+        return _redis
+    now = time.monotonic()
+    if now < _redis_next_attempt:
+        return None
+    with _redis_lock:
+        if _redis is not None:
+            return _redis
+        try:
+            import redis
+            client = redis.Redis.from_url(
+                REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+            client.ping()
+            _redis = client
+            _source_epoch += 1
+        except Exception as e:
+            logger.warning(f"Redis unavailable, using in-process versions: {e}")
+            _redis_next_attempt = now + REDIS_RETRY_SECONDS
+    return _redis
+
+
+def _drop_redis():
+    global _redis, _redis_next_attempt, _source_epoch
+    _redis = None
+    _source_epoch += 1
+    _redis_next_attempt = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def _key(namespace: str, user_id: int) -> str:
+    return f"{KEY_PREFIX}:{namespace}:{user_id}"
+
+
+def _read_versions(user_id: int, namespaces: Tuple[str, ...]) -> Tuple[bool, Tuple[int, ...]]:
+    """(read from Redis?, versions) for a user's namespaces, in one round trip."""
+    client = get_redis()
+    if client is not None:
+        try:
+            values = client.mget([_key(ns, user_id) for ns in namespaces])
+            return True, tuple(int(v) if v is not None else 0 for v in values)
+        except Exception as e:
+            logger.warning(f"Redis version read failed: {e}")
+            _drop_redis()
+    with _local_lock:
+        return False, tuple(_local_versions.get((ns, user_id), 0) for ns in namespaces)
+
+
+def get_versions(user_id: int, *namespaces: str) -> Tuple[int, ...]:
+    """Current version of each namespace for a user, in one round trip."""
+    return _read_versions(user_id, namespaces)[1]
+
+
+def get_version(namespace: str, user_id: int) -> int:
+    return get_versions(user_id, namespace)[0]
+
+
+def version_stamp(user_id: int, *namespaces: str) -> Tuple[Any, ...]:
+    """Opaque, comparable stamp covering several namespaces (for caches and ETags)."""
+    shared, versions = _read_versions(user_id, namespaces)
+    if shared:
+        return (_source_epoch, *versions)
+    return (_BOOT_ID, _source_epoch, *versions)
+
+
+def bump_version(namespace: str, *user_ids: int) -> None:
+    """Invalidate everything cached against `namespace` for the given users."""
+    user_ids = [uid for uid in set(user_ids) if uid is not None]
+    if not user_ids:
+        return
+    # Always bump locally as well, so this process never serves stale data
+    # even if Redis drops out between the bump and the next read.
+    with _local_lock:
+        for uid in user_ids:
+            _local_versions[(namespace, uid)] = _local_versions.get((namespace, uid), 0) + 1
+    client = get_redis()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for uid in user_ids:
+                pipe.incr(_key(namespace, uid))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis version bump failed: {e}")
+            _drop_redis()
+
+
+class VersionedCache:
+    """Size-bounded LRU of key -> (version, value), thread-safe."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
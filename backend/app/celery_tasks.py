@@ -1,7 +1,9 @@
 from celery import Celery
 from celery.schedules import crontab
+import json
 import logging
 import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -26,12 +28,42 @@ celery_app.conf.update(
 )
 
 
+# Intraday refresh cadence in minutes (only fires inside trading hours)
+INTRADAY_REFRESH_MINUTES = int(os.getenv("INTRADAY_REFRESH_MINUTES", "5"))
+# A run holds this lock so a slow one is never overlapped; it expires if the worker dies
+INTRADAY_REFRESH_LOCK = "wealvix:lock:intraday-refresh"
+INTRADAY_REFRESH_LOCK_SECONDS = int(os.getenv("INTRADAY_REFRESH_LOCK_SECONDS", "1800"))
+# Delete a lock only if it still holds our token (it may have expired and been retaken)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+# The monthly statement batch is killed after this long; the next run resumes it
+STATEMENT_BATCH_TIMEOUT = int(os.getenv("STATEMENT_BATCH_TIMEOUT", "14400"))
+
 # Schedule tasks
 celery_app.conf.beat_schedule = {
     "update-market-prices-daily": {
         "task": "app.celery_tasks.update_all_investment_prices",
         "schedule": crontab(hour=0, minute=0),  # Daily at midnight
     },
+    "generate-monthly-statements": {
+        "task": "app.celery_tasks.generate_monthly_statements",
+        "schedule": crontab(day_of_month=1, hour=2, minute=0),  # 1st of month, 02:00
+    },
+    "reconcile-user-summaries": {
+        "task": "app.celery_tasks.reconcile_user_summaries",
+        "schedule": crontab(hour=1, minute=30),  # Daily at 01:30
+    },
+    "refresh-held-prices-intraday": {
+        "task": "app.celery_tasks.refresh_intraday_prices",
+        # Covers 09:00–15:59 IST on weekdays; the task itself trims to 09:15–15:30
+        "schedule": crontab(
+            minute=f"*/{INTRADAY_REFRESH_MINUTES}", hour="9-15", day_of_week="mon-fri"
+        ),
+    },
 }
 
 
@@ -46,6 +78,7 @@ def update_all_investment_prices():
         try:
             updated_count = MarketDataService.update_investment_prices(db)
             logger.info(f"Updated {updated_count} investments")
+            materialize_portfolio_snapshots.delay()
             return {"status": "success", "updated": updated_count}
         finally:
             db.close()
@@ -55,6 +88,38 @@ def update_all_investment_prices():
         return {"status": "error", "message": str(e)}
 
 
+@celery_app.task(name="app.celery_tasks.refresh_intraday_prices")
+def refresh_intraday_prices():
+    """Task to refresh prices of held symbols during NSE/BSE trading hours"""
+    try:
+        from app.database import SessionLocal
+        from app.market_service import MarketDataService, is_market_open
+
+        if not is_market_open():
+            return {"status": "skipped", "reason": "market closed"}
+
+        client = celery_app.backend.client
+        token = uuid.uuid4().hex
+        if not client.set(INTRADAY_REFRESH_LOCK, token, nx=True, ex=INTRADAY_REFRESH_LOCK_SECONDS):
+            logger.info("Intraday refresh still running; skipping this run")
+            return {"status": "skipped", "reason": "previous run in progress"}
+
+        db = SessionLocal()
+        try:
+            stats = MarketDataService.refresh_held_prices(db)
+            logger.info(f"Intraday refresh: {stats}")
+            if stats["updated"]:
+                materialize_portfolio_snapshots.delay()
+            return {"status": "success", **stats}
+        finally:
+            db.close()
+            client.eval(RELEASE_LOCK_SCRIPT, 1, INTRADAY_REFRESH_LOCK, token)
+
+    except Exception as e:
+        logger.exception("Error in intraday price refresh")
+        return {"status": "error", "message": str(e)}
+
+
 @celery_app.task(name="app.celery_tasks.update_user_investment_prices")
 def update_user_investment_prices(user_id: int):
     """Task to update investment prices for a specific user"""
@@ -65,9 +130,8 @@ def update_user_investment_prices(user_id: int):
         db = SessionLocal()
         try:
             updated_count = MarketDataService.update_investment_prices(db, user_id=user_id)
-                db, user_id=user_id
-            )
             logger.info(f"Updated {updated_count} investments for user {user_id}")
+            materialize_portfolio_snapshots.delay(user_id=user_id)
             return {"status": "success", "updated": updated_count}
         finally:
             db.close()
@@ -77,6 +141,101 @@ def update_user_investment_prices(user_id: int):
         return {"status": "error", "message": str(e)}
 
 
+@celery_app.task(name="app.celery_tasks.materialize_portfolio_snapshots")
+def materialize_portfolio_snapshots(user_id: int = None):
+    """Task to write today's portfolio valuation snapshot(s) after a price refresh"""
+    try:
+        from app.database import SessionLocal
+        from app.snapshot_service import SnapshotService
+
+        db = SessionLocal()
+        try:
+            count = SnapshotService.materialize_snapshots(db, user_id=user_id)
+            return {"status": "success", "snapshots": count}
+        finally:
+            db.close()
+
+    except Exception as e:
+        logger.exception("Error materializing portfolio snapshots")
+        return {"status": "error", "message": str(e)}
+
+
+@celery_app.task(name="app.celery_tasks.reconcile_user_summaries")
+def reconcile_user_summaries():
+    """Task to rebuild every user's dashboard summary from source rows"""
+    try:
+        from app.database import SessionLocal
+        from app.summary_service import SummaryService
+
+        db = SessionLocal()
+        try:
+            SummaryService.recompute(db)
+            db.commit()
+            return {"status": "success"}
+        finally:
+            db.close()
+
+    except Exception as e:
+        logger.exception("Error reconciling user summaries")
+        return {"status": "error", "message": str(e)}
+
+
+@celery_app.task(name="app.celery_tasks.render_report_task")
+def render_report_task(user_id: int, kind: str, fingerprint: str = None):
+    """
+    Task to render a PDF report into the artifact store. Errors propagate so
+    the job is recorded as FAILURE and the next download re-queues it.
+    """
+    from app.database import ReadSessionLocal
+    from app.models import User
+    from app.report_artifacts import ReportArtifactStore
+
+    db = ReadSessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+
+        fingerprint, path = ReportArtifactStore.render_and_store(db, user, kind, fingerprint)
+        return {"status": "success", "kind": kind, "fingerprint": fingerprint}
+    except Exception:
+        logger.exception(f"Error rendering {kind} report for user {user_id}")
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.celery_tasks.generate_monthly_statements")
+def generate_monthly_statements(period: str = None):
+    """Task to render every user's monthly statement (previous month by default)"""
+    import subprocess
+    import sys
+
+    # Prefork workers are daemonic and may not start a process pool
+    # themselves, so the batch runs as its own process.
+    cmd = [sys.executable, "-m", "app.statement_batch"]
+    if period:
+        cmd += ["--period", period]
+    try:
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, check=False, timeout=STATEMENT_BATCH_TIMEOUT,
+        )
+        lines = result.stdout.strip().splitlines()
+        if not lines:
+            logger.error(f"Statement batch exited {result.returncode}: {result.stderr[-2000:]}")
+            return {"status": "error", "message": result.stderr[-500:]}
+        # Exit code 1 with stats means some users failed; they are retried next run
+        status = "success" if result.returncode == 0 else "partial"
+        return {"status": status, **json.loads(lines[-1])}
+
+    except subprocess.TimeoutExpired:
+        logger.error(f"Statement batch killed after {STATEMENT_BATCH_TIMEOUT}s; the next run resumes it")
+        return {"status": "error", "message": f"Timed out after {STATEMENT_BATCH_TIMEOUT}s"}
+    except Exception as e:
+        logger.exception("Error generating monthly statements")
+        return {"status": "error", "message": str(e)}
+
+
 @celery_app.task(name="app.celery_tasks.generate_recommendations_task")
 def generate_recommendations_task(user_id: int):
     """Task to generate recommendations for a user"""
@@ -0,0 +1,188 @@
+"""
+compression.py — negotiated brotli/gzip response compression.
+
+A drop-in replacement for Starlette's GZipMiddleware that also speaks
+brotli (when the optional `brotli` package is installed) and picks the
+encoding from the client's Accept-Encoding, honouring q-values. Bodies
+smaller than COMPRESSION_MIN_SIZE, responses that already carry a
+Content-Encoding and already-compressed media types (PDF, Parquet, Arrow,
+...) pass through untouched. Every response that could have been
+compressed carries Vary: Accept-Encoding, whether or not this one was, so
+shared caches never hand an encoded body to a client that can't decode it
+(or the reverse). Streaming responses are compressed chunk by
+chunk with a sync flush, so CSV/Arrow exports still arrive progressively.
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 4-5 is the usual sweet spot for dynamic content; 11 is far too slow per request
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Media types that are already compressed and gain nothing from another pass
+INCOMPRESSIBLE_TYPES = (
+    "application/pdf",
+    "application/vnd.apache.parquet",
+    "application/vnd.apache.arrow.stream",
+    "application/zip",
+    "application/gzip",
+    "image/",
+    "audio/",
+    "video/",
+)
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        # wbits=31: zlib stream with a gzip header and trailer
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' or None for an Accept-Encoding header value"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+
+    def q_for(coding: str) -> float:
+        return accepted.get(coding, accepted.get("*", 0.0))
+
+    if brotli is not None and q_for("br") > 0 and q_for("br") >= q_for("gzip"):
+        return "br"
+    if q_for("gzip") > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            # Runs even when nothing is acceptable, to add Vary to the response
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+            responder = _CompressionResponder(self.app, self.minimum_size, encoding)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, minimum_size: int, encoding: Optional[str]) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.encoder = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _start_encoding(self, streaming: bool) -> MutableHeaders:
+        self.encoder = _BrotliEncoder() if self.encoding == "br" else _GzipEncoder()
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoder.name
+        # The body bytes differ from the identity representation
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if streaming:
+            del headers["Content-Length"]
+        return headers
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until we know whether the body is compressed
+            self.initial_message = message
+            headers = MutableHeaders(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = not (
+                "content-encoding" in headers
+                or content_type.startswith(INCOMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                # The encoding depends on Accept-Encoding even when this body
+                # ends up identity-encoded (too small, or nothing acceptable)
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = not compressible or self.encoding is None
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if self.passthrough or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            headers = self._start_encoding(streaming=more_body)
+            if more_body:
+                message["body"] = self.encoder.chunk(body)
+            else:
+                message["body"] = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        message["body"] = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+        await self.send(message)
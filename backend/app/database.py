@@ -1,14 +1,165 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Dict
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 DATABASE_URL = os.environ["DATABASE_URL"]  # Must be set in Render environment variables
+# Optional read replica for GET endpoints and report generation
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Server-side limit per statement in ms (PostgreSQL only, 0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+
+# asyncio drivers for the async engine, by backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class MeteredPool:
+    """Pool mixin that records how long callers wait to check out a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self.metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self.metrics_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # Keep counters across pool recreation (e.g. after a disconnect)
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.wait_total, pool.wait_max = self.wait_total, self.wait_max
+        return pool
+
+
+class MeteredQueuePool(MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_args(backend: str, poolclass) -> Dict:
+    kwargs = {"pool_pre_ping": True}
+    if backend != "sqlite":
+        kwargs.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+def _create_engine(url: str):
+    backend = make_url(url).get_backend_name()
+    kwargs = _pool_args(backend, MeteredQueuePool)
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return create_engine(url, **kwargs)
+
+
+def async_url(url: str) -> URL:
+    """`url` with its driver swapped for the backend's asyncio driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend!r}")
+    parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    # libpq's sslmode is spelled ssl for asyncpg
+    if "sslmode" in parsed.query:
+        parsed = parsed.update_query_dict({"ssl": parsed.query["sslmode"]}).difference_update_query(["sslmode"])
+    return parsed
+
+
+def _create_async_engine(url: str):
+    backend = make_url(url).get_backend_name()
+    kwargs = _pool_args(backend, MeteredAsyncQueuePool)
+    if backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return create_async_engine(async_url(url), **kwargs)
+
+
+engine = _create_engine(DATABASE_URL)
+read_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions for read-only work; same as SessionLocal when no replica is set
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+# The primary through an asyncio driver, for the async read endpoints. These
+# are list views refetched right after the client's own writes, so they stay
+# off the (possibly lagging) replica. The engine has its own pool, so
+# DB_POOL_SIZE applies to the sync and async sides alike.
+async_engine = _create_async_engine(DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def disable_statement_timeout(conn: Connection) -> None:
+    """
+    Lift DB_STATEMENT_TIMEOUT_MS for the rest of `conn`'s transaction, for
+    long-running work such as migrations and bulk imports. SET LOCAL ends
+    with the transaction, so the pooled connection keeps its usual limit.
+    """
+    if conn.dialect.name == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+
+
+def pool_stats() -> Dict[str, Dict[str, float]]:
+    """Checkout-wait and utilization figures for the primary and replica pools"""
+    engines = {"primary": engine, "async_primary": async_engine.sync_engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+
+    stats = {}
+    for name, eng in engines.items():
+        pool = eng.pool
+        if not isinstance(pool, MeteredPool):
+            stats[name] = {"pool": type(pool).__name__}
+            continue
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        with pool.metrics_lock:
+            stats[name] = {
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "utilization": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                "wait_max_ms": round(pool.wait_max * 1000, 3),
+            }
+    return stats
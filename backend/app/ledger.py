@@ -0,0 +1,582 @@
+"""
+ledger.py — holdings and P&L derived from the transaction ledger.
+
+Every buy/sell/dividend is applied to a per-(user, symbol) Position
+checkpoint: units, open FIFO lots, cost basis of those lots, realized P&L,
+dividends and fees. A new trade that is later than the checkpoint is
+applied in O(1) (amortized over the lots it closes); a back-dated trade,
+a deletion or a bulk import instead rebuilds the symbol from its full
+history. Rebuilds are vectorized with numpy: FIFO cost of every sale is
+read off the cumulative (units, cost) curve of the buys with np.interp,
+so a history of any length is replayed without a Python loop per trade.
+
+The linked Investment row (the holding the rest of the app reads) is kept
+in step with its position, as is the user's dashboard summary.
+
+Usage:
+    python -m app.ledger rebuild [--user ID]    # rebuild all positions
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from app.models import AssetType, Investment, Position, Transaction, TransactionType, User
+from app.summary_service import SummaryService
+
+logger = logging.getLogger(__name__)
+
+# Transaction types that touch a position; contributions/withdrawals are cash only
+POSITION_TYPES = (TransactionType.buy, TransactionType.sell, TransactionType.dividend)
+EPSILON = 1e-9
+
+
+def position_key(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def empty_state() -> Dict:
+    return {
+        "units": 0.0, "cost_basis": 0.0, "realized_pnl": 0.0, "dividends": 0.0,
+        "fees": 0.0, "lots": [], "transaction_count": 0,
+    }
+
+
+def _type_value(tx_type) -> str:
+    return tx_type.value if hasattr(tx_type, "value") else str(tx_type)
+
+
+def apply_trade(state: Dict, tx_type, quantity: float, price: float, fees: float) -> None:
+    """Apply one transaction to `state` in place (the incremental engine)"""
+    kind = _type_value(tx_type)
+    fees = fees or 0.0
+
+    if kind == "buy":
+        if quantity <= 0:
+            return
+        cost = quantity * price + fees
+        state["lots"].append([quantity, cost / quantity])
+        state["units"] += quantity
+        state["cost_basis"] += cost
+    elif kind == "sell":
+        if quantity <= 0:
+            return
+        # Selling more than is held only closes what is held
+        sold = min(quantity, state["units"])
+        remaining = sold
+        consumed = 0.0
+        lots = state["lots"]
+        while remaining > EPSILON and lots:
+            lot = lots[0]
+            take = min(lot[0], remaining)
+            consumed += take * lot[1]
+            lot[0] -= take
+            remaining -= take
+            if lot[0] <= EPSILON:
+                lots.pop(0)
+        state["realized_pnl"] += sold * price - fees - consumed
+        state["units"] -= sold
+        state["cost_basis"] -= consumed
+        if state["units"] <= EPSILON:
+            state["units"], state["cost_basis"], state["lots"] = 0.0, 0.0, []
+    elif kind == "dividend":
+        state["dividends"] += quantity * price - fees
+    else:
+        return
+
+    state["fees"] += fees
+    state["transaction_count"] += 1
+
+
+def replay(
+    tx_types: Sequence,
+    quantity: Sequence[float],
+    price: Sequence[float],
+    fees: Sequence[float],
+) -> Dict:
+    """
+    State after applying a symbol's whole history (oldest first). Vectorized
+    FIFO: with buys laid end to end as a cumulative (units, cost) curve, the
+    k-th sale consumes the slice between units sold before it and after it,
+    whose cost is the difference of two np.interp lookups. Histories that
+    ever sell more than is held fall back to the sequential engine, which
+    clips those sales.
+    """
+    import numpy as np
+
+    kinds = np.array([_type_value(t) for t in tx_types], dtype=object)
+    q = np.asarray(quantity, dtype=float)
+    p = np.asarray(price, dtype=float)
+    f = np.nan_to_num(np.asarray(fees, dtype=float))
+
+    is_buy = (kinds == "buy") & (q > 0)
+    is_sell = (kinds == "sell") & (q > 0)
+    is_div = kinds == "dividend"
+
+    buy_q = np.where(is_buy, q, 0.0)
+    sell_q = np.where(is_sell, q, 0.0)
+    held = np.cumsum(buy_q) - np.cumsum(sell_q)
+    if held.size and held.min() < -EPSILON * max(1.0, float(buy_q.sum())):
+        state = empty_state()
+        for args in zip(tx_types, q, p, f):
+            apply_trade(state, *args)
+        return state
+
+    lot_q = q[is_buy]
+    lot_cost = lot_q * p[is_buy] + f[is_buy]
+    cum_q = np.concatenate(([0.0], np.cumsum(lot_q)))
+    cum_c = np.concatenate(([0.0], np.cumsum(lot_cost)))
+
+    sold_after = np.cumsum(sell_q)[is_sell]
+    sold_before = sold_after - q[is_sell]
+    consumed = np.interp(sold_after, cum_q, cum_c) - np.interp(sold_before, cum_q, cum_c)
+    proceeds = q[is_sell] * p[is_sell] - f[is_sell]
+    total_sold = float(sold_after[-1]) if sold_after.size else 0.0
+
+    # Open lots: the part of each buy beyond the units sold so far
+    remaining = cum_q[1:] - np.maximum(cum_q[:-1], total_sold)
+    open_lots = remaining > EPSILON
+    unit_cost = np.divide(lot_cost, lot_q, out=np.zeros_like(lot_cost), where=lot_q > 0)
+
+    units = float(cum_q[-1]) - total_sold
+    state = {
+        "units": units,
+        "cost_basis": float(np.dot(remaining[open_lots], unit_cost[open_lots])),
+        "realized_pnl": float(np.sum(proceeds - consumed)),
+        "dividends": float(np.sum(q[is_div] * p[is_div] - f[is_div])),
+        "fees": float(np.sum(f[is_buy | is_sell | is_div])),
+        "lots": [[float(r), float(c)] for r, c in zip(remaining[open_lots], unit_cost[open_lots])],
+        "transaction_count": int(np.count_nonzero(is_buy | is_sell | is_div)),
+    }
+    if units <= EPSILON:
+        state["units"], state["cost_basis"], state["lots"] = 0.0, 0.0, []
+    return state
+
+
+class LedgerService:
+    """Keep Position checkpoints (and their Investment rows) in step with the ledger"""
+
+    @staticmethod
+    def apply(db: Session, tx: Transaction, asset_type: Optional[AssetType] = None) -> Optional[Investment]:
+        """
+        Apply a new transaction (added to `db`, not yet committed) to its
+        position and return the holding it now belongs to. `asset_type` is
+        used if the trade opens a holding that does not exist yet.
+        """
+        if tx.type not in POSITION_TYPES:
+            return None
+        db.flush()
+
+        key = position_key(tx.symbol)
+        position = db.query(Position).filter(
+            Position.user_id == tx.user_id, Position.symbol == key,
+        ).with_for_update().first()
+
+        if position is None or not LedgerService._in_order(position, tx):
+            return LedgerService.rebuild(db, tx.user_id, [key], asset_type=asset_type).get(key)
+
+        state = LedgerService._state(position)
+        apply_trade(state, tx.type, tx.quantity, tx.price, tx.fees)
+        LedgerService._store(position, state, tx.id, tx.executed_at)
+
+        investment = LedgerService._sync_investment(db, position, tx.symbol, asset_type)
+        if investment is not None and tx.investment_id is None:
+            tx.investment_id = investment.id
+        return investment
+
+    @staticmethod
+    def rebuild(
+        db: Session,
+        user_id: int,
+        symbols: Optional[List[str]] = None,
+        asset_type: Optional[AssetType] = None,
+        asset_types: Optional[Dict[str, AssetType]] = None,
+    ) -> Dict[str, Optional[Investment]]:
+        """
+        Replay the user's full history (or just `symbols`, given as position
+        keys) into fresh checkpoints. Returns {symbol: holding}. Holdings a
+        replay opens get `asset_types[symbol]`, else `asset_type`. The work
+        is set-based: one lookup of the holdings involved, one summary
+        adjustment and one UPDATE linking trades, however many symbols.
+        Extra holdings of a replayed symbol are merged into the one kept.
+        """
+        db.flush()
+        symbol_key = func.upper(func.trim(Transaction.symbol))
+        query = db.query(
+            Transaction.id, Transaction.symbol, Transaction.type, Transaction.quantity,
+            Transaction.price, Transaction.fees, Transaction.executed_at,
+        ).filter(Transaction.user_id == user_id, Transaction.type.in_(POSITION_TYPES))
+        if symbols is not None:
+            query = query.filter(symbol_key.in_(symbols))
+        rows = query.order_by(Transaction.executed_at, Transaction.id).all()
+
+        history: Dict[str, List] = {}
+        for row in rows:
+            history.setdefault(position_key(row.symbol), []).append(row)
+
+        positions_query = db.query(Position).filter(Position.user_id == user_id)
+        if symbols is not None:
+            positions_query = positions_query.filter(Position.symbol.in_(symbols))
+        positions = {p.symbol: p for p in positions_query.with_for_update()}
+
+        keys = [
+            key for key in sorted(set(history) | set(positions) | set(symbols or []))
+            if key in history or key in positions
+        ]
+        existing, duplicates = LedgerService._find_investments(db, user_id, keys, positions)
+
+        synced = []
+        deltas = LedgerService._merge_duplicates(db, user_id, existing, duplicates)
+        for key in keys:
+            trades = history.get(key, [])
+            if trades:
+                state = replay(
+                    [t.type for t in trades], [t.quantity for t in trades],
+                    [t.price for t in trades], [t.fees or 0.0 for t in trades],
+                )
+                last = trades[-1]
+                last_id, last_at, display_symbol = last.id, last.executed_at, last.symbol
+            else:
+                state, last_id, last_at, display_symbol = empty_state(), None, None, key
+
+            position = positions.get(key)
+            if position is None:
+                position = Position(user_id=user_id, symbol=key, lots=[])
+                db.add(position)
+            LedgerService._store(position, state, last_id, last_at)
+
+            investment, delta = LedgerService._update_investment(
+                db, position, existing.get(key), display_symbol,
+                (asset_types or {}).get(key, asset_type),
+            )
+            deltas = SummaryService.merge(deltas, delta)
+            synced.append((key, position, investment))
+
+        # New holdings and positions are inserted together here
+        db.flush()
+        holdings: Dict[str, Optional[Investment]] = {}
+        for key, position, investment in synced:
+            holdings[key] = investment
+            if investment is not None:
+                position.investment_id = investment.id
+        SummaryService.adjust(db, user_id, deltas)
+
+        linked = {key: inv.id for key, inv in holdings.items() if inv is not None}
+        if linked:
+            db.execute(
+                update(Transaction)
+                .where(
+                    Transaction.user_id == user_id,
+                    symbol_key.in_(list(linked)),
+                    Transaction.investment_id.is_(None),
+                )
+                .values(investment_id=case(linked, value=symbol_key))
+                .execution_options(synchronize_session=False)
+            )
+
+        return holdings
+
+    @staticmethod
+    def remove_investment(db: Session, investment: Investment) -> Optional[Transaction]:
+        """
+        Close a holding that is about to be deleted. Its trades stay in the
+        ledger, so hand-entered history and realized P&L survive; the units
+        still held are closed by an explicit sell at average cost, which
+        keeps a later replay from bringing the holding back. Returns that
+        closing trade, or None if nothing was open.
+        """
+        db.flush()
+        user_id = investment.user_id
+        key = position_key(investment.symbol)
+        position = db.query(Position).filter(
+            Position.user_id == user_id, Position.symbol == key,
+        ).with_for_update().first()
+
+        if position is not None:
+            state = LedgerService._state(position)
+            last_at = position.last_executed_at
+        else:
+            # Not replayed yet (pre-ledger holding): read the state off its history
+            trades = db.query(
+                Transaction.type, Transaction.quantity, Transaction.price, Transaction.fees,
+                Transaction.executed_at,
+            ).filter(
+                Transaction.user_id == user_id,
+                Transaction.type.in_(POSITION_TYPES),
+                func.upper(func.trim(Transaction.symbol)) == key,
+            ).order_by(Transaction.executed_at, Transaction.id).all()
+            state = replay(
+                [t.type for t in trades], [t.quantity for t in trades],
+                [t.price for t in trades], [t.fees or 0.0 for t in trades],
+            )
+            last_at = trades[-1].executed_at if trades else None
+
+        # A pre-ledger duplicate holding of the symbol keeps its share
+        duplicated = db.query(Investment.id).filter(
+            Investment.user_id == user_id,
+            Investment.id != investment.id,
+            func.upper(func.trim(Investment.symbol)) == key,
+        ).first() is not None
+        quantity = min(investment.units, state["units"]) if duplicated else state["units"]
+
+        db.query(Transaction).filter(
+            Transaction.user_id == user_id, Transaction.investment_id == investment.id,
+        ).update({Transaction.investment_id: None}, synchronize_session="fetch")
+        if position is not None and position.investment_id == investment.id:
+            position.investment_id = None
+
+        if quantity <= EPSILON:
+            return None
+
+        now = datetime.utcnow()
+        closing = Transaction(
+            user_id=user_id,
+            symbol=investment.symbol,
+            type=TransactionType.sell,
+            quantity=quantity,
+            price=state["cost_basis"] / state["units"],
+            fees=0.0,
+            executed_at=max(now, last_at) if last_at else now,
+        )
+        db.add(closing)
+        db.flush()
+        if position is not None:
+            apply_trade(state, closing.type, closing.quantity, closing.price, closing.fees)
+            LedgerService._store(position, state, closing.id, closing.executed_at)
+        logger.info(f"Closed {quantity} unit(s) of {key} for removed holding {investment.id}")
+        return closing
+
+    @staticmethod
+    def positions(db: Session, user_id: int) -> List[Dict]:
+        """Positions with realized and unrealized P&L at the holdings' last prices"""
+        rows = db.query(Position, Investment.last_price, Investment.asset_type).outerjoin(
+            Investment, Investment.id == Position.investment_id,
+        ).filter(Position.user_id == user_id).order_by(Position.symbol).all()
+
+        result = []
+        for position, last_price, asset_type in rows:
+            market_value = position.units * last_price if last_price else None
+            result.append({
+                "symbol": position.symbol,
+                "investment_id": position.investment_id,
+                "asset_type": asset_type.value if asset_type else None,
+                "units": round(position.units, 6),
+                "avg_price": round(position.cost_basis / position.units, 4) if position.units else 0.0,
+                "cost_basis": round(position.cost_basis, 2),
+                "last_price": last_price or None,
+                "market_value": round(market_value, 2) if market_value is not None else None,
+                "unrealized_pnl": round(market_value - position.cost_basis, 2) if market_value is not None else None,
+                "realized_pnl": round(position.realized_pnl, 2),
+                "dividends": round(position.dividends, 2),
+                "fees": round(position.fees, 2),
+                "open_lots": len(position.lots or []),
+                "transactions": position.transaction_count,
+                "last_executed_at": position.last_executed_at,
+            })
+        return result
+
+    @staticmethod
+    def _in_order(position: Position, tx: Transaction) -> bool:
+        if position.last_executed_at is None:
+            return position.transaction_count == 0
+        return (tx.executed_at, tx.id) > (position.last_executed_at, position.last_transaction_id or 0)
+
+    @staticmethod
+    def _state(position: Position) -> Dict:
+        return {
+            "units": position.units or 0.0,
+            "cost_basis": position.cost_basis or 0.0,
+            "realized_pnl": position.realized_pnl or 0.0,
+            "dividends": position.dividends or 0.0,
+            "fees": position.fees or 0.0,
+            # Copy: the JSON column only notices reassignment, not in-place edits
+            "lots": [list(lot) for lot in position.lots or []],
+            "transaction_count": position.transaction_count or 0,
+        }
+
+    @staticmethod
+    def _store(position: Position, state: Dict, last_id: Optional[int], last_at: Optional[datetime]):
+        for column in ("units", "cost_basis", "realized_pnl", "dividends", "fees", "transaction_count"):
+            setattr(position, column, state[column])
+        position.lots = state["lots"]
+        position.last_transaction_id = last_id
+        position.last_executed_at = last_at
+
+    @staticmethod
+    def _sync_investment(
+        db: Session, position: Position, display_symbol: str, asset_type: Optional[AssetType],
+    ) -> Optional[Investment]:
+        """Bring one position's holding (and the summary) in step with it"""
+        investment = db.get(Investment, position.investment_id) if position.investment_id else None
+        if investment is None:
+            found, _ = LedgerService._find_investments(
+                db, position.user_id, [position.symbol], {position.symbol: position},
+            )
+            investment = found.get(position.symbol)
+        investment, deltas = LedgerService._update_investment(
+            db, position, investment, display_symbol, asset_type,
+        )
+        if investment is None:
+            return None
+        if investment.id is None:
+            db.flush()
+        SummaryService.adjust(db, position.user_id, deltas)
+        position.investment_id = investment.id
+        return investment
+
+    @staticmethod
+    def _find_investments(
+        db: Session, user_id: int, keys: List[str], positions: Dict[str, Position],
+    ) -> Tuple[Dict[str, Investment], Dict[str, List[Investment]]]:
+        """
+        The holding each position key belongs to: the one it is linked to,
+        else the user's oldest holding of that symbol. Also returns the other
+        holdings of each symbol (from before the ledger, which allowed
+        several). One query for all keys.
+        """
+        if not keys:
+            return {}, {}
+        linked_ids = [
+            positions[key].investment_id for key in keys
+            if key in positions and positions[key].investment_id
+        ]
+        holding_key = func.upper(func.trim(Investment.symbol))
+        condition = holding_key.in_(keys)
+        if linked_ids:
+            condition = condition | Investment.id.in_(linked_ids)
+        candidates = db.query(Investment).filter(
+            Investment.user_id == user_id, condition,
+        ).order_by(Investment.id).all()
+
+        by_id = {inv.id: inv for inv in candidates}
+        by_key: Dict[str, Investment] = {}
+        for inv in candidates:
+            by_key.setdefault(position_key(inv.symbol), inv)
+
+        found = {}
+        for key in keys:
+            position = positions.get(key)
+            investment = by_id.get(position.investment_id) if position and position.investment_id else None
+            investment = investment or by_key.get(key)
+            if investment is not None:
+                found[key] = investment
+
+        duplicates: Dict[str, List[Investment]] = {}
+        for inv in candidates:
+            key = position_key(inv.symbol)
+            if key in found and found[key] is not inv:
+                duplicates.setdefault(key, []).append(inv)
+        return found, duplicates
+
+    @staticmethod
+    def _merge_duplicates(
+        db: Session,
+        user_id: int,
+        holdings: Dict[str, Investment],
+        duplicates: Dict[str, List[Investment]],
+    ) -> Dict[str, float]:
+        """
+        Fold extra holdings of a symbol into the one its position keeps: their
+        trades are relinked, a missing last price is taken over and the rows
+        are deleted. The replay already counts their trades, so leaving them
+        would count those units twice. Returns the summary deltas.
+        """
+        deltas: Dict[str, float] = {}
+        for key, extras in duplicates.items():
+            keeper = holdings[key]
+            extra_ids = [inv.id for inv in extras]
+            logger.warning(
+                f"Merging duplicate holdings {extra_ids} of {key} into holding {keeper.id}"
+            )
+            for extra in sorted(extras, key=lambda inv: inv.last_price_at or datetime.min, reverse=True):
+                if not keeper.last_price and extra.last_price:
+                    keeper.last_price, keeper.last_price_at = extra.last_price, extra.last_price_at
+                deltas = SummaryService.merge(deltas, SummaryService.investment_contribution(extra, sign=-1))
+
+            db.query(Transaction).filter(
+                Transaction.user_id == user_id, Transaction.investment_id.in_(extra_ids),
+            ).update({Transaction.investment_id: keeper.id}, synchronize_session="fetch")
+            db.query(Position).filter(
+                Position.user_id == user_id, Position.investment_id.in_(extra_ids),
+            ).update({Position.investment_id: keeper.id}, synchronize_session="fetch")
+            for extra in extras:
+                db.delete(extra)
+        return deltas
+
+    @staticmethod
+    def _update_investment(
+        db: Session,
+        position: Position,
+        investment: Optional[Investment],
+        display_symbol: str,
+        asset_type: Optional[AssetType],
+    ) -> Tuple[Optional[Investment], Dict[str, float]]:
+        """
+        Copy the position onto its holding, creating the holding (unflushed)
+        if the position is open and has none. Returns the holding and the
+        summary deltas the change implies; the caller applies those.
+        """
+        created = investment is None
+        if created:
+            if position.units <= 0:
+                return None, {}
+            investment = Investment(
+                user_id=position.user_id,
+                asset_type=asset_type or AssetType.stock,
+                symbol=display_symbol.strip(),
+                units=0, avg_buy_price=0, cost_basis=0, current_value=0, last_price=0,
+            )
+            db.add(investment)
+        elif position.investment_id != investment.id and abs(investment.units - position.units) > EPSILON:
+            logger.warning(
+                f"Ledger takes over holding {investment.id} ({position.symbol}): "
+                f"units {investment.units} -> {position.units}"
+            )
+
+        before = {} if created else SummaryService.investment_contribution(investment, sign=-1)
+        investment.units = position.units
+        investment.cost_basis = position.cost_basis
+        if position.units > 0:
+            investment.avg_buy_price = position.cost_basis / position.units
+        investment.current_value = (
+            position.units * investment.last_price if investment.last_price else position.cost_basis
+        )
+        return investment, SummaryService.merge(before, SummaryService.investment_contribution(investment))
+
+
+def main(argv: List[str]) -> int:
+    from app.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(prog="python -m app.ledger")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user", type=int, help="only this user id")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        user_ids = [args.user] if args.user else [uid for (uid,) in db.query(User.id).order_by(User.id)]
+        started = time.perf_counter()
+        positions = 0
+        for user_id in user_ids:
+            positions += len(LedgerService.rebuild(db, user_id))
+            db.commit()
+        logger.info(
+            f"Rebuilt {positions} position(s) for {len(user_ids)} user(s) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    finally:
+        db.close()
+
+    from app.cache import bump_version
+    bump_version("portfolio", *user_ids)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,36 +1,60 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, status, Response
+import json
+import logging
+import base64
+import csv
+import hashlib
+import io
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query, UploadFile, File, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Header
 from jose import jwt, JWTError
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from io import BytesIO
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.database import Base, engine, SessionLocal
+from app.database import (
+    Base, engine, SessionLocal, ReadSessionLocal, AsyncSessionLocal, async_engine, pool_stats,
+)
 from app.models import (
-    User, Goal, Investment, Transaction, Recommendation, Simulation,
+    User, Goal, Investment, Transaction, Recommendation, Simulation, PortfolioSnapshot,
     RiskProfile, GoalType, AssetType, TransactionType
 )
 from app.schemas import (
     UserCreate, UserLogin, UserOut, UserProfileUpdate, PasswordChange,
-    GoalCreate, GoalUpdate, GoalOut,
-    InvestmentCreate, InvestmentOut,
-    TransactionCreate, TransactionOut,
+    GoalCreate, GoalUpdate, GoalOut, GoalBatchCreate, GoalBatchUpdate,
+    InvestmentCreate, InvestmentBatchCreate, InvestmentOut, PortfolioSnapshotOut,
+    TransactionCreate, TransactionOut, TransactionTypeEnum,
     SimulationCreate, SimulationOut,
-    RecommendationOut,
+    RecommendationOut, RebalancePlanRequest,
     SIPCalculatorInput, RetirementCalculatorInput, LoanPayoffCalculatorInput,
     MarketDataOut
 )
-from app.security import hash_password, verify_password, create_access_token
+from app.security import (
+    hash_password_async, verify_password_async, password_needs_rehash,
+    shutdown_hash_pool, create_access_token,
+)
 from app.market_service import MarketDataService
 from app.recommendation_engine import RecommendationEngine
 from app.simulation_engine import SimulationEngine
 from app.calculators import FinancialCalculators
-from app.report_generator import ReportGenerator
-from app.startup import init_db
+from app.snapshot_service import SnapshotService
+from app.summary_service import SummaryService
+from app.transaction_import import TransactionImporter, TransactionImportError
+from app.ledger import LedgerService, position_key
+from app.cache import bump_version, version_stamp
+from app import auth_cache
+from app.auth_cache import CurrentUser
+from app.report_artifacts import ReportArtifactStore, REPORT_KINDS, REPORT_FILENAMES, REPORT_JOB_CLAIM_SECONDS
+from app.render_pool import run_render, RenderBusy, render_stats
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, render as render_metrics
+from app.startup import init_db, warm_imports
 
 # =========================
 # CONFIG
@@ -40,15 +64,27 @@ if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY environment variable is not set!")
 ALGORITHM = "HS256"
 
+logger = logging.getLogger(__name__)
+
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app):
-    """Startup: create DB tables. Shutdown: nothing needed."""
+    """Startup: check DB schema, warm heavy imports in the background. Shutdown: release pools."""
     init_db()
+    warm_imports()
     yield
-
-app = FastAPI(title="Wealth Management API", version="2.0", lifespan=lifespan)
+    shutdown_hash_pool()
+    await async_engine.dispose()
+
+# orjson renders datetimes, enums and numpy scalars natively and is several
+# times faster than the stdlib encoder on large list responses
+app = FastAPI(
+    title="Wealth Management API",
+    version="2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # =========================
 # CORS
@@ -63,9 +99,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Next-Cursor", "Retry-After", "ETag"],
 )
 
+# =========================
+# COMPRESSION (br / gzip, negotiated)
+# =========================
+app.add_middleware(CompressionMiddleware)
+
+# =========================
+# METRICS (outermost, so latency includes compression and CORS)
+# =========================
+app.add_middleware(MetricsMiddleware)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 # =========================
 # HEALTH CHECK
 # =========================
@@ -73,6 +120,21 @@ app.add_middleware(
 def health_check():
     """Health check endpoint for Cloud Run."""
     return {"status": "ok"}
+
+@app.get("/health/db")
+def db_pool_health():
+    """Connection pool utilization and checkout-wait figures"""
+    return pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: str = Header(None)):
+    """Prometheus scrape endpoint; requires `Bearer $METRICS_TOKEN` when that is set"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return PlainTextResponse(
+        render_metrics(pool_stats, render_stats),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 # =========================
 # DATABASE
 # =========================
@@ -83,15 +145,31 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """
+    Session for read-only handlers. Bound to DATABASE_REPLICA_URL when one
+    is configured (so results may lag the primary slightly), otherwise the
+    same database as get_db.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Async sessions for the read-heavy routes: these run on the event loop
+# instead of occupying a threadpool worker while waiting on the database.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # =========================
 # AUTH
 # =========================
 
 
-def get_current_user(
-    authorization: str = Header(None),
-    db: Session = Depends(get_db),
-):
+def decode_bearer(authorization: Optional[str]):
+    """(token, user_id) from an Authorization header, or 401"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -103,13 +181,68 @@ def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
-    except JWTError:
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+    return token, user_id
 
-    user = db.query(User).filter(User.id == user_id).first()
+def principal_or_401(user: Optional[User]) -> CurrentUser:
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return CurrentUser.from_user(user)
+
+def get_current_principal(
+    authorization: str = Header(None),
+) -> CurrentUser:
+    """
+    Verify the bearer token and resolve it to a CurrentUser. Cache hits
+    (see auth_cache) need no database access at all; misses load the user
+    with a short-lived session of their own.
+    """
+    token, user_id = decode_bearer(authorization)
+    principal, version = auth_cache.lookup(token, user_id)
+    if principal:
+        return principal
+
+    db = SessionLocal()
+    try:
+        principal = principal_or_401(db.query(User).filter(User.id == user_id).first())
+    finally:
+        db.close()
+
+    auth_cache.store(token, principal, version)
+    return principal
+
+async def get_current_principal_async(
+    authorization: str = Header(None),
+) -> CurrentUser:
+    """
+    get_current_principal for async handlers. The cache calls may block on
+    Redis, so they run on the threadpool; a miss loads the user through an
+    async session rather than holding a worker for the query.
+    """
+    token, user_id = decode_bearer(authorization)
+    principal, version = await run_in_threadpool(auth_cache.lookup, token, user_id)
+    if principal:
+        return principal
+
+    async with AsyncSessionLocal() as db:
+        principal = principal_or_401(await db.get(User, user_id))
+
+    await run_in_threadpool(auth_cache.store, token, principal, version)
+    return principal
+
+def get_current_user(
+    principal: CurrentUser = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """The authenticated user as an ORM object, for handlers that modify it"""
+    user = db.query(User).filter(User.id == principal.id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -117,6 +250,86 @@ def get_current_user(
         )
 
     return user
+
+# =========================
+# PAGINATION
+# =========================
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 500
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(query, ts_column, id_column, cursor, limit: int, response: Response):
+    """
+    Newest-first page of `query` ordered by (ts_column, id_column).
+    Continues strictly after `cursor`, so each page is an index range scan
+    regardless of depth; the next page's cursor goes in X-Next-Cursor.
+    """
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(ts_column, id_column) < tuple_(ts, row_id))
+
+    rows = query.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1).all()
+    return trim_page(rows, ts_column, id_column, limit, response)
+
+async def keyset_page_async(db: AsyncSession, stmt, ts_column, id_column, cursor, limit: int, response: Response):
+    """keyset_page for a select() run on an AsyncSession"""
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(ts_column, id_column) < tuple_(ts, row_id))
+
+    stmt = stmt.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = (await db.scalars(stmt)).all()
+    return trim_page(rows, ts_column, id_column, limit, response)
+
+def trim_page(rows, ts_column, id_column, limit: int, response: Response):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            getattr(last, ts_column.key), getattr(last, id_column.key)
+        )
+    return rows
+
+def not_modified(request: Request, response: Response, user_id: int, *namespaces: str) -> Optional[Response]:
+    """
+    Conditional GET on per-user data versions. The ETag covers the path,
+    query string and the user's current version of each namespace; when
+    the client already holds it we answer 304 before running any query.
+    Otherwise the ETag is set on `response` and the handler carries on.
+    Handlers using this read from the primary: a lagging replica could
+    otherwise pin stale data to a fresh ETag.
+    """
+    stamp = version_stamp(user_id, *namespaces)
+    digest = hashlib.sha1(
+        f"{user_id}|{request.url.path}|{request.url.query}|{stamp}".encode()
+    ).hexdigest()[:24]
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+async def not_modified_async(request: Request, response: Response, user_id: int, *namespaces: str) -> Optional[Response]:
+    """not_modified for async handlers: the version read may block on Redis"""
+    return await run_in_threadpool(not_modified, request, response, user_id, *namespaces)
+
 # =========================
 # ROUTES
 # =========================
@@ -127,37 +340,58 @@ def root():
 
 # ---------- AUTH ROUTES ----------
 @app.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user.email).first():
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # DB work stays on the threadpool; bcrypt runs on the hash process pool
+    def email_taken():
+        return db.query(User).filter(User.email == user.email).first() is not None
+
+    if await run_in_threadpool(email_taken):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    new_user = User(
-        name=user.name,
-        email=user.email,
-        password=hash_password(user.password),
-    )
+    hashed = await hash_password_async(user.password)
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    def create_user():
+        new_user = User(
+            name=user.name,
+            email=user.email,
+            password=hashed,
+        )
+
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
+
+    return await run_in_threadpool(create_user)
 
 @app.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == user.email).first()
+    )
 
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user or not await verify_password_async(user.password, db_user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
 
+    # Transparently move the stored hash to the current BCRYPT_ROUNDS
+    if password_needs_rehash(db_user.password):
+        new_hash = await hash_password_async(user.password)
+
+        def upgrade_hash():
+            db_user.password = new_hash
+            db.commit()
+
+        await run_in_threadpool(upgrade_hash)
+
     access_token = create_access_token({"sub": db_user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 # ---------- USER PROFILE ROUTES ----------
 @app.get("/profile", response_model=UserOut)
-def get_profile(user: User = Depends(get_current_user)):
+def get_profile(user: CurrentUser = Depends(get_current_principal)):
     return user
 
 @app.put("/profile", response_model=UserOut)
@@ -174,27 +408,47 @@ def update_profile(
         user.kyc_status = profile_data.kyc_status
     
     db.commit()
+    bump_version("profile", user.id)
+    auth_cache.invalidate_user(user.id)
     db.refresh(user)
     return user
 @app.post("/profile/change-password")
-def change_password(
+async def change_password(
     data: PasswordChange,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    if not verify_password(data.current_password, user.password):
+    if not await verify_password_async(data.current_password, user.password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     if len(data.new_password) < 6:
         raise HTTPException(status_code=400, detail="New password must be at least 6 characters")
-    user.password = hash_password(data.new_password)
-    db.commit()
+    new_hash = await hash_password_async(data.new_password)
+
+    def save_password():
+        user.password = new_hash
+        db.commit()
+        auth_cache.invalidate_user(user.id)
+
+    await run_in_threadpool(save_password)
     return {"message": "Password changed successfully"}
+
+@app.delete("/profile", status_code=204)
+def delete_account(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Delete the account and everything it owns"""
+    user_id = user.id
+    db.delete(user)
+    db.commit()
+    auth_cache.invalidate_user(user_id)
+    return Response(status_code=204)
 # ---------- GOALS ROUTES ----------
 @app.post("/goals", response_model=GoalOut)
 def create_goal(
     goal: GoalCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_principal),
 ):
     new_goal = Goal(
         title=goal.title,
@@ -207,23 +461,101 @@ def create_goal(
     )
 
     db.add(new_goal)
+    db.flush()
+    SummaryService.adjust(db, user.id, SummaryService.goal_contribution(new_goal))
     db.commit()
+    bump_version("goals", user.id)
     db.refresh(new_goal)
     return new_goal
 
 @app.get("/goals", response_model=List[GoalOut])
-def get_goals(
+async def get_goals(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_principal_async),
+):
+    cached = await not_modified_async(request, response, user.id, "goals")
+    if cached:
+        return cached
+
+    return (await db.scalars(select(Goal).where(Goal.user_id == user.id))).all()
+
+def apply_goal_update(goal: Goal, payload: GoalUpdate) -> Dict[str, float]:
+    """Apply the set fields of `payload`; returns the resulting summary deltas"""
+    before = SummaryService.goal_contribution(goal, sign=-1)
+    if payload.saved_amount is not None:
+        goal.saved_amount = payload.saved_amount
+    if payload.status is not None:
+        goal.status = payload.status
+    if payload.monthly_contribution is not None:
+        goal.monthly_contribution = payload.monthly_contribution
+    return SummaryService.merge(before, SummaryService.goal_contribution(goal))
+
+@app.post("/goals/batch", response_model=List[GoalOut])
+def create_goals_batch(
+    payload: GoalBatchCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_principal),
 ):
-    return db.query(Goal).filter(Goal.user_id == user.id).all()
+    """Create up to 500 goals in one transaction"""
+    goals = [
+        Goal(
+            title=goal.title,
+            goal_type=goal.goal_type,
+            target_amount=goal.target_amount,
+            target_date=goal.target_date,
+            monthly_contribution=goal.monthly_contribution,
+            saved_amount=goal.saved_amount,
+            user_id=user.id,
+        )
+        for goal in payload.goals
+    ]
+    db.add_all(goals)
+    db.flush()
+    SummaryService.adjust(db, user.id, SummaryService.merge(
+        *(SummaryService.goal_contribution(goal) for goal in goals)
+    ))
+    # Serialize before commit so the response needs no per-row reload
+    created = [GoalOut.model_validate(goal) for goal in goals]
+    db.commit()
+    bump_version("goals", user.id)
+    return created
+
+@app.put("/goals/batch", response_model=List[GoalOut])
+def update_goals_batch(
+    payload: GoalBatchUpdate,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_principal),
+):
+    """Update up to 500 goals in one transaction; all-or-nothing"""
+    ids = [item.id for item in payload.goals]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Each goal may appear only once")
+
+    goals = {
+        goal.id: goal
+        for goal in db.query(Goal).filter(Goal.user_id == user.id, Goal.id.in_(ids))
+    }
+    missing = [goal_id for goal_id in ids if goal_id not in goals]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Goal(s) not found: {missing}")
+
+    SummaryService.adjust(db, user.id, SummaryService.merge(
+        *(apply_goal_update(goals[item.id], item) for item in payload.goals)
+    ))
+    db.flush()
+    updated = [GoalOut.model_validate(goals[goal_id]) for goal_id in ids]
+    db.commit()
+    bump_version("goals", user.id)
+    return updated
 
 @app.put("/goals/{goal_id}", response_model=GoalOut)
 def update_goal(
     goal_id: int,
     payload: GoalUpdate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_principal),
 ):
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
@@ -233,14 +565,9 @@ def update_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
-    if payload.saved_amount is not None:
-        goal.saved_amount = payload.saved_amount
-    if payload.status is not None:
-        goal.status = payload.status
-    if payload.monthly_contribution is not None:
-        goal.monthly_contribution = payload.monthly_contribution
-
+    SummaryService.adjust(db, user.id, apply_goal_update(goal, payload))
     db.commit()
+    bump_version("goals", user.id)
     db.refresh(goal)
     return goal
 
@@ -248,7 +575,7 @@ def update_goal(
 def delete_goal(
     goal_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_principal),
 ):
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
@@ -258,35 +585,23 @@ def delete_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
+    SummaryService.adjust(db, user.id, SummaryService.goal_contribution(goal, sign=-1))
     db.delete(goal)
     db.commit()
+    bump_version("goals", user.id)
+    bump_version("simulations", user.id)  # deleted with the goal (cascade)
 
 # ---------- INVESTMENTS & PORTFOLIO ROUTES ----------
 @app.post("/investments", response_model=InvestmentOut)
 def create_investment(
     investment: InvestmentCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     from datetime import datetime
-    
-    cost_basis = investment.units * investment.avg_buy_price
-
-    # Create investment
-    inv = Investment(
-        user_id=user.id,
-        asset_type=investment.asset_type,
-        symbol=investment.symbol,
-        units=investment.units,
-        avg_buy_price=investment.avg_buy_price,
-        cost_basis=cost_basis,
-        current_value=cost_basis,
-    )
 
-    db.add(inv)
-    db.flush()  # Get the investment ID before committing
-    
-    # AUTO-CREATE TRANSACTION
+    # The holding is derived from its buy transaction: a symbol the user
+    # already holds is added to that holding rather than duplicated
     try:
         transaction = Transaction(
             user_id=user.id,
@@ -298,11 +613,19 @@ def create_investment(
             executed_at=datetime.utcnow()
         )
         db.add(transaction)
+        inv = LedgerService.apply(db, transaction, asset_type=investment.asset_type)
+        if inv is None:
+            raise HTTPException(status_code=400, detail="The buy did not open a holding")
         db.commit()
+        bump_version("transactions", user.id)
+        bump_version("portfolio", user.id)
         db.refresh(inv)
-        print(f"✅ Created transaction for {investment.symbol}")  # Debug log
+        logger.info(f"Created transaction for {investment.symbol}")
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
-        print(f"❌ Error creating transaction: {e}")  # Debug log
+        logger.exception(f"Error creating transaction for {investment.symbol}")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create transaction: {str(e)}")
 
@@ -310,30 +633,147 @@ def create_investment(
     try:
         price = MarketDataService.get_current_price(inv.symbol)
         if price:
+            previous_value = inv.current_value
             inv.last_price = price
             inv.current_value = inv.units * price
             inv.last_price_at = datetime.utcnow()
+            SummaryService.adjust(db, user.id, {"total_current_value": inv.current_value - previous_value})
             db.commit()
+            bump_version("portfolio", user.id)
             db.refresh(inv)
     except Exception:
         pass  # Don't fail if price fetch fails
 
     return inv
 
+def price_new_investments(investment_ids: List[int]):
+    db = SessionLocal()
+    try:
+        MarketDataService.price_investments(db, investment_ids)
+    except Exception as e:
+        logger.warning(f"Pricing new investments failed: {e}")
+    finally:
+        db.close()
+
+@app.post("/investments/batch", response_model=List[InvestmentOut])
+def create_investments_batch(
+    payload: InvestmentBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """
+    Record up to 500 buys in one transaction. Each buy opens a holding or
+    adds to the one already held for its symbol; holdings are returned
+    once each. New holdings start valued at cost; live prices for the distinct symbols are
+    fetched in one bulk call after the response is sent, so the request
+    does not wait on Yahoo (poll /portfolio to see them land).
+    """
+    now = datetime.utcnow()
+    db.execute(insert(Transaction), [
+        {
+            "user_id": user.id,
+            "symbol": item.symbol,
+            "type": TransactionType.buy,
+            "quantity": item.units,
+            "price": item.avg_buy_price,
+            "fees": 0.0,
+            "executed_at": now,
+        }
+        for item in payload.investments
+    ])
+
+    # One replay for every symbol touched; the first item for a symbol
+    # decides the asset type of a holding it opens
+    asset_types: Dict[str, AssetType] = {}
+    for item in payload.investments:
+        asset_types.setdefault(position_key(item.symbol), item.asset_type)
+    holdings = LedgerService.rebuild(db, user.id, list(asset_types), asset_types=asset_types)
+    investments = {inv.id: inv for inv in (holdings[key] for key in asset_types) if inv is not None}
+
+    # Serialize before commit so the response needs no per-row reload
+    created = [InvestmentOut.model_validate(inv) for inv in investments.values()]
+    db.commit()
+    bump_version("portfolio", user.id)
+    bump_version("transactions", user.id)
+
+    background_tasks.add_task(price_new_investments, [inv.id for inv in created])
+    return created
+
 @app.get("/portfolio", response_model=List[InvestmentOut])
-def get_portfolio(
+async def get_portfolio(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_principal_async)
+):
+    cached = await not_modified_async(request, response, user.id, "portfolio")
+    if cached:
+        return cached
+
+    return (await db.scalars(
+        select(Investment).where(Investment.user_id == user.id)
+    )).all()
+
+@app.get("/portfolio/positions")
+def get_positions(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    return db.query(Investment).filter(
-        Investment.user_id == user.id
-    ).all()
+    """Ledger positions: units, FIFO cost basis, realized/unrealized P&L, dividends"""
+    cached = not_modified(request, response, user.id, "portfolio", "transactions")
+    if cached:
+        return cached
+
+    return LedgerService.positions(db, user.id)
+
+@app.post("/portfolio/positions/rebuild")
+def rebuild_positions(
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Replay the user's whole transaction history into fresh positions"""
+    started = datetime.utcnow()
+    positions = LedgerService.rebuild(db, user.id)
+    db.commit()
+    bump_version("portfolio", user.id)
+    return {
+        "positions": len(positions),
+        "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+    }
+
+HISTORY_RANGES = {
+    "1M": timedelta(days=31),
+    "6M": timedelta(days=183),
+    "1Y": timedelta(days=366),
+    "5Y": timedelta(days=5 * 366),
+}
+
+@app.get("/portfolio/history", response_model=List[PortfolioSnapshotOut])
+def get_portfolio_history(
+    period: str = Query("1Y", alias="range"),
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Daily valuation time-series from portfolio_snapshots (1M, 6M, 1Y, 5Y or ALL)"""
+    period = period.upper()
+    if period != "ALL" and period not in HISTORY_RANGES:
+        raise HTTPException(status_code=400, detail="range must be one of 1M, 6M, 1Y, 5Y, ALL")
+
+    query = db.query(PortfolioSnapshot).filter(PortfolioSnapshot.user_id == user.id)
+    if period != "ALL":
+        start = datetime.utcnow().date() - HISTORY_RANGES[period]
+        query = query.filter(PortfolioSnapshot.snapshot_date >= start)
+
+    return query.order_by(PortfolioSnapshot.snapshot_date).all()
 
 @app.delete("/investments/{investment_id}", status_code=204)
 def delete_investment(
     investment_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     investment = db.query(Investment).filter(
         Investment.id == investment_id,
@@ -343,15 +783,19 @@ def delete_investment(
     if not investment:
         raise HTTPException(status_code=404, detail="Investment not found")
     
+    SummaryService.adjust(db, user.id, SummaryService.investment_contribution(investment, sign=-1))
+    LedgerService.remove_investment(db, investment)
     db.delete(investment)
     db.commit()
+    bump_version("portfolio", user.id)
+    bump_version("transactions", user.id)
 
 # ---------- TRANSACTIONS ROUTES ----------
 @app.post("/transactions", response_model=TransactionOut)
 def create_transaction(
     transaction: TransactionCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     from datetime import datetime
     
@@ -366,27 +810,70 @@ def create_transaction(
     )
 
     db.add(new_tx)
+    LedgerService.apply(db, new_tx)
     db.commit()
+    bump_version("transactions", user.id)
+    bump_version("portfolio", user.id)
     db.refresh(new_tx)
     return new_tx
 
-@app.get("/transactions", response_model=List[TransactionOut])
-def get_transactions(
+@app.post("/transactions/import")
+def import_transactions(
+    file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == user.id
-    ).order_by(Transaction.executed_at.desc()).all()
-    
-    print(f"📊 Found {len(transactions)} transactions for user {user.id}")  # Debug log
-    return transactions
+    """
+    Bulk import from a CSV (Date, Symbol, Type, Quantity, Price, Fees - the
+    same layout /reports/transactions/csv exports). Valid rows are loaded in
+    one transaction; invalid ones are skipped and listed in the response.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = TransactionImporter.import_csv(db, user.id, stream)
+        # Imported rows may predate existing ones, so replay the whole ledger
+        result["positions"] = len(LedgerService.rebuild(db, user.id))
+        db.commit()
+    except (TransactionImportError, UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Could not import file: {e}")
+    finally:
+        stream.detach()
+
+    if result["accepted"]:
+        bump_version("transactions", user.id)
+        bump_version("portfolio", user.id)
+    return result
+
+@app.get("/transactions", response_model=List[TransactionOut])
+async def get_transactions(
+    response: Response,
+    symbol: Optional[str] = None,
+    type: Optional[TransactionTypeEnum] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_principal_async)
+):
+    stmt = select(Transaction).where(Transaction.user_id == user.id)
+    if symbol:
+        stmt = stmt.where(func.upper(Transaction.symbol) == symbol.strip().upper())
+    if type:
+        stmt = stmt.where(Transaction.type == type.value)
+    if date_from:
+        stmt = stmt.where(Transaction.executed_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Transaction.executed_at <= date_to)
+
+    return await keyset_page_async(db, stmt, Transaction.executed_at, Transaction.id, cursor, limit, response)
 
 @app.delete("/transactions/{transaction_id}", status_code=204)
 def delete_transaction(
     transaction_id: int,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     transaction = db.query(Transaction).filter(
         Transaction.id == transaction_id,
@@ -396,8 +883,12 @@ def delete_transaction(
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
+    symbol = position_key(transaction.symbol)
     db.delete(transaction)
+    LedgerService.rebuild(db, user.id, [symbol])
     db.commit()
+    bump_version("transactions", user.id)
+    bump_version("portfolio", user.id)
     return Response(status_code=204)
 
 # ---------- MARKET DATA ROUTES ----------
@@ -411,29 +902,45 @@ def get_market_data(symbol: str):
 @app.post("/portfolio/refresh-prices")
 def refresh_portfolio_prices(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     updated_count = MarketDataService.update_investment_prices(db, user.id)
+    if updated_count > 0:
+        SnapshotService.materialize_snapshots(db, user_id=user.id)
     if updated_count == 0:
         return {"status": "warning", "updated": 0, "message": "No prices updated. Symbols may be invalid or Yahoo Finance is temporarily unavailable."}
     return {"status": "success", "updated": updated_count}
 
 # ---------- RECOMMENDATIONS ROUTES ----------
 @app.get("/recommendations", response_model=List[RecommendationOut])
-def get_recommendations(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)    
+async def get_recommendations(
+    request: Request,
+    response: Response,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_principal_async)
 ):
-    return db.query(Recommendation).filter(
-        Recommendation.user_id == user.id
-    ).order_by(Recommendation.created_at.desc()).all()
+    cached = await not_modified_async(request, response, user.id, "recommendations")
+    if cached:
+        return cached
+
+    stmt = select(Recommendation).where(Recommendation.user_id == user.id)
+    if date_from:
+        stmt = stmt.where(Recommendation.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Recommendation.created_at <= date_to)
+
+    return await keyset_page_async(db, stmt, Recommendation.created_at, Recommendation.id, cursor, limit, response)
 
 @app.post("/recommendations/generate")
 def generate_recommendations(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    rebalance_data = RecommendationEngine.get_rebalance_suggestions(db, user)
+    rebalance_data = RecommendationEngine.get_cached_rebalance_suggestions(db, user)
     
     rec = Recommendation(
         user_id=user.id,
@@ -443,6 +950,7 @@ def generate_recommendations(
     )
     db.add(rec)
     db.commit()
+    bump_version("recommendations", user.id)
     db.refresh(rec)
     
     return rec
@@ -450,15 +958,57 @@ def generate_recommendations(
 @app.get("/recommendations/allocation")
 def get_allocation_recommendation(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    return RecommendationEngine.get_rebalance_suggestions(db, user)
+    return RecommendationEngine.get_cached_rebalance_suggestions(db, user)
+
+@app.post("/recommendations/rebalance-plan")
+def get_rebalance_plan(
+    payload: RebalancePlanRequest,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Concrete per-symbol buy/sell orders to reach the recommended allocation"""
+    if payload.cash_available < 0 or payload.min_trade_value < 0:
+        raise HTTPException(status_code=400, detail="cash_available and min_trade_value must be non-negative")
+
+    plan = RecommendationEngine.plan_rebalance_trades(
+        db, user,
+        cash_available=payload.cash_available,
+        min_trade_value=payload.min_trade_value,
+    )
+
+    if payload.save and plan["trades"]:
+        rec = Recommendation(
+            user_id=user.id,
+            title="Rebalancing Trade Plan",
+            recommendation_text=(
+                f"{len(plan['trades'])} trade(s): buy ₹{plan['total_buy']:,.2f}, "
+                f"sell ₹{plan['total_sell']:,.2f} to move toward your recommended allocation."
+            ),
+            suggested_allocation=plan,
+        )
+        db.add(rec)
+        db.commit()
+        bump_version("recommendations", user.id)
+        db.refresh(rec)
+        plan = {**plan, "recommendation_id": rec.id}
+
+    return plan
+
+@app.get("/recommendations/goals")
+def get_all_goal_recommendations(
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Recommendations for all of the user's goals in one round trip"""
+    return RecommendationEngine.generate_goal_recommendations_batch(db, user)
 
 @app.get("/recommendations/goal/{goal_id}")
 def get_goal_recommendation(
     goal_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_principal)
 ):
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
@@ -474,13 +1024,14 @@ def get_goal_recommendation(
 @app.delete("/recommendations/clear")
 def clear_recommendations(
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     """Clear all recommendations for the current user"""
     deleted_count = db.query(Recommendation).filter(
         Recommendation.user_id == user.id
     ).delete()
     db.commit()
+    bump_version("recommendations", user.id)
     return {"message": f"Cleared {deleted_count} recommendations"}
 
 # ---------- SIMULATIONS ROUTES ----------
@@ -488,7 +1039,7 @@ def clear_recommendations(
 def create_simulation(
     sim: SimulationCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     # Extract assumptions
     assumptions = sim.assumptions
@@ -517,22 +1068,40 @@ def create_simulation(
     
     db.add(simulation)
     db.commit()
+    bump_version("simulations", user.id)
     db.refresh(simulation)
     return simulation
 
 @app.get("/simulations", response_model=List[SimulationOut])
 def get_simulations(
+    request: Request,
+    response: Response,
+    goal_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    return db.query(Simulation).filter(
-        Simulation.user_id == user.id
-    ).order_by(Simulation.created_at.desc()).all()
+    cached = not_modified(request, response, user.id, "simulations")
+    if cached:
+        return cached
+
+    query = db.query(Simulation).filter(Simulation.user_id == user.id)
+    if goal_id is not None:
+        query = query.filter(Simulation.goal_id == goal_id)
+    if date_from:
+        query = query.filter(Simulation.created_at >= date_from)
+    if date_to:
+        query = query.filter(Simulation.created_at <= date_to)
+
+    return keyset_page(query, Simulation.created_at, Simulation.id, cursor, limit, response)
 
 @app.post("/simulations/what-if/returns")
 def what_if_returns(
     data: Dict[str, Any],
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     scenarios = SimulationEngine.what_if_return_change(
         current_amount=data.get('current_amount', 0),
@@ -545,7 +1114,7 @@ def what_if_returns(
 @app.post("/simulations/what-if/contributions")
 def what_if_contributions(
     data: Dict[str, Any],
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     scenarios = SimulationEngine.what_if_contribution_change(
         current_amount=data.get('current_amount', 0),
@@ -559,7 +1128,7 @@ def what_if_contributions(
 @app.post("/simulations/monte-carlo")
 def monte_carlo(
     data: Dict[str, Any],
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     results = SimulationEngine.monte_carlo_simulation(
         current_amount=data.get('current_amount', 0),
@@ -576,7 +1145,7 @@ def simulate_goal_completion(
     goal_id: int,
     data: Dict[str, Any],
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     """
     Calculate when a goal will be completed with given parameters
@@ -603,7 +1172,7 @@ def calculate_minimum_contribution(
     goal_id: int,
     data: Dict[str, Any],
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     """
     Calculate minimum monthly contribution needed to achieve goal by target date
@@ -634,7 +1203,7 @@ def calculate_minimum_contribution(
 @app.post("/investments/simulate-growth")
 def simulate_investment_growth(
     data: Dict[str, Any],
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     """
     Simulate investment growth without goal-specific parameters
@@ -675,7 +1244,7 @@ def simulate_investment_growth(
 @app.post("/investments/minimum-for-target")
 def calculate_investment_minimum(
     data: Dict[str, Any],
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
     """
     Calculate minimum monthly investment to reach target in given timeframe
@@ -724,84 +1293,149 @@ def calculate_loan(calc_input: LoanPayoffCalculatorInput):
     )
 
 # ---------- REPORTS ROUTES ----------
-@app.get("/reports/portfolio/pdf")
-def download_portfolio_pdf(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
-):
-    user_data = {
-        'name': user.name,
-        'email': user.email,
-        'risk_profile': user.risk_profile.value if user.risk_profile else 'moderate'
-    }
-    
-    investments = [
-        {
-            'symbol': inv.symbol,
-            'asset_type': inv.asset_type.value,
-            'units': inv.units,
-            'avg_buy_price': inv.avg_buy_price,
-            'cost_basis': inv.cost_basis,
-            'current_value': inv.current_value
-        }
-        for inv in db.query(Investment).filter(Investment.user_id == user.id).all()
-    ]
-    
-    transactions = [
-        {
-            'symbol': tx.symbol,
-            'type': tx.type.value,
-            'quantity': tx.quantity,
-            'price': tx.price,
-            'fees': tx.fees,
-            'executed_at': tx.executed_at
-        }
-        for tx in db.query(Transaction).filter(Transaction.user_id == user.id).order_by(Transaction.executed_at.desc()).limit(20).all()
-    ]
-    
-    pdf_buffer = ReportGenerator.generate_portfolio_pdf(user_data, investments, transactions)
-    
-    return StreamingResponse(
-        pdf_buffer,
+def lookup_report_artifact(user_id: int, kind: str):
+    """(fingerprint, cached path or None) for the user's current data"""
+    fingerprint = ReportArtifactStore.fingerprint(user_id, kind)
+    return fingerprint, ReportArtifactStore.find(user_id, kind, fingerprint)
+
+def render_report_artifact(user_id: int, kind: str):
+    db = ReadSessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return ReportArtifactStore.render_and_store(db, user, kind)
+    finally:
+        db.close()
+
+def report_file_response(kind: str, fingerprint: str, path: str) -> FileResponse:
+    return FileResponse(
+        path,
         media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=portfolio_report.pdf"}
+        filename=REPORT_FILENAMES[kind],
+        headers={"ETag": f'"{fingerprint[:32]}"'},
     )
 
+async def serve_report_pdf(user_id: int, kind: str):
+    """
+    Serve the cached artifact for the current data. A missing artifact is
+    rendered on the bounded render pool; when that is saturated the client
+    gets 503 with Retry-After instead of tying up the shared threadpool.
+    """
+    fingerprint, path = await run_in_threadpool(lookup_report_artifact, user_id, kind)
+    if not path:
+        try:
+            fingerprint, path = await run_render(f"{kind}_pdf", render_report_artifact, user_id, kind)
+        except RenderBusy as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Report rendering is busy, please retry shortly",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+    return report_file_response(kind, fingerprint, path)
+
+@app.get("/reports/portfolio/pdf")
+async def download_portfolio_pdf(
+    user: CurrentUser = Depends(get_current_principal)
+):
+    return await serve_report_pdf(user.id, "portfolio")
+
 @app.get("/reports/goals/pdf")
-def download_goals_pdf(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+async def download_goals_pdf(
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    user_data = {
-        'name': user.name,
-        'email': user.email
-    }
-    
-    goals = [
-        {
-            'title': g.title,
-            'goal_type': g.goal_type.value,
-            'target_amount': g.target_amount,
-            'saved_amount': g.saved_amount,
-            'status': g.status.value
-        }
-        for g in db.query(Goal).filter(Goal.user_id == user.id).all()
-    ]
-    
-    pdf_buffer = ReportGenerator.generate_goals_pdf(user_data, goals)
-    
-    return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=goals_report.pdf"}
+    return await serve_report_pdf(user.id, "goals")
+
+@app.get("/reports/{kind}/pdf/download")
+async def download_report_artifact(
+    kind: str,
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """
+    Serve the cached PDF instantly if the user's data is unchanged since it
+    was rendered; otherwise queue a render job and return 202 with a handle
+    to poll at /reports/jobs/{job_id}.
+    """
+    if kind not in REPORT_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown report")
+
+    fingerprint, path = await run_in_threadpool(lookup_report_artifact, user.id, kind)
+    if path:
+        return report_file_response(kind, fingerprint, path)
+
+    from app.celery_tasks import celery_app, render_report_task
+
+    # One job per (user, report, data version): repeated clicks share it
+    job_id = f"report-{user.id}-{kind}-{fingerprint[:16]}"
+    try:
+        await run_in_threadpool(enqueue_report_job, celery_app, render_report_task, job_id, user.id, kind, fingerprint)
+    except Exception:
+        # No broker reachable: fall back to rendering on the render pool
+        return await serve_report_pdf(user.id, kind)
+
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/reports/jobs/{job_id}"},
     )
 
+def enqueue_report_job(celery_app, task, job_id: str, user_id: int, kind: str, fingerprint: str):
+    """
+    Publish the render job unless an earlier click already did. The claim is
+    an atomic SET NX in the result backend's Redis, so concurrent requests
+    publish once. A finished job whose artifact is missing (the render
+    failed, or the file was cleaned up) is forgotten and claimed afresh.
+    """
+    claim_key = f"wealvix:report-job:{job_id}"
+    client = celery_app.backend.client
+    result = celery_app.AsyncResult(job_id)
+    if result.state in ("SUCCESS", "FAILURE"):
+        result.forget()
+        client.delete(claim_key)
+    if client.set(claim_key, 1, nx=True, ex=REPORT_JOB_CLAIM_SECONDS):
+        task.apply_async(args=[user_id, kind, fingerprint], task_id=job_id)
+
+@app.get("/reports/jobs/{job_id}")
+def get_report_job(
+    job_id: str,
+    user: CurrentUser = Depends(get_current_principal)
+):
+    if not job_id.startswith(f"report-{user.id}-"):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    from app.celery_tasks import celery_app
+    result = celery_app.AsyncResult(job_id)
+    kind = job_id.split("-")[2]
+    response = {"job_id": job_id, "status": result.state.lower()}
+    if result.successful():
+        # Only hand out the link once the artifact is actually on disk
+        fingerprint = (result.result or {}).get("fingerprint")
+        if fingerprint and ReportArtifactStore.find(user.id, kind, fingerprint):
+            response["download_url"] = f"/reports/{kind}/pdf/download"
+        else:
+            response["status"] = "expired"
+    elif result.failed():
+        response["error"] = str(result.result)
+    return response
+
+def iter_query_rows(build_query, batch_size: int = 1000):
+    """
+    Yield rows from `build_query(db)` in batches of `batch_size` using a
+    server-side cursor. The stream owns its session because it keeps
+    running after the request's get_db session has been closed.
+    """
+    db = ReadSessionLocal()
+    try:
+        for row in build_query(db).yield_per(batch_size):
+            yield row
+    finally:
+        db.close()
+
 @app.get("/reports/portfolio/csv")
 def download_portfolio_csv(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    investments = [
+    from app.report_generator import ReportGenerator
+
+    user_id = user.id
+    investments = (
         {
             'symbol': inv.symbol,
             'asset_type': inv.asset_type.value,
@@ -810,23 +1444,26 @@ def download_portfolio_csv(
             'cost_basis': inv.cost_basis,
             'current_value': inv.current_value
         }
-        for inv in db.query(Investment).filter(Investment.user_id == user.id).all()
-    ]
-    
-    csv_data = ReportGenerator.generate_portfolio_csv(investments)
+        for inv in iter_query_rows(lambda db: db.query(
+            Investment.symbol, Investment.asset_type, Investment.units,
+            Investment.avg_buy_price, Investment.cost_basis, Investment.current_value,
+        ).filter(Investment.user_id == user_id).order_by(Investment.id))
+    )
     
-    return Response(
-        content=csv_data,
+    return StreamingResponse(
+        ReportGenerator.stream_portfolio_csv(investments),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=portfolio.csv"}
     )
 
 @app.get("/reports/transactions/csv")
 def download_transactions_csv(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: CurrentUser = Depends(get_current_principal)
 ):
-    transactions = [
+    from app.report_generator import ReportGenerator
+
+    user_id = user.id
+    transactions = (
         {
             'symbol': tx.symbol,
             'type': tx.type.value,
@@ -835,42 +1472,97 @@ def download_transactions_csv(
             'fees': tx.fees,
             'executed_at': tx.executed_at
         }
-        for tx in db.query(Transaction).filter(Transaction.user_id == user.id).order_by(Transaction.executed_at.desc()).all()
-    ]
-    
-    csv_data = ReportGenerator.generate_transactions_csv(transactions)
+        for tx in iter_query_rows(lambda db: db.query(
+            Transaction.symbol, Transaction.type, Transaction.quantity,
+            Transaction.price, Transaction.fees, Transaction.executed_at,
+        ).filter(Transaction.user_id == user_id).order_by(Transaction.executed_at.desc(), Transaction.id.desc()))
+    )
     
-    return Response(
-        content=csv_data,
+    return StreamingResponse(
+        ReportGenerator.stream_transactions_csv(transactions),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=transactions.csv"}
     )
 
+def columnar_rows(dataset: str, user_id: int):
+    """Typed export rows for a dataset, enums flattened to their values"""
+    if dataset == "portfolio":
+        rows = iter_query_rows(lambda db: db.query(
+            Investment.id, Investment.symbol, Investment.asset_type, Investment.units,
+            Investment.avg_buy_price, Investment.cost_basis, Investment.current_value,
+            Investment.last_price, Investment.last_price_at,
+        ).filter(Investment.user_id == user_id).order_by(Investment.id))
+        return ({**row._asdict(), 'asset_type': row.asset_type.value} for row in rows)
+
+    if dataset == "transactions":
+        rows = iter_query_rows(lambda db: db.query(
+            Transaction.id, Transaction.symbol, Transaction.type, Transaction.quantity,
+            Transaction.price, Transaction.fees, Transaction.executed_at, Transaction.investment_id,
+        ).filter(Transaction.user_id == user_id).order_by(Transaction.executed_at.desc(), Transaction.id.desc()))
+        return ({**row._asdict(), 'type': row.type.value} for row in rows)
+
+    rows = iter_query_rows(lambda db: db.query(
+        PortfolioSnapshot.snapshot_date, PortfolioSnapshot.cost_basis,
+        PortfolioSnapshot.current_value, PortfolioSnapshot.breakdown,
+    ).filter(PortfolioSnapshot.user_id == user_id).order_by(PortfolioSnapshot.snapshot_date))
+    return ({**row._asdict(), 'breakdown': list((row.breakdown or {}).items())} for row in rows)
+
+def columnar_export(dataset: str, fmt: str, user: CurrentUser):
+    from app.report_generator import (
+        ReportGenerator, COLUMNAR_LAYOUTS, COLUMNAR_MEDIA_TYPES, COLUMNAR_EXTENSIONS
+    )
+
+    if dataset not in COLUMNAR_LAYOUTS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+
+    return StreamingResponse(
+        ReportGenerator.stream_columnar(dataset, columnar_rows(dataset, user.id), fmt),
+        media_type=COLUMNAR_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={dataset}.{COLUMNAR_EXTENSIONS[fmt]}"}
+    )
+
+@app.get("/reports/{dataset}/parquet")
+def download_parquet(
+    dataset: str,
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Parquet export of portfolio, transactions or snapshots"""
+    return columnar_export(dataset, "parquet", user)
+
+@app.get("/reports/{dataset}/arrow")
+def download_arrow(
+    dataset: str,
+    user: CurrentUser = Depends(get_current_principal)
+):
+    """Arrow IPC stream export of portfolio, transactions or snapshots"""
+    return columnar_export(dataset, "arrow", user)
+
 # ---------- DASHBOARD ROUTES ----------
 @app.get("/dashboard/summary")
-def get_dashboard_summary(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+async def get_dashboard_summary(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_principal_async)
 ):
-    # Portfolio summary
-    investments = db.query(Investment).filter(Investment.user_id == user.id).all()
-    total_investment = sum(inv.cost_basis for inv in investments)
-    total_value = sum(inv.current_value for inv in investments)
+    cached = await not_modified_async(request, response, user.id, "portfolio", "goals", "transactions")
+    if cached:
+        return cached
+
+    # Portfolio and goal totals are maintained by the write paths (SummaryService)
+    summary = await db.run_sync(SummaryService.get_summary, user.id)
+    total_investment = summary["total_cost_basis"]
+    total_value = summary["total_current_value"]
     total_gain = total_value - total_investment
     gain_percent = (total_gain / total_investment * 100) if total_investment > 0 else 0
-    
-    # Goals summary
-    goals = db.query(Goal).filter(Goal.user_id == user.id).all()
-    total_goals = len(goals)
-    active_goals = len([g for g in goals if g.status.value == 'active'])
-    completed_goals = len([g for g in goals if g.status.value == 'completed'])
-    total_goal_target = sum(g.target_amount for g in goals)
-    total_goal_saved = sum(g.saved_amount for g in goals)
+    total_goal_target = summary["goal_target_total"]
+    total_goal_saved = summary["goal_saved_total"]
     
     # Transactions summary
-    recent_transactions = db.query(Transaction).filter(
-        Transaction.user_id == user.id
-    ).order_by(Transaction.executed_at.desc()).limit(5).all()
+    recent_transactions = (await db.scalars(
+        select(Transaction).where(Transaction.user_id == user.id)
+        .order_by(Transaction.executed_at.desc()).limit(5)
+    )).all()
     
     return {
         "portfolio": {
@@ -878,12 +1570,12 @@ def get_dashboard_summary(
             "current_value": round(total_value, 2),
             "total_gain": round(total_gain, 2),
             "gain_percent": round(gain_percent, 2),
-            "holdings_count": len(investments)
+            "holdings_count": summary["holdings_count"]
         },
         "goals": {
-            "total": total_goals,
-            "active": active_goals,
-            "completed": completed_goals,
+            "total": summary["goals_total"],
+            "active": summary["goals_active"],
+            "completed": summary["goals_completed"],
             "total_target": round(total_goal_target, 2),
             "total_saved": round(total_goal_saved, 2),
             "progress_percent": round((total_goal_saved / total_goal_target * 100) if total_goal_target > 0 else 0, 2)
@@ -1,11 +1,41 @@
-import yfinance as yf
 from typing import Dict, List, Optional
-from datetime import datetime
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
 import logging
+import math
+import os
 import time
 
+from app.metrics import external_call
+
 logger = logging.getLogger(__name__)
 
+# NSE/BSE regular session (equity cash segment), Indian Standard Time
+IST = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+# Exchange holidays as comma-separated ISO dates, e.g. "2026-01-26,2026-03-03"
+MARKET_HOLIDAYS = {
+    d.strip() for d in os.getenv("MARKET_HOLIDAYS", "").split(",") if d.strip()
+}
+
+# Relative price move below which an intraday refresh skips the DB write
+PRICE_CHANGE_TOLERANCE = float(os.getenv("PRICE_CHANGE_TOLERANCE", "0.0005"))
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """
+    True while NSE/BSE are in their regular trading session:
+    Monday–Friday, 09:15–15:30 IST, excluding MARKET_HOLIDAYS.
+    """
+    now = now.astimezone(IST) if now and now.tzinfo else (now or datetime.now(IST))
+    if now.weekday() >= 5:
+        return False
+    if now.date().isoformat() in MARKET_HOLIDAYS:
+        return False
+    return MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
 
 def normalize_symbol(symbol: str) -> str:
     """
@@ -27,6 +57,8 @@ def fetch_price_for_symbol(symbol: str) -> Optional[float]:
     2. history(period="5d")  (reliable fallback)
     3. NSE suffix fallback   (if bare symbol fails)
     """
+    import yfinance as yf  # heavy (pulls in pandas): loaded on first price lookup
+
     norm = normalize_symbol(symbol)
 
     candidates = [norm]
@@ -37,7 +69,8 @@ def fetch_price_for_symbol(symbol: str) -> Optional[float]:
         # ── Method 1: fast_info ──────────────────────────────────
         try:
             ticker = yf.Ticker(sym)
-            price = ticker.fast_info.get("last_price") or ticker.fast_info.get("lastPrice")
+            with external_call("yahoo", "fast_info"):
+                price = ticker.fast_info.get("last_price") or ticker.fast_info.get("lastPrice")
             if price and float(price) > 0:
                 logger.info(f"fast_info price for {sym}: {price}")
                 return float(price)
@@ -47,7 +80,8 @@ def fetch_price_for_symbol(symbol: str) -> Optional[float]:
         # ── Method 2: history ────────────────────────────────────
         try:
             ticker = yf.Ticker(sym)
-            hist = ticker.history(period="5d")
+            with external_call("yahoo", "history"):
+                hist = ticker.history(period="5d")
             if not hist.empty:
                 closes = hist["Close"].dropna()
                 if not closes.empty:
@@ -93,22 +127,100 @@ class MarketDataService:
             time.sleep(0.5)
         return prices
 
+    @staticmethod
+    def get_prices_bulk(symbols: List[str]) -> Dict[str, float]:
+        """
+        Prices for many symbols with one yf.download call, keyed like the
+        input (stripped, upper-cased). Symbols the bulk call misses fall
+        back to the sequential per-symbol lookup.
+        """
+        keys = sorted({s.strip().upper() for s in symbols if s and s.strip()})
+        if not keys:
+            return {}
+        import yfinance as yf
+
+        by_ticker = {normalize_symbol(key): key for key in keys}
+        prices: Dict[str, float] = {}
+        try:
+            with external_call("yahoo", "download"):
+                data = yf.download(
+                    list(by_ticker), period="5d", progress=False, threads=True, auto_adjust=False,
+                )
+            closes = data["Close"] if not data.empty else None
+            if closes is not None and getattr(closes, "ndim", 2) == 1:
+                closes = closes.to_frame(name=next(iter(by_ticker)))
+            for ticker, key in by_ticker.items():
+                if closes is None or ticker not in closes:
+                    continue
+                series = closes[ticker].dropna()
+                if not series.empty and float(series.iloc[-1]) > 0:
+                    prices[key] = float(series.iloc[-1])
+        except Exception as e:
+            logger.warning(f"Bulk price download failed, falling back per symbol: {e}")
+
+        missing = [key for key in keys if key not in prices]
+        if missing:
+            prices.update(MarketDataService.get_multiple_prices(missing))
+        logger.info(f"Bulk prices: {len(prices)}/{len(keys)} symbol(s) priced")
+        return prices
+
+    @staticmethod
+    def price_investments(db, investment_ids: List[int]) -> int:
+        """
+        Fetch prices for the given investments' distinct symbols in one bulk
+        call and write last_price/current_value (used after batch creates).
+        """
+        from sqlalchemy import update
+        from app.models import Investment
+        from app.cache import bump_version
+        from app.summary_service import SummaryService
+
+        rows = db.query(
+            Investment.id, Investment.user_id, Investment.symbol, Investment.units,
+        ).filter(Investment.id.in_(investment_ids)).all()
+        if not rows:
+            return 0
+
+        prices = MarketDataService.get_prices_bulk([r.symbol for r in rows])
+        now = datetime.utcnow()
+        changes = []
+        for r in rows:
+            price = prices.get(r.symbol.strip().upper())
+            if price is not None:
+                changes.append({
+                    "id": r.id, "last_price": price,
+                    "current_value": r.units * price, "last_price_at": now,
+                })
+
+        if changes:
+            users = {r.user_id for r in rows}
+            db.execute(update(Investment), changes)
+            SummaryService.refresh_portfolio_totals(db, users)
+            db.commit()
+            bump_version("portfolio", *users)
+        return len(changes)
+
     @staticmethod
     def get_market_data(symbol: str) -> Optional[Dict]:
+        import yfinance as yf
+
         try:
             norm = normalize_symbol(symbol)
             ticker = yf.Ticker(norm)
-            history = ticker.history(period="5d")
+            with external_call("yahoo", "history"):
+                history = ticker.history(period="5d")
 
             if history.empty and "." not in norm:
                 norm = f"{norm}.NS"
                 ticker = yf.Ticker(norm)
-                history = ticker.history(period="5d")
+                with external_call("yahoo", "history"):
+                    history = ticker.history(period="5d")
 
             if history.empty:
                 return None
 
-            info = ticker.info
+            with external_call("yahoo", "info"):
+                info = ticker.info
             closes = history["Close"].dropna()
             current_price = float(closes.iloc[-1])
             previous_close = float(closes.iloc[-2]) if len(closes) > 1 else current_price
@@ -139,6 +251,8 @@ class MarketDataService:
         only makes one API call.
         """
         from app.models import Investment
+        from app.cache import bump_version
+        from app.summary_service import SummaryService
 
         query = db.query(Investment)
         if user_id:
@@ -169,7 +283,74 @@ class MarketDataService:
                 logger.warning(f"No price returned for: {investment.symbol}")
 
         if updated_count > 0:
+            SummaryService.refresh_portfolio_totals(db, (inv.user_id for inv in investments))
             db.commit()
+            bump_version("portfolio", *(inv.user_id for inv in investments))
 
         logger.info(f"Updated {updated_count}/{len(investments)} investments")
         return updated_count
+
+    @staticmethod
+    def refresh_held_prices(db, tolerance: float = PRICE_CHANGE_TOLERANCE) -> Dict[str, int]:
+        """
+        Intraday variant of update_investment_prices.
+        Only symbols with units actually held are fetched, all of them in one
+        bulk download, and rows whose price moved by no more than `tolerance`
+        (relative) are left untouched, so quiet symbols cost zero writes.
+        """
+        from sqlalchemy import update
+        from app.models import Investment
+        from app.cache import bump_version
+        from app.summary_service import SummaryService
+
+        holdings = db.query(
+            Investment.id, Investment.user_id, Investment.symbol, Investment.units,
+            Investment.last_price, Investment.current_value,
+        ).filter(Investment.units > 0).all()
+        if not holdings:
+            return {"symbols": 0, "fetched": 0, "updated": 0, "unchanged": 0}
+
+        unique_symbols = sorted({h.symbol.strip().upper() for h in holdings})
+        logger.info(f"Intraday refresh for {len(unique_symbols)} held symbol(s)")
+
+        prices = MarketDataService.get_prices_bulk(unique_symbols)
+
+        now = datetime.utcnow()
+        changes = []
+        changed_users = set()
+        unchanged = 0
+        for h in holdings:
+            price = prices.get(h.symbol.strip().upper())
+            if price is None:
+                continue
+            if (
+                h.last_price
+                and math.isclose(price, h.last_price, rel_tol=tolerance, abs_tol=0.005)
+                and math.isclose(h.current_value or 0, h.units * h.last_price, rel_tol=1e-9)
+            ):
+                unchanged += 1
+                continue
+            changes.append({
+                "id": h.id,
+                "last_price": price,
+                "current_value": h.units * price,
+                "last_price_at": now,
+            })
+            changed_users.add(h.user_id)
+
+        if changes:
+            db.execute(update(Investment), changes)
+            SummaryService.refresh_portfolio_totals(db, changed_users)
+            db.commit()
+            bump_version("portfolio", *changed_users)
+
+        logger.info(
+            f"Intraday refresh: {len(changes)} updated, {unchanged} unchanged, "
+            f"{len(unique_symbols) - len(prices)} symbol(s) without a price"
+        )
+        return {
+            "symbols": len(unique_symbols),
+            "fetched": len(prices),
+            "updated": len(changes),
+            "unchanged": unchanged,
+        }
@@ -0,0 +1,358 @@
+"""
+metrics.py — request, SQL and external-call metrics in Prometheus format.
+
+MetricsMiddleware times every HTTP request and labels it with the matched
+route template (/goals/{goal_id}, not /goals/17), so label cardinality stays
+bounded. A request ends with its last response body chunk; BackgroundTasks
+that run after it are not charged to it. SQLAlchemy cursor events count queries and DB time against the
+request being served (a contextvar, which follows sync handlers into the
+threadpool and async sessions into their greenlets), and external_call()
+does the same for Yahoo Finance calls.
+
+Requests slower than SLOW_REQUEST_MS are logged with their query breakdown:
+each distinct statement with its count and total time, so an N+1 shows up
+as one statement executed N times.
+
+Metrics are per process. render() produces the text exposition served
+at /metrics, including pool_stats() and the render pool's counters.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+# Statements listed per slow request, by total time
+SLOW_REQUEST_TOP_STATEMENTS = 10
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # labels -> [per-bucket counts (non-cumulative), sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS", ("method", "route"))
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed (all work in this process)")
+DB_TIME = Counter("db_query_seconds_total", "Time spent in SQL statements (all work in this process)")
+EXTERNAL_LATENCY = Histogram(
+    "external_call_duration_seconds", "Latency of calls to external services",
+    ("service", "operation"), EXTERNAL_BUCKETS,
+)
+EXTERNAL_ERRORS = Counter(
+    "external_call_errors_total", "External calls that raised", ("service", "operation"),
+)
+
+METRICS = (
+    REQUEST_LATENCY, REQUESTS, REQUEST_QUERIES, REQUEST_DB_TIME, SLOW_REQUESTS,
+    DB_QUERIES, DB_TIME, EXTERNAL_LATENCY, EXTERNAL_ERRORS,
+)
+
+
+@dataclass
+class RequestStats:
+    """What one request spent its time on; mutated in place from any thread"""
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: Dict[str, list] = field(default_factory=dict)  # statement -> [count, seconds]
+    external: Dict[str, list] = field(default_factory=dict)  # service.operation -> [count, seconds]
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Set once the response is sent; background tasks are not charged to it
+    closed: bool = False
+
+    def add_query(self, statement: str, seconds: float):
+        with self.lock:
+            if self.closed:
+                return
+            self.queries += 1
+            self.db_seconds += seconds
+            entry = self.statements.setdefault(statement, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_external(self, name: str, seconds: float):
+        with self.lock:
+            if self.closed:
+                return
+            entry = self.external.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists / VALUES rows: "(?, ?, ?)" or "(%(p_1)s, %(p_2)s)" -> "(...)"
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+)\s*\)")
+
+
+def normalize_statement(statement: str, limit: int = 300) -> str:
+    statement = _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERIES.inc()
+    DB_TIME.inc(amount=elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.add_query(normalize_statement(statement), elapsed)
+
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """Time a call to an external service (and charge it to the current request)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_ERRORS.inc(service, operation)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        EXTERNAL_LATENCY.observe(elapsed, service, operation)
+        stats = _current.get()
+        if stats is not None:
+            stats.add_external(f"{service}.{operation}", elapsed)
+
+
+class MetricsMiddleware:
+    """Per-route latency, status, query count and DB time; logs slow requests"""
+
+    def __init__(self, app: ASGIApp, slow_request_ms: float = SLOW_REQUEST_MS) -> None:
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        def finish() -> None:
+            with stats.lock:
+                if stats.closed:
+                    return
+                stats.closed = True
+            self._record(scope, status_code, time.perf_counter() - started, stats)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            # The request ends with its last body chunk; BackgroundTasks run
+            # after that and must not count towards its latency or queries
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                _current.set(None)
+                finish()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            # Errors and disconnects that never sent a complete response
+            finish()
+
+    def _record(self, scope: Scope, status_code: int, elapsed: float, stats: RequestStats):
+        method = scope["method"]
+        route = scope.get("route")
+        # Unmatched paths share one label so scanners cannot blow up cardinality
+        route = getattr(route, "path", None) or "unmatched"
+
+        REQUEST_LATENCY.observe(elapsed, method, route)
+        REQUESTS.inc(method, route, str(status_code))
+        REQUEST_QUERIES.observe(stats.queries, method, route)
+        REQUEST_DB_TIME.observe(stats.db_seconds, method, route)
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            SLOW_REQUESTS.inc(method, route)
+            logger.warning(slow_request_report(method, scope.get("path", route), route, status_code, elapsed, stats))
+
+
+def slow_request_report(method: str, path: str, route: str, status_code: int, elapsed: float, stats: RequestStats) -> str:
+    with stats.lock:
+        statements = sorted(stats.statements.items(), key=lambda item: item[1][1], reverse=True)
+        external = sorted(stats.external.items(), key=lambda item: item[1][1], reverse=True)
+        queries, db_seconds = stats.queries, stats.db_seconds
+
+    lines = [
+        f"Slow request {method} {path} (route {route}) -> {status_code} in {elapsed * 1000:.0f} ms: "
+        f"{queries} queries, {db_seconds * 1000:.0f} ms in DB, "
+        f"{sum(seconds for _, (_, seconds) in external) * 1000:.0f} ms external"
+    ]
+    for statement, (count, seconds) in statements[:SLOW_REQUEST_TOP_STATEMENTS]:
+        lines.append(f"  {count:>4}x {seconds * 1000:>8.1f} ms  {statement}")
+    if len(statements) > SLOW_REQUEST_TOP_STATEMENTS:
+        lines.append(f"  ... {len(statements) - SLOW_REQUEST_TOP_STATEMENTS} more distinct statement(s)")
+    for name, (count, seconds) in external:
+        lines.append(f"  {count:>4}x {seconds * 1000:>8.1f} ms  external {name}")
+    return "\n".join(lines)
+
+
+def _gauge(name: str, help: str, samples: List[Tuple[Dict[str, str], float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+    return lines
+
+
+def _pool_lines(pool_stats: Callable[[], Dict]) -> List[str]:
+    pools = {name: s for name, s in pool_stats().items() if "checkouts" in s}
+    if not pools:
+        return []
+    lines = []
+    for key, name, help, kind in (
+        ("checked_out", "db_pool_checked_out", "Connections currently checked out", "gauge"),
+        ("idle", "db_pool_idle", "Idle connections in the pool", "gauge"),
+        ("size", "db_pool_size", "Configured pool size", "gauge"),
+        ("checkouts", "db_pool_checkouts_total", "Connection checkouts", "counter"),
+        ("timeouts", "db_pool_timeouts_total", "Checkouts that timed out waiting", "counter"),
+    ):
+        lines += _gauge(name, help, [({"pool": p}, s[key]) for p, s in pools.items()], kind)
+    lines += _gauge(
+        "db_pool_wait_seconds_max", "Longest checkout wait so far",
+        [({"pool": p}, s["wait_max_ms"] / 1000) for p, s in pools.items()],
+    )
+    return lines
+
+
+def _render_pool_lines(render_stats: Callable[[], Dict]) -> List[str]:
+    stats = render_stats()
+    reports = stats["reports"]
+    lines = _gauge("render_pool_in_use", "Report renders running", [({}, stats["in_use"])])
+    lines += _gauge("render_pool_waiting", "Report renders queued for a slot", [({}, stats["waiting"])])
+    lines += _gauge("render_pool_concurrency", "Report render slots", [({}, stats["concurrency"])])
+    lines += _gauge(
+        "report_renders_total", "Reports rendered",
+        [({"report": r}, s["count"]) for r, s in sorted(reports.items())], "counter",
+    )
+    lines += _gauge(
+        "report_render_seconds_total", "Time spent rendering reports",
+        [({"report": r}, s["total_seconds"]) for r, s in sorted(reports.items())], "counter",
+    )
+    lines += _gauge(
+        "report_render_peak_rss_megabytes", "Highest RSS sampled while rendering",
+        [({"report": r}, s["peak_rss_mb"]) for r, s in sorted(reports.items())],
+    )
+    lines += _gauge(
+        "report_render_max_rss_growth_megabytes", "Largest RSS growth during a single render",
+        [({"report": r}, s["max_rss_growth_mb"]) for r, s in sorted(reports.items())],
+    )
+    return lines
+
+
+def render(pool_stats: Optional[Callable[[], Dict]] = None, render_stats: Optional[Callable[[], Dict]] = None) -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines += metric.render()
+    if pool_stats is not None:
+        lines += _pool_lines(pool_stats)
+    if render_stats is not None:
+        lines += _render_pool_lines(render_stats)
+    return "\n".join(lines) + "\n"
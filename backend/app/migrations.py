@@ -0,0 +1,315 @@
+"""
+migrations.py — versioned schema migrations, applied once per deploy.
+
+Each migration is a numbered function that receives a connection inside
+the upgrade transaction. Applied versions are recorded in schema_version,
+so re-running is a no-op. On PostgreSQL the run holds an advisory lock,
+which keeps concurrently starting containers from racing each other.
+
+Migrations are frozen once shipped: they spell out their DDL rather than
+reading the models, so add a new numbered function instead of editing an
+old one, and keep the DDL idempotent (IF NOT EXISTS) so a database created
+by the old create_all bootstrap upgrades cleanly.
+
+Usage:
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations status     # list applied / pending
+"""
+import logging
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, text
+from sqlalchemy.engine import Connection
+
+from app.database import disable_statement_timeout, engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the migration lock in pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 7341926
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# Enum types of the baseline schema. PostgreSQL gets named types; other
+# databases a VARCHAR as wide as the longest value, as create_all made them.
+BASELINE_ENUMS = {
+    "riskprofile": ("conservative", "moderate", "aggressive"),
+    "kycstatus": ("unverified", "verified"),
+    "goaltype": ("retirement", "home", "education", "custom"),
+    "goalstatus": ("active", "paused", "completed"),
+    "assettype": ("stock", "etf", "mutual_fund", "bond", "cash"),
+    "transactiontype": ("buy", "sell", "dividend", "contribution", "withdrawal"),
+}
+
+
+def _id_column(conn: Connection) -> str:
+    return "SERIAL PRIMARY KEY" if conn.dialect.name == "postgresql" else "INTEGER PRIMARY KEY"
+
+
+def _0001_baseline(conn: Connection):
+    """Tables as created by the original create_all bootstrap"""
+    postgres = conn.dialect.name == "postgresql"
+    enum = {}
+    for name, values in BASELINE_ENUMS.items():
+        if postgres:
+            labels = ", ".join(f"'{value}'" for value in values)
+            conn.execute(text(f"""
+                DO $$ BEGIN
+                    CREATE TYPE {name} AS ENUM ({labels});
+                EXCEPTION WHEN duplicate_object THEN NULL;
+                END $$
+            """))
+            enum[name] = name
+        else:
+            enum[name] = f"VARCHAR({max(len(value) for value in values)})"
+
+    id_column = _id_column(conn)
+    for statement in (
+        f"""CREATE TABLE IF NOT EXISTS users (
+            id {id_column},
+            name VARCHAR NOT NULL,
+            email VARCHAR NOT NULL,
+            password VARCHAR NOT NULL,
+            risk_profile {enum["riskprofile"]},
+            kyc_status {enum["kycstatus"]},
+            created_at TIMESTAMP
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS goals (
+            id {id_column},
+            title VARCHAR NOT NULL,
+            goal_type {enum["goaltype"]},
+            target_amount DOUBLE PRECISION NOT NULL,
+            target_date DATE,
+            monthly_contribution DOUBLE PRECISION,
+            saved_amount DOUBLE PRECISION,
+            status {enum["goalstatus"]},
+            created_at TIMESTAMP,
+            user_id INTEGER REFERENCES users (id) ON DELETE CASCADE
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS investments (
+            id {id_column},
+            asset_type {enum["assettype"]} NOT NULL,
+            symbol VARCHAR NOT NULL,
+            units DOUBLE PRECISION NOT NULL,
+            avg_buy_price DOUBLE PRECISION NOT NULL,
+            cost_basis DOUBLE PRECISION NOT NULL,
+            current_value DOUBLE PRECISION,
+            last_price DOUBLE PRECISION,
+            last_price_at TIMESTAMP,
+            user_id INTEGER REFERENCES users (id) ON DELETE CASCADE
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS transactions (
+            id {id_column},
+            symbol VARCHAR NOT NULL,
+            type {enum["transactiontype"]} NOT NULL,
+            quantity DOUBLE PRECISION NOT NULL,
+            price DOUBLE PRECISION NOT NULL,
+            fees DOUBLE PRECISION,
+            executed_at TIMESTAMP,
+            user_id INTEGER REFERENCES users (id) ON DELETE CASCADE,
+            investment_id INTEGER REFERENCES investments (id)
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS recommendations (
+            id {id_column},
+            title VARCHAR NOT NULL,
+            recommendation_text TEXT NOT NULL,
+            suggested_allocation JSON,
+            created_at TIMESTAMP,
+            user_id INTEGER REFERENCES users (id) ON DELETE CASCADE
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS simulations (
+            id {id_column},
+            scenario_name VARCHAR NOT NULL,
+            assumptions JSON NOT NULL,
+            results JSON NOT NULL,
+            created_at TIMESTAMP,
+            user_id INTEGER REFERENCES users (id) ON DELETE CASCADE,
+            goal_id INTEGER REFERENCES goals (id) ON DELETE SET NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_id ON goals (id)",
+        "CREATE INDEX IF NOT EXISTS ix_investments_id ON investments (id)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions (id)",
+        "CREATE INDEX IF NOT EXISTS ix_recommendations_id ON recommendations (id)",
+        "CREATE INDEX IF NOT EXISTS ix_simulations_id ON simulations (id)",
+    ):
+        conn.execute(text(statement))
+
+
+def _0002_hot_path_indexes(conn: Connection):
+    """Per-user list/ORDER BY indexes for dashboard and paginated reads"""
+    for statement in (
+        # Keyset pagination orders by (executed_at, id) within a user
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_executed_at "
+        "ON transactions (user_id, executed_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_recommendations_user_created_at "
+        "ON recommendations (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_simulations_user_created_at "
+        "ON simulations (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_investments_user_id ON investments (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_investments_symbol ON investments (symbol)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_user_id ON goals (user_id)",
+    ):
+        conn.execute(text(statement))
+
+
+def _0003_user_summaries(conn: Connection):
+    """Per-user dashboard aggregates, backfilled from investments and goals"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS user_summaries (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+            total_cost_basis DOUBLE PRECISION NOT NULL DEFAULT 0,
+            total_current_value DOUBLE PRECISION NOT NULL DEFAULT 0,
+            holdings_count INTEGER NOT NULL DEFAULT 0,
+            goals_total INTEGER NOT NULL DEFAULT 0,
+            goals_active INTEGER NOT NULL DEFAULT 0,
+            goals_paused INTEGER NOT NULL DEFAULT 0,
+            goals_completed INTEGER NOT NULL DEFAULT 0,
+            goal_target_total DOUBLE PRECISION NOT NULL DEFAULT 0,
+            goal_saved_total DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP
+        )
+    """))
+    conn.execute(text("DELETE FROM user_summaries"))
+    conn.execute(text("""
+        INSERT INTO user_summaries (
+            user_id, total_cost_basis, total_current_value, holdings_count,
+            goals_total, goals_active, goals_paused, goals_completed,
+            goal_target_total, goal_saved_total, updated_at
+        )
+        SELECT
+            u.id,
+            COALESCE((SELECT SUM(i.cost_basis) FROM investments i WHERE i.user_id = u.id), 0),
+            COALESCE((SELECT SUM(i.current_value) FROM investments i WHERE i.user_id = u.id), 0),
+            (SELECT COUNT(*) FROM investments i WHERE i.user_id = u.id),
+            (SELECT COUNT(*) FROM goals g WHERE g.user_id = u.id),
+            (SELECT COUNT(*) FROM goals g WHERE g.user_id = u.id AND g.status = 'active'),
+            (SELECT COUNT(*) FROM goals g WHERE g.user_id = u.id AND g.status = 'paused'),
+            (SELECT COUNT(*) FROM goals g WHERE g.user_id = u.id AND g.status = 'completed'),
+            COALESCE((SELECT SUM(g.target_amount) FROM goals g WHERE g.user_id = u.id), 0),
+            COALESCE((SELECT SUM(g.saved_amount) FROM goals g WHERE g.user_id = u.id), 0),
+            CURRENT_TIMESTAMP
+        FROM users u
+    """))
+
+
+def _0004_positions(conn: Connection):
+    """Ledger position checkpoints (filled lazily / by `python -m app.ledger rebuild`)"""
+    id_column = _id_column(conn)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS positions (
+            id {id_column},
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            investment_id INTEGER REFERENCES investments (id) ON DELETE SET NULL,
+            symbol VARCHAR NOT NULL,
+            units DOUBLE PRECISION NOT NULL DEFAULT 0,
+            cost_basis DOUBLE PRECISION NOT NULL DEFAULT 0,
+            realized_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+            dividends DOUBLE PRECISION NOT NULL DEFAULT 0,
+            fees DOUBLE PRECISION NOT NULL DEFAULT 0,
+            lots JSON NOT NULL,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            last_transaction_id INTEGER,
+            last_executed_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            CONSTRAINT uq_positions_user_symbol UNIQUE (user_id, symbol)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_positions_id ON positions (id)"))
+
+
+def _0005_portfolio_snapshots(conn: Connection):
+    """Daily valuation snapshots (created by create_all before migrations existed)"""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            id {_id_column(conn)},
+            snapshot_date DATE NOT NULL,
+            cost_basis DOUBLE PRECISION NOT NULL DEFAULT 0,
+            current_value DOUBLE PRECISION NOT NULL DEFAULT 0,
+            breakdown JSON NOT NULL,
+            created_at TIMESTAMP,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            CONSTRAINT uq_portfolio_snapshots_user_date UNIQUE (user_id, snapshot_date)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_portfolio_snapshots_id ON portfolio_snapshots (id)"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _0001_baseline),
+    (2, "hot-path composite indexes", _0002_hot_path_indexes),
+    (3, "user dashboard summaries", _0003_user_summaries),
+    (4, "ledger position checkpoints", _0004_positions),
+    (5, "portfolio valuation snapshots", _0005_portfolio_snapshots),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def applied_versions(conn: Connection) -> set:
+    schema_version.create(bind=conn, checkfirst=True)
+    return {row.version for row in conn.execute(schema_version.select())}
+
+
+def pending_migrations() -> List[Tuple[int, str]]:
+    """(version, description) of migrations not yet applied"""
+    with engine.connect() as conn:
+        if not conn.dialect.has_table(conn, "schema_version"):
+            return [(version, description) for version, description, _ in MIGRATIONS]
+        applied = {row.version for row in conn.execute(schema_version.select())}
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade() -> int:
+    """Apply all pending migrations in order; returns how many ran"""
+    ran = 0
+    with engine.begin() as conn:
+        disable_statement_timeout(conn)
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+        applied = applied_versions(conn)
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"Applying migration {version:04d}: {description}")
+            migrate(conn)
+            conn.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow(),
+            ))
+            ran += 1
+
+    logger.info(f"Schema at version {LATEST_VERSION} ({ran} migration(s) applied)")
+    return ran
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    command = argv[0] if argv else "upgrade"
+
+    if command == "upgrade":
+        upgrade()
+        return 0
+    if command == "status":
+        pending = {version for version, _ in pending_migrations()}
+        for version, description, _ in MIGRATIONS:
+            state = "pending" if version in pending else "applied"
+            print(f"{version:04d}  {state:8}  {description}")
+        return 0
+
+    print(f"Unknown command {command!r}; expected 'upgrade' or 'status'")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
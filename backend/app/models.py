@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum as SQLEnum, Date, JSON, Text, DECIMAL, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum as SQLEnum, Date, JSON, Text, DECIMAL, TIMESTAMP, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -62,6 +62,9 @@ class User(Base):
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete")
     recommendations = relationship("Recommendation", back_populates="user", cascade="all, delete")
     simulations = relationship("Simulation", back_populates="user", cascade="all, delete")
+    snapshots = relationship("PortfolioSnapshot", back_populates="user", cascade="all, delete")
+    summary = relationship("UserSummary", back_populates="user", uselist=False, cascade="all, delete")
+    positions = relationship("Position", back_populates="user", cascade="all, delete")
 
 
 class Goal(Base):
@@ -77,7 +80,7 @@ class Goal(Base):
     status = Column(SQLEnum(GoalStatus), default=GoalStatus.active)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     user = relationship("User", back_populates="goals")
     simulations = relationship("Simulation", back_populates="goal", cascade="all, delete")
 
@@ -87,7 +90,7 @@ class Investment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     asset_type = Column(SQLEnum(AssetType), nullable=False)
-    symbol = Column(String, nullable=False)
+    symbol = Column(String, nullable=False, index=True)
     units = Column(Float, nullable=False)
     avg_buy_price = Column(Float, nullable=False)
     cost_basis = Column(Float, nullable=False)
@@ -95,7 +98,7 @@ class Investment(Base):
     last_price = Column(Float, default=0)
     last_price_at = Column(DateTime, nullable=True)
 
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     user = relationship("User", back_populates="investments")
 
     transactions = relationship("Transaction", back_populates="investment")
@@ -103,6 +106,10 @@ class Investment(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Indexes are created by app.migrations; keep the two in step
+    __table_args__ = (
+        Index("ix_transactions_user_executed_at", "user_id", "executed_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, nullable=False)
@@ -121,6 +128,9 @@ class Transaction(Base):
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
+    __table_args__ = (
+        Index("ix_recommendations_user_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -134,6 +144,9 @@ class Recommendation(Base):
 
 class Simulation(Base):
     __tablename__ = "simulations"
+    __table_args__ = (
+        Index("ix_simulations_user_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     scenario_name = Column(String, nullable=False)
@@ -146,3 +159,70 @@ class Simulation(Base):
 
     user = relationship("User", back_populates="simulations")
     goal = relationship("Goal", back_populates="simulations")
+
+
+class PortfolioSnapshot(Base):
+    __tablename__ = "portfolio_snapshots"
+    # (user_id, snapshot_date) doubles as the index for time-range reads
+    __table_args__ = (
+        UniqueConstraint("user_id", "snapshot_date", name="uq_portfolio_snapshots_user_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_date = Column(Date, nullable=False)
+    cost_basis = Column(Float, nullable=False, default=0)
+    current_value = Column(Float, nullable=False, default=0)
+    breakdown = Column(JSON, nullable=False)  # {asset_type: {"cost_basis": .., "current_value": ..}}
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user = relationship("User", back_populates="snapshots")
+
+
+class UserSummary(Base):
+    """Per-user dashboard totals, kept in step by the write paths (see SummaryService)"""
+    __tablename__ = "user_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_cost_basis = Column(Float, nullable=False, default=0)
+    total_current_value = Column(Float, nullable=False, default=0)
+    holdings_count = Column(Integer, nullable=False, default=0)
+    goals_total = Column(Integer, nullable=False, default=0)
+    goals_active = Column(Integer, nullable=False, default=0)
+    goals_paused = Column(Integer, nullable=False, default=0)
+    goals_completed = Column(Integer, nullable=False, default=0)
+    goal_target_total = Column(Float, nullable=False, default=0)
+    goal_saved_total = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", back_populates="summary")
+
+
+class Position(Base):
+    """
+    Ledger checkpoint for one (user, symbol): the state after applying every
+    transaction up to (last_executed_at, last_transaction_id). See LedgerService.
+    """
+    __tablename__ = "positions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "symbol", name="uq_positions_user_symbol"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, nullable=False)  # normalized: stripped, upper-case
+    units = Column(Float, nullable=False, default=0)
+    cost_basis = Column(Float, nullable=False, default=0)  # of the open lots, buy fees included
+    realized_pnl = Column(Float, nullable=False, default=0)
+    dividends = Column(Float, nullable=False, default=0)
+    fees = Column(Float, nullable=False, default=0)
+    lots = Column(JSON, nullable=False)  # open FIFO lots: [[units, unit_cost], ...]
+    transaction_count = Column(Integer, nullable=False, default=0)
+    last_transaction_id = Column(Integer, nullable=True)
+    last_executed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    investment_id = Column(Integer, ForeignKey("investments.id", ondelete="SET NULL"), nullable=True)
+
+    user = relationship("User", back_populates="positions")
+    investment = relationship("Investment")
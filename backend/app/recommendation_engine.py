@@ -1,7 +1,11 @@
 from typing import Dict, List
 from app.models import User, Investment, Goal, RiskProfile
+from app.cache import VersionedCache, version_stamp
 from sqlalchemy.orm import Session
 
+# Per-user rebalance results, valid until holdings, prices or risk profile change
+_rebalance_cache = VersionedCache(maxsize=2048)
+
 
 class RecommendationEngine:
     """Generate personalized investment recommendations based on risk profile"""
@@ -25,6 +29,18 @@ class RecommendationEngine:
         }
     }
 
+    # Asset type -> allocation bucket used by ALLOCATIONS
+    ASSET_CLASSES = ["stocks", "bonds", "cash"]
+    ASSET_CLASS_OF = {
+        "stock": "stocks",
+        "etf": "stocks",
+        "mutual_fund": "stocks",
+        "bond": "bonds",
+        "cash": "cash",
+    }
+    # Exchange-traded instruments trade in whole units; funds/bonds allow 3 decimals
+    WHOLE_UNIT_TYPES = {"stock", "etf"}
+
     @staticmethod
     def get_recommended_allocation(user: User) -> Dict[str, int]:
         """Get recommended asset allocation for user"""
@@ -90,6 +106,183 @@ class RecommendationEngine:
             "current_allocation": {k: round(v, 2) for k, v in current.items()}
         }
 
+    @staticmethod
+    def get_cached_rebalance_suggestions(db: Session, user: User) -> Dict:
+        """
+        get_rebalance_suggestions served from a per-user cache.
+        The entry is tagged with the user's portfolio/profile version taken
+        before computing, so any write that lands meanwhile forces a recompute.
+        """
+        version = version_stamp(user.id, "portfolio", "profile")
+        cached = _rebalance_cache.get(user.id, version)
+        if cached is not None:
+            return cached
+
+        result = RecommendationEngine.get_rebalance_suggestions(db, user)
+        _rebalance_cache.set(user.id, version, result)
+        return result
+
+    @staticmethod
+    def plan_rebalance_trades(
+        db: Session,
+        user: User,
+        cash_available: float = 0.0,
+        min_trade_value: float = 500.0,
+    ) -> Dict:
+        """
+        Turn the recommended allocation into per-symbol buy/sell orders.
+
+        Lots are folded into one position per symbol, each asset-class gap is
+        spread over that class's positions in proportion to their value, and
+        orders are sized in units at last_price. Orders below min_trade_value
+        are dropped, and buys are scaled down so they never exceed sell
+        proceeds plus cash_available. Uninvested cash counts toward the
+        "cash" class, so both reported allocations sum to 100%. Everything
+        runs as numpy array ops over the holdings, so the cost is one query
+        plus O(n) vector work.
+        """
+        import numpy as np
+
+        engine = RecommendationEngine
+        recommended = engine.get_recommended_allocation(user)
+
+        rows = db.query(
+            Investment.symbol,
+            Investment.asset_type,
+            Investment.units,
+            Investment.last_price,
+            Investment.current_value,
+        ).filter(Investment.user_id == user.id).all()
+
+        plan = {
+            "trades": [],
+            "unplaced": [],
+            "recommended_allocation": recommended,
+            "current_allocation": {c: 0.0 for c in engine.ASSET_CLASSES},
+            "projected_allocation": {c: 0.0 for c in engine.ASSET_CLASSES},
+            "total_buy": 0.0,
+            "total_sell": 0.0,
+            "cash_available": round(cash_available, 2),
+            "cash_remaining": round(cash_available, 2),
+            "min_trade_value": min_trade_value,
+        }
+        if not rows:
+            if cash_available > 0:
+                plan["current_allocation"]["cash"] = plan["projected_allocation"]["cash"] = 100.0
+            return plan
+
+        symbols = np.array([r.symbol.strip().upper() for r in rows])
+        types = np.array([
+            r.asset_type.value if hasattr(r.asset_type, "value") else str(r.asset_type)
+            for r in rows
+        ])
+        units = np.array([r.units or 0.0 for r in rows], dtype=float)
+        last_price = np.array([r.last_price or 0.0 for r in rows], dtype=float)
+        current_value = np.array([r.current_value or 0.0 for r in rows], dtype=float)
+
+        # Fall back to value/units where no live price has been fetched yet
+        with np.errstate(divide="ignore", invalid="ignore"):
+            implied = np.where(units > 0, current_value / units, 0.0)
+        price = np.where(last_price > 0, last_price, implied)
+        lot_value = units * price
+
+        # ── Fold lots into one position per symbol ───────────────────────
+        uniq, first_idx, inverse = np.unique(symbols, return_index=True, return_inverse=True)
+        pos_units = np.bincount(inverse, weights=units, minlength=len(uniq))
+        pos_value = np.bincount(inverse, weights=lot_value, minlength=len(uniq))
+        pos_type = types[first_idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pos_price = np.where(pos_units > 0, pos_value / pos_units, 0.0)
+        tradable = pos_price > 0
+
+        class_lookup = {c: i for i, c in enumerate(engine.ASSET_CLASSES)}
+        pos_class = np.array([
+            class_lookup[engine.ASSET_CLASS_OF.get(t, "stocks")] for t in pos_type
+        ])
+        whole_units = np.isin(pos_type, list(engine.WHOLE_UNIT_TYPES))
+
+        # ── Per-class gap between target and current value ───────────────
+        n_classes = len(engine.ASSET_CLASSES)
+        class_value = np.bincount(pos_class, weights=pos_value, minlength=n_classes)
+        portfolio_value = class_value.sum() + cash_available
+        if portfolio_value <= 0:
+            return plan
+
+        # Uninvested cash already fills part of the cash target
+        cash_class = np.zeros(n_classes)
+        cash_class[class_lookup["cash"]] = 1.0
+        target_pct = np.array([recommended.get(c, 0) for c in engine.ASSET_CLASSES], dtype=float)
+        class_gap = target_pct / 100 * portfolio_value - (class_value + cash_class * cash_available)
+
+        # Spread each class gap over its tradable positions by value weight;
+        # positions worth nothing yet share the gap equally.
+        tradable_value = np.bincount(pos_class, weights=np.where(tradable, pos_value, 0.0), minlength=n_classes)
+        tradable_count = np.bincount(pos_class, weights=tradable.astype(float), minlength=n_classes)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(
+                tradable_value[pos_class] > 0,
+                pos_value / tradable_value[pos_class],
+                1.0 / np.maximum(tradable_count[pos_class], 1),
+            )
+        weight = np.where(tradable, weight, 0.0)
+
+        def size_orders(order_value):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                raw = np.where(tradable, order_value / pos_price, 0.0)
+            # Truncate toward zero: sells never exceed holdings, buys never overshoot
+            qty = np.where(whole_units, np.trunc(raw), np.trunc(raw * 1000) / 1000)
+            qty = np.maximum(qty, -pos_units)
+            value = qty * pos_price
+            small = np.abs(value) < min_trade_value
+            return np.where(small, 0.0, qty), np.where(small, 0.0, value)
+
+        qty, value = size_orders(class_gap[pos_class] * weight)
+
+        # ── Cash constraint: buys funded by sells + available cash ───────
+        total_sell = -value[value < 0].sum()
+        budget = total_sell + cash_available
+        total_buy = value[value > 0].sum()
+        if total_buy > budget:
+            scale = budget / total_buy if total_buy > 0 else 0.0
+            scaled = np.where(value > 0, value * scale, value)
+            qty, value = size_orders(scaled)
+            total_sell = -value[value < 0].sum()
+            total_buy = value[value > 0].sum()
+
+        # ── Assemble plan ─────────────────────────────────────────────────
+        for i in np.flatnonzero(qty):
+            plan["trades"].append({
+                "symbol": str(uniq[i]),
+                "asset_type": str(pos_type[i]),
+                "asset_class": engine.ASSET_CLASSES[pos_class[i]],
+                "action": "buy" if qty[i] > 0 else "sell",
+                "units": round(float(abs(qty[i])), 3),
+                "price": round(float(pos_price[i]), 2),
+                "value": round(float(abs(value[i])), 2),
+            })
+
+        # Gaps in classes the user holds nothing tradable in need a new position
+        placed = np.bincount(pos_class, weights=value, minlength=n_classes)
+        for c, name in enumerate(engine.ASSET_CLASSES):
+            if tradable_count[c] == 0 and class_gap[c] >= min_trade_value:
+                plan["unplaced"].append({"asset_class": name, "amount": round(float(class_gap[c]), 2)})
+
+        cash_remaining = budget - total_buy
+        current = class_value + cash_class * cash_available
+        projected = class_value + placed + cash_class * cash_remaining
+        plan["current_allocation"] = {
+            name: round(float(current[c] / portfolio_value * 100), 2)
+            for c, name in enumerate(engine.ASSET_CLASSES)
+        }
+        plan["projected_allocation"] = {
+            name: round(float(projected[c] / portfolio_value * 100), 2)
+            for c, name in enumerate(engine.ASSET_CLASSES)
+        }
+        plan["total_buy"] = round(float(total_buy), 2)
+        plan["total_sell"] = round(float(total_sell), 2)
+        plan["cash_remaining"] = round(float(cash_remaining), 2)
+        return plan
+
     @staticmethod
     def generate_goal_recommendations(db: Session, user: User, goal: Goal) -> str:
         """Generate recommendations for achieving a specific goal"""
@@ -106,8 +299,77 @@ class RecommendationEngine:
         else:
             monthly_needed = amount_needed
 
+        return RecommendationEngine._goal_recommendation_text(
+            user, goal.title, amount_needed, months_remaining, monthly_needed
+        )
+
+    @staticmethod
+    def generate_goal_recommendations_batch(db: Session, user: User) -> List[Dict]:
+        """
+        Recommendations for every goal of the user from one query.
+        Months remaining and required monthly amounts are computed for all
+        goals at once as numpy arrays; the text is then filled per goal.
+        """
+        from datetime import datetime
+        import numpy as np
+
+        goals = db.query(
+            Goal.id, Goal.title, Goal.target_amount, Goal.saved_amount,
+            Goal.target_date, Goal.status,
+        ).filter(Goal.user_id == user.id).order_by(Goal.id).all()
+        if not goals:
+            return []
+
+        today = datetime.now().date()
+        has_date = np.array([g.target_date is not None for g in goals])
+        target_year = np.array([g.target_date.year if g.target_date else today.year for g in goals])
+        target_month = np.array([g.target_date.month if g.target_date else today.month for g in goals])
+        target = np.array([g.target_amount or 0.0 for g in goals], dtype=float)
+        saved = np.array([g.saved_amount or 0.0 for g in goals], dtype=float)
+
+        months_remaining = np.where(
+            has_date,
+            np.maximum(0, (target_year - today.year) * 12 + (target_month - today.month)),
+            0,
+        )
+        amount_needed = target - saved
+        monthly_needed = np.where(
+            months_remaining > 0,
+            amount_needed / np.maximum(months_remaining, 1),
+            amount_needed,
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = np.where(target > 0, saved / target * 100, 0.0)
+
+        results = []
+        for i, g in enumerate(goals):
+            results.append({
+                "goal_id": g.id,
+                "title": g.title,
+                "status": g.status.value if hasattr(g.status, "value") else g.status,
+                "target_amount": round(float(target[i]), 2),
+                "saved_amount": round(float(saved[i]), 2),
+                "amount_needed": round(float(max(amount_needed[i], 0)), 2),
+                "months_remaining": int(months_remaining[i]),
+                "monthly_needed": round(float(max(monthly_needed[i], 0)), 2),
+                "progress_percent": round(float(progress[i]), 2),
+                "recommendation": RecommendationEngine._goal_recommendation_text(
+                    user, g.title, float(amount_needed[i]),
+                    int(months_remaining[i]), float(monthly_needed[i]),
+                ),
+            })
+        return results
+
+    @staticmethod
+    def _goal_recommendation_text(
+        user: User,
+        title: str,
+        amount_needed: float,
+        months_remaining: int,
+        monthly_needed: float,
+    ) -> str:
         # Simple recommendation text
-        rec_text = f"To achieve your {goal.title} goal:\n\n"
+        rec_text = f"To achieve your {title} goal:\n\n"
         
         if amount_needed <= 0:
             rec_text += "✅ Congratulations! You've already reached this goal!\n"
@@ -0,0 +1,149 @@
+"""
+render_pool.py — dedicated, bounded executor for CPU-heavy report rendering.
+
+Renders run on their own small thread pool instead of FastAPI's shared
+one, so a burst of PDF downloads cannot starve other sync endpoints.
+At most RENDER_CONCURRENCY renders run at once; further requests wait up
+to RENDER_QUEUE_TIMEOUT seconds (and at most RENDER_MAX_QUEUE of them
+wait) before being turned away with RenderBusy, which the API maps to
+503 + Retry-After.
+
+Each render's wall time and memory are logged and aggregated per report
+name in render_stats(). Memory is sampled from /proc/self/statm every
+RENDER_RSS_SAMPLE_SECONDS while the render runs: the highest RSS seen and
+its growth over the RSS at the start. ru_maxrss cannot be used for this,
+as it is the process's lifetime high-water mark. Growth includes anything
+rendering alongside, so with RENDER_CONCURRENCY > 1 it is an upper bound.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", "2"))
+RENDER_MAX_QUEUE = int(os.getenv("RENDER_MAX_QUEUE", "16"))
+RENDER_QUEUE_TIMEOUT = float(os.getenv("RENDER_QUEUE_TIMEOUT", "15"))
+RENDER_RETRY_AFTER = int(os.getenv("RENDER_RETRY_AFTER", "10"))
+RENDER_RSS_SAMPLE_SECONDS = float(os.getenv("RENDER_RSS_SAMPLE_SECONDS", "0.01"))
+
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024) if hasattr(os, "sysconf") else 0.0
+
+_executor = ThreadPoolExecutor(max_workers=RENDER_CONCURRENCY, thread_name_prefix="report-render")
+_semaphore = None
+_waiting = 0
+
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+class RenderBusy(Exception):
+    """All render slots are busy and the request could not be queued in time"""
+
+    def __init__(self, retry_after: int = RENDER_RETRY_AFTER):
+        super().__init__("Report rendering is busy")
+        self.retry_after = retry_after
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size right now, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler:
+    """Highest RSS seen between start and stop(), polled on a daemon thread"""
+
+    def __init__(self):
+        self.start = self.peak = _current_rss_mb()
+        self._done = threading.Event()
+        self._thread = None
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._run, name="render-rss", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(RENDER_RSS_SAMPLE_SECONDS):
+            self._sample()
+
+    def _sample(self):
+        rss = _current_rss_mb()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def stop(self) -> Tuple[Optional[float], Optional[float]]:
+        """(peak RSS, growth over the starting RSS) in MiB; (None, None) if unmeasured"""
+        if self._thread is None:
+            return None, None
+        self._done.set()
+        self._thread.join()
+        self._sample()
+        return self.peak, self.peak - self.start
+
+
+def _measured(name: str, fn: Callable, args: tuple) -> Any:
+    sampler = _RssSampler()
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        peak, growth = sampler.stop()
+        _record(name, elapsed, peak, growth)
+        if peak is None:
+            logger.info(f"Rendered {name} in {elapsed * 1000:.0f} ms")
+        else:
+            logger.info(f"Rendered {name} in {elapsed * 1000:.0f} ms (peak RSS {peak:.0f} MiB, +{growth:.1f} MiB)")
+
+
+def _record(name: str, seconds: float, peak_rss_mb: Optional[float], rss_growth_mb: Optional[float]):
+    with _stats_lock:
+        s = _stats.setdefault(name, {
+            "count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+            "peak_rss_mb": 0.0, "max_rss_growth_mb": 0.0,
+        })
+        s["count"] += 1
+        s["total_seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+        if peak_rss_mb is not None:
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], peak_rss_mb)
+            s["max_rss_growth_mb"] = max(s["max_rss_growth_mb"], rss_growth_mb)
+
+
+def render_stats() -> Dict[str, Dict[str, float]]:
+    """Per-report render counters plus current slot usage"""
+    with _stats_lock:
+        reports = {name: dict(s) for name, s in _stats.items()}
+    in_use = RENDER_CONCURRENCY - _semaphore._value if _semaphore else 0
+    return {"concurrency": RENDER_CONCURRENCY, "in_use": in_use, "waiting": _waiting, "reports": reports}
+
+
+async def run_render(name: str, fn: Callable, *args) -> Any:
+    """Run fn(*args) on the render pool once a slot frees up, or raise RenderBusy"""
+    global _semaphore, _waiting
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(RENDER_CONCURRENCY)
+
+    if _semaphore.locked() and _waiting >= RENDER_MAX_QUEUE:
+        raise RenderBusy()
+
+    _waiting += 1
+    try:
+        await asyncio.wait_for(_semaphore.acquire(), timeout=RENDER_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise RenderBusy()
+    finally:
+        _waiting -= 1
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, _measured, name, fn, args)
+    finally:
+        _semaphore.release()
@@ -0,0 +1,167 @@
+"""
+report_artifacts.py — content-versioned cache of rendered PDF reports.
+
+A report is keyed by a fingerprint of the data versions it depends on
+(profile, holdings, transactions, goals), so checking for a cached copy
+costs a version read rather than a query. Rendered PDFs are written to
+REPORT_ARTIFACT_DIR/<user_id>/<kind>-<fp>.pdf, so an unchanged download is
+a file read instead of a reportlab run.
+"""
+import glob
+import hashlib
+import logging
+import os
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.cache import version_stamp
+from app.models import User, Investment, Transaction, Goal
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.getenv("REPORT_ARTIFACT_DIR", "/tmp/wealvix-reports")
+REPORT_KINDS = ("portfolio", "goals")
+# How long a queued render job blocks re-publishing; covers lost messages
+REPORT_JOB_CLAIM_SECONDS = int(os.getenv("REPORT_JOB_CLAIM_SECONDS", "600"))
+# Data version namespaces whose writes change what each report prints
+REPORT_NAMESPACES = {
+    "portfolio": ("profile", "portfolio", "transactions"),
+    "goals": ("profile", "goals"),
+}
+REPORT_FILENAMES = {
+    "portfolio": "portfolio_report.pdf",
+    "goals": "goals_report.pdf",
+}
+
+
+class ReportArtifactStore:
+    """Build, fingerprint and cache PDF reports on local disk"""
+
+    @staticmethod
+    def fingerprint(user_id: int, kind: str) -> str:
+        """
+        Hash of the data versions a report of `kind` depends on. Every write
+        to those namespaces bumps its version (app/cache.py), so any change
+        to what the report prints yields a new fingerprint.
+        """
+        namespaces = REPORT_NAMESPACES.get(kind)
+        if namespaces is None:
+            raise ValueError(f"Unknown report kind: {kind}")
+        stamp = version_stamp(user_id, *namespaces)
+        return hashlib.sha256(repr((kind, user_id, stamp)).encode()).hexdigest()
+
+    @staticmethod
+    def artifact_path(user_id: int, kind: str, fingerprint: str) -> str:
+        return os.path.join(ARTIFACT_DIR, str(user_id), f"{kind}-{fingerprint[:32]}.pdf")
+
+    @staticmethod
+    def find(user_id: int, kind: str, fingerprint: str) -> Optional[str]:
+        path = ReportArtifactStore.artifact_path(user_id, kind, fingerprint)
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def save(user_id: int, kind: str, fingerprint: str, pdf: bytes) -> str:
+        """Atomically write the artifact and drop older versions of the same report"""
+        path = ReportArtifactStore.artifact_path(user_id, kind, fingerprint)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp_path, path)
+
+        for old in glob.glob(os.path.join(os.path.dirname(path), f"{kind}-*.pdf")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+
+    @staticmethod
+    def render(db: Session, user: User, kind: str) -> BytesIO:
+        """Load the report's data and run reportlab"""
+        from app.report_generator import ReportGenerator
+
+        if kind == "portfolio":
+            user_data, investments, transactions = ReportArtifactStore.portfolio_report_data(db, user)
+            return ReportGenerator.generate_portfolio_pdf(user_data, investments, transactions)
+        if kind == "goals":
+            user_data, goals = ReportArtifactStore.goals_report_data(db, user)
+            return ReportGenerator.generate_goals_pdf(user_data, goals)
+        raise ValueError(f"Unknown report kind: {kind}")
+
+    @staticmethod
+    def render_and_store(
+        db: Session, user: User, kind: str, fingerprint: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Render the current version of a report unless it is already cached.
+        `fingerprint` lets a job store under the version its requester saw;
+        it is taken before the data is read, so the PDF is never older.
+        """
+        fingerprint = fingerprint or ReportArtifactStore.fingerprint(user.id, kind)
+        path = ReportArtifactStore.find(user.id, kind, fingerprint)
+        if path:
+            return fingerprint, path
+
+        pdf = ReportArtifactStore.render(db, user, kind).getvalue()
+        path = ReportArtifactStore.save(user.id, kind, fingerprint, pdf)
+        logger.info(f"Rendered {kind} report for user {user.id} ({len(pdf)} bytes)")
+        return fingerprint, path
+
+    @staticmethod
+    def portfolio_report_data(db: Session, user: User) -> Tuple[Dict, list, list]:
+        user_data = {
+            'name': user.name,
+            'email': user.email,
+            'risk_profile': user.risk_profile.value if user.risk_profile else 'moderate'
+        }
+
+        investments = [
+            {
+                'symbol': inv.symbol,
+                'asset_type': inv.asset_type.value,
+                'units': inv.units,
+                'avg_buy_price': inv.avg_buy_price,
+                'cost_basis': inv.cost_basis,
+                'current_value': inv.current_value
+            }
+            for inv in db.query(Investment).filter(Investment.user_id == user.id).all()
+        ]
+
+        transactions = [
+            {
+                'symbol': tx.symbol,
+                'type': tx.type.value,
+                'quantity': tx.quantity,
+                'price': tx.price,
+                'fees': tx.fees,
+                'executed_at': tx.executed_at
+            }
+            for tx in db.query(Transaction).filter(Transaction.user_id == user.id).order_by(Transaction.executed_at.desc()).limit(20).all()
+        ]
+
+        return user_data, investments, transactions
+
+    @staticmethod
+    def goals_report_data(db: Session, user: User) -> Tuple[Dict, list]:
+        user_data = {
+            'name': user.name,
+            'email': user.email
+        }
+
+        goals = [
+            {
+                'title': g.title,
+                'goal_type': g.goal_type.value,
+                'target_amount': g.target_amount,
+                'saved_amount': g.saved_amount,
+                'status': g.status.value
+            }
+            for g in db.query(Goal).filter(Goal.user_id == user.id).all()
+        ]
+
+        return user_data, goals
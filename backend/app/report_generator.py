@@ -1,37 +1,135 @@
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
+from io import BytesIO, StringIO
 import csv
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
+
+PORTFOLIO_CSV_HEADER = ['Symbol', 'Asset Type', 'Units', 'Avg Buy Price', 'Cost Basis', 'Current Value', 'Gain/Loss', 'Gain %']
+TRANSACTIONS_CSV_HEADER = ['Date', 'Symbol', 'Type', 'Quantity', 'Price', 'Fees', 'Total']
+
+# Columnar export layouts: (column, arrow type name). Types are resolved
+# lazily so pyarrow is only imported by the export endpoints.
+COLUMNAR_LAYOUTS = {
+    "portfolio": [
+        ("id", "int64"),
+        ("symbol", "string"),
+        ("asset_type", "category"),
+        ("units", "float64"),
+        ("avg_buy_price", "float64"),
+        ("cost_basis", "float64"),
+        ("current_value", "float64"),
+        ("last_price", "float64"),
+        ("last_price_at", "timestamp"),
+    ],
+    "transactions": [
+        ("id", "int64"),
+        ("symbol", "string"),
+        ("type", "category"),
+        ("quantity", "float64"),
+        ("price", "float64"),
+        ("fees", "float64"),
+        ("executed_at", "timestamp"),
+        ("investment_id", "int64"),
+    ],
+    "snapshots": [
+        ("snapshot_date", "date"),
+        ("cost_basis", "float64"),
+        ("current_value", "float64"),
+        ("breakdown", "breakdown"),
+    ],
+}
+COLUMNAR_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+COLUMNAR_EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+# =========================
+# PRECOMPILED STYLES
+# =========================
+# Built once at import; every report reuses them instead of rebuilding
+# the sample stylesheet and identical table styles per request.
+
+_SAMPLE_STYLES = getSampleStyleSheet()
+BODY_STYLE = _SAMPLE_STYLES['Normal']
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1e40af'),
+    spaceAfter=30,
+    alignment=TA_CENTER
+)
+
+SECTION_STYLE = ParagraphStyle(
+    'Summary',
+    parent=_SAMPLE_STYLES['Heading2'],
+    fontSize=16,
+    textColor=colors.HexColor('#059669'),
+    spaceAfter=12
+)
+
+
+def _table_style(header_font_size: int) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+SUMMARY_TABLE_STYLE = _table_style(12)
+DATA_TABLE_STYLE = _table_style(10)
+
+# Frame width of a letter page with SimpleDocTemplate's default 1in margins
+CONTENT_WIDTH = letter[0] - 2 * inch
+
+
+def _fit_widths(*relative):
+    """Column widths in the given proportions, scaled to fill CONTENT_WIDTH"""
+    total = sum(relative)
+    return [CONTENT_WIDTH * width / total for width in relative]
+
+
+SUMMARY_COL_WIDTHS = [3 * inch, 3 * inch]
+# Fixed widths spare reportlab from measuring every cell of long tables
+HOLDINGS_COL_WIDTHS = _fit_widths(1.5, 1.1, 1.0, 1.4, 1.6)
+TRANSACTIONS_COL_WIDTHS = [1.2 * inch, 1.5 * inch, 1.0 * inch, 1.2 * inch, 1.4 * inch]
+
+# Long tables are emitted as consecutive LongTables of this many rows.
+# Splitting one huge table across pages costs more per row the longer it
+# is; fixed-size chunks keep total render time linear in the row count.
+TABLE_CHUNK_ROWS = 200
 
 
 class ReportGenerator:
     """Generate PDF and CSV reports for portfolio and goals"""
 
     @staticmethod
-    def generate_portfolio_pdf(user_data: Dict, investments: List[Dict], transactions: List[Dict]) -> BytesIO:
+    def generate_portfolio_pdf(
+        user_data: Dict,
+        investments: List[Dict],
+        transactions: List[Dict],
+        title: str = "Portfolio Report",
+        transactions_heading: str = "Recent Transactions",
+        max_transactions: Optional[int] = 10,
+    ) -> BytesIO:
         """Generate comprehensive portfolio PDF report"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        elements.append(Paragraph("Portfolio Report", title_style))
-        elements.append(Spacer(1, 0.2 * inch))
+        elements = [
+            Paragraph(title, TITLE_STYLE),
+            Spacer(1, 0.2 * inch),
+        ]
 
         # User Info
         user_info = f"""
@@ -40,7 +138,7 @@ class ReportGenerator:
         <b>Risk Profile:</b> {user_data.get('risk_profile', 'N/A').title()}<br/>
         <b>Report Generated:</b> {datetime.now().strftime('%B %d, %Y %I:%M %p')}<br/>
         """
-        elements.append(Paragraph(user_info, styles['Normal']))
+        elements.append(Paragraph(user_info, BODY_STYLE))
         elements.append(Spacer(1, 0.3 * inch))
 
         # Portfolio Summary
@@ -49,128 +147,69 @@ class ReportGenerator:
         total_gain = total_value - total_investment
         gain_percent = (total_gain / total_investment * 100) if total_investment > 0 else 0
 
-        summary_style = ParagraphStyle(
-            'Summary',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#059669'),
-            spaceAfter=12
-        )
-        elements.append(Paragraph("Portfolio Summary", summary_style))
-
-        summary_data = [
+        elements.append(Paragraph("Portfolio Summary", SECTION_STYLE))
+        elements.append(ReportGenerator._summary_table([
             ['Metric', 'Value'],
             ['Total Invested', f'₹{total_investment:,.2f}'],
             ['Current Value', f'₹{total_value:,.2f}'],
             ['Total Gain/Loss', f'₹{total_gain:,.2f}'],
             ['Return %', f'{gain_percent:.2f}%']
-        ]
-
-        summary_table = Table(summary_data, colWidths=[3 * inch, 3 * inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        elements.append(summary_table)
         elements.append(Spacer(1, 0.4 * inch))
 
         # Holdings
         if investments:
-            elements.append(Paragraph("Holdings", summary_style))
-            
-            holdings_data = [['Symbol', 'Type', 'Units', 'Avg Price', 'Current Value']]
-            for inv in investments:
-                holdings_data.append([
-                    inv.get('symbol', ''),
-                    inv.get('asset_type', '').upper(),
-                    f"{inv.get('units', 0):.2f}",
-                    f"₹{inv.get('avg_buy_price', 0):,.2f}",
-                    f"₹{inv.get('current_value', 0):,.2f}"
-                ])
-
-            holdings_table = Table(holdings_data)
-            holdings_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(holdings_table)
+            elements.append(Paragraph("Holdings", SECTION_STYLE))
+            elements.extend(ReportGenerator._data_tables(
+                ['Symbol', 'Type', 'Units', 'Avg Price', 'Current Value'],
+                (
+                    [
+                        inv.get('symbol', ''),
+                        inv.get('asset_type', '').upper(),
+                        f"{inv.get('units', 0):.2f}",
+                        f"₹{inv.get('avg_buy_price', 0):,.2f}",
+                        f"₹{inv.get('current_value', 0):,.2f}"
+                    ]
+                    for inv in investments
+                ),
+                HOLDINGS_COL_WIDTHS,
+            ))
 
         # Recent Transactions
         if transactions:
             elements.append(PageBreak())
-            elements.append(Paragraph("Recent Transactions", summary_style))
-            
-            tx_data = [['Date', 'Symbol', 'Type', 'Quantity', 'Price']]
-            for tx in transactions[:10]:  # Last 10 transactions
-                executed_at = tx.get('executed_at', '')
-                if isinstance(executed_at, str):
-                    date_str = executed_at[:10]
-                else:
-                    date_str = executed_at.strftime('%Y-%m-%d') if executed_at else ''
-                
-                tx_data.append([
-                    date_str,
-                    tx.get('symbol', ''),
-                    tx.get('type', '').upper(),
-                    f"{tx.get('quantity', 0):.2f}",
-                    f"₹{tx.get('price', 0):,.2f}"
-                ])
-
-            tx_table = Table(tx_data)
-            tx_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(tx_table)
+            elements.append(Paragraph(transactions_heading, SECTION_STYLE))
+            elements.extend(ReportGenerator._data_tables(
+                ['Date', 'Symbol', 'Type', 'Quantity', 'Price'],
+                (
+                    [
+                        ReportGenerator._date_str(tx.get('executed_at', '')),
+                        tx.get('symbol', ''),
+                        tx.get('type', '').upper(),
+                        f"{tx.get('quantity', 0):.2f}",
+                        f"₹{tx.get('price', 0):,.2f}"
+                    ]
+                    for tx in transactions[:max_transactions]  # Last 10 by default
+                ),
+                TRANSACTIONS_COL_WIDTHS,
+            ))
 
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer
+        return ReportGenerator._build(elements)
 
     @staticmethod
     def generate_goals_pdf(user_data: Dict, goals: List[Dict]) -> BytesIO:
         """Generate goals progress PDF report"""
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        elements.append(Paragraph("Goals Progress Report", title_style))
-        elements.append(Spacer(1, 0.2 * inch))
+        elements = [
+            Paragraph("Goals Progress Report", TITLE_STYLE),
+            Spacer(1, 0.2 * inch),
+        ]
 
         # User Info
         user_info = f"""
         <b>Name:</b> {user_data.get('name', 'N/A')}<br/>
         <b>Report Generated:</b> {datetime.now().strftime('%B %d, %Y %I:%M %p')}<br/>
         """
-        elements.append(Paragraph(user_info, styles['Normal']))
+        elements.append(Paragraph(user_info, BODY_STYLE))
         elements.append(Spacer(1, 0.3 * inch))
 
         # Goals Summary
@@ -178,40 +217,19 @@ class ReportGenerator:
         total_saved = sum(g.get('saved_amount', 0) for g in goals)
         overall_progress = (total_saved / total_target * 100) if total_target > 0 else 0
 
-        summary_style = ParagraphStyle(
-            'Summary',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#059669'),
-            spaceAfter=12
-        )
-        elements.append(Paragraph("Overall Progress", summary_style))
-
-        summary_data = [
+        elements.append(Paragraph("Overall Progress", SECTION_STYLE))
+        elements.append(ReportGenerator._summary_table([
             ['Metric', 'Value'],
             ['Total Goals', str(len(goals))],
             ['Total Target', f'₹{total_target:,.2f}'],
             ['Total Saved', f'₹{total_saved:,.2f}'],
             ['Overall Progress', f'{overall_progress:.1f}%']
-        ]
-
-        summary_table = Table(summary_data, colWidths=[3 * inch, 3 * inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
-        elements.append(summary_table)
         elements.append(Spacer(1, 0.4 * inch))
 
         # Individual Goals
         if goals:
-            elements.append(Paragraph("Goal Details", summary_style))
+            elements.append(Paragraph("Goal Details", SECTION_STYLE))
             
             for goal in goals:
                 progress = (goal.get('saved_amount', 0) / goal.get('target_amount', 1)) * 100
@@ -224,74 +242,227 @@ class ReportGenerator:
                 Progress: {progress:.1f}%<br/>
                 Status: {goal.get('status', 'active').title()}
                 """
-                elements.append(Paragraph(goal_info, styles['Normal']))
+                elements.append(Paragraph(goal_info, BODY_STYLE))
                 elements.append(Spacer(1, 0.2 * inch))
 
+        return ReportGenerator._build(elements)
+
+    @staticmethod
+    def _build(elements: List) -> BytesIO:
+        """Lay out flowables on letter pages; the page count is kept on the buffer"""
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
         doc.build(elements)
         buffer.seek(0)
+        buffer.page_count = doc.page
         return buffer
 
+    @staticmethod
+    def _summary_table(data: List[List[str]]) -> Table:
+        table = Table(data, colWidths=SUMMARY_COL_WIDTHS)
+        table.setStyle(SUMMARY_TABLE_STYLE)
+        return table
+
+    @staticmethod
+    def _data_tables(header: List[str], rows: Iterable[List], col_widths: List[float]) -> Iterator[LongTable]:
+        """Yield LongTables of TABLE_CHUNK_ROWS rows, each repeating the header on every page"""
+        chunk = [header]
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) > TABLE_CHUNK_ROWS:
+                yield ReportGenerator._long_table(chunk, col_widths)
+                chunk = [header]
+        if len(chunk) > 1:
+            yield ReportGenerator._long_table(chunk, col_widths)
+
+    @staticmethod
+    def _long_table(data: List[List], col_widths: List[float]) -> LongTable:
+        table = LongTable(data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(DATA_TABLE_STYLE)
+        return table
+
+    @staticmethod
+    def _date_str(executed_at) -> str:
+        if isinstance(executed_at, str):
+            return executed_at[:10]
+        return executed_at.strftime('%Y-%m-%d') if executed_at else ''
+
     @staticmethod
     def generate_portfolio_csv(investments: List[Dict]) -> str:
         """Generate portfolio CSV data"""
-        from io import StringIO
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow(['Symbol', 'Asset Type', 'Units', 'Avg Buy Price', 'Cost Basis', 'Current Value', 'Gain/Loss', 'Gain %'])
-        
-        # Data
-        for inv in investments:
-            cost_basis = inv.get('cost_basis', 0)
-            current_value = inv.get('current_value', 0)
-            gain_loss = current_value - cost_basis
-            gain_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0
-            
-            writer.writerow([
-                inv.get('symbol', ''),
-                inv.get('asset_type', ''),
-                inv.get('units', 0),
-                inv.get('avg_buy_price', 0),
-                cost_basis,
-                current_value,
-                gain_loss,
-                f'{gain_percent:.2f}%'
-            ])
-        
-        return output.getvalue()
+        return "".join(ReportGenerator.stream_portfolio_csv(investments))
 
     @staticmethod
     def generate_transactions_csv(transactions: List[Dict]) -> str:
         """Generate transactions CSV data"""
-        from io import StringIO
+        return "".join(ReportGenerator.stream_transactions_csv(transactions))
+
+    @staticmethod
+    def stream_portfolio_csv(investments: Iterable[Dict], chunk_rows: int = 1000) -> Iterator[str]:
+        """Yield portfolio CSV in chunks of `chunk_rows` rows, pulling rows lazily"""
+        return ReportGenerator._stream_csv(
+            PORTFOLIO_CSV_HEADER,
+            (ReportGenerator._portfolio_csv_row(inv) for inv in investments),
+            chunk_rows,
+        )
+
+    @staticmethod
+    def stream_transactions_csv(transactions: Iterable[Dict], chunk_rows: int = 1000) -> Iterator[str]:
+        """Yield transactions CSV in chunks of `chunk_rows` rows, pulling rows lazily"""
+        return ReportGenerator._stream_csv(
+            TRANSACTIONS_CSV_HEADER,
+            (ReportGenerator._transaction_csv_row(tx) for tx in transactions),
+            chunk_rows,
+        )
+
+    @staticmethod
+    def _stream_csv(header: List[str], rows: Iterable[List], chunk_rows: int) -> Iterator[str]:
+        # One small buffer reused for every chunk keeps memory flat
         output = StringIO()
         writer = csv.writer(output)
-        
-        # Header
-        writer.writerow(['Date', 'Symbol', 'Type', 'Quantity', 'Price', 'Fees', 'Total'])
-        
-        # Data
-        for tx in transactions:
-            executed_at = tx.get('executed_at', '')
-            if isinstance(executed_at, str):
-                date_str = executed_at[:10]
-            else:
-                date_str = executed_at.strftime('%Y-%m-%d') if executed_at else ''
-            
-            quantity = tx.get('quantity', 0)
-            price = tx.get('price', 0)
-            fees = tx.get('fees', 0)
-            total = (quantity * price) + fees
-            
-            writer.writerow([
-                date_str,
-                tx.get('symbol', ''),
-                tx.get('type', ''),
-                quantity,
-                price,
-                fees,
-                total
-            ])
-        
-        return output.getvalue()
+        writer.writerow(header)
+
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= chunk_rows:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+                pending = 0
+
+        yield output.getvalue()
+
+    @staticmethod
+    def _portfolio_csv_row(inv: Dict) -> List:
+        cost_basis = inv.get('cost_basis', 0)
+        current_value = inv.get('current_value', 0)
+        gain_loss = current_value - cost_basis
+        gain_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0
+
+        return [
+            inv.get('symbol', ''),
+            inv.get('asset_type', ''),
+            inv.get('units', 0),
+            inv.get('avg_buy_price', 0),
+            cost_basis,
+            current_value,
+            gain_loss,
+            f'{gain_percent:.2f}%'
+        ]
+
+    @staticmethod
+    def _transaction_csv_row(tx: Dict) -> List:
+        date_str = ReportGenerator._date_str(tx.get('executed_at', ''))
+
+        quantity = tx.get('quantity', 0)
+        price = tx.get('price', 0)
+        fees = tx.get('fees', 0)
+        total = (quantity * price) + fees
+
+        return [
+            date_str,
+            tx.get('symbol', ''),
+            tx.get('type', ''),
+            quantity,
+            price,
+            fees,
+            total
+        ]
+
+    @staticmethod
+    def stream_columnar(
+        dataset: str,
+        rows: Iterable[Dict],
+        fmt: str = "parquet",
+        batch_rows: int = 10000,
+    ) -> Iterator[bytes]:
+        """
+        Yield a Parquet file or Arrow IPC stream for `dataset`, one record
+        batch (Parquet row group) of `batch_rows` rows at a time, so rows
+        can come straight from a server-side cursor. Columns are typed per
+        COLUMNAR_LAYOUTS and compressed with zstd.
+        """
+        import pyarrow as pa
+
+        layout = COLUMNAR_LAYOUTS[dataset]
+        schema = ReportGenerator._arrow_schema(layout)
+        sink = _ChunkSink()
+
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        elif fmt == "arrow":
+            writer = pa.ipc.new_stream(
+                sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+            )
+        else:
+            raise ValueError(f"Unknown columnar format: {fmt}")
+
+        names = [name for name, _ in layout]
+        columns = {name: [] for name in names}
+        pending = 0
+        try:
+            for row in rows:
+                for name in names:
+                    columns[name].append(row.get(name))
+                pending += 1
+                if pending >= batch_rows:
+                    writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+                    columns = {name: [] for name in names}
+                    pending = 0
+                    yield sink.drain()
+
+            if pending or fmt == "arrow":
+                writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _arrow_schema(layout):
+        import pyarrow as pa
+
+        types = {
+            "int64": pa.int64(),
+            "float64": pa.float64(),
+            "string": pa.string(),
+            "category": pa.dictionary(pa.int32(), pa.string()),
+            "timestamp": pa.timestamp("us"),
+            "date": pa.date32(),
+            "breakdown": pa.map_(
+                pa.string(),
+                pa.struct([("cost_basis", pa.float64()), ("current_value", pa.float64())]),
+            ),
+        }
+        return pa.schema([(name, types[kind]) for name, kind in layout])
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, Dict, Any, List
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from enum import Enum
 
 
@@ -96,6 +96,18 @@ class GoalUpdate(BaseModel):
     monthly_contribution: Optional[float] = None
 
 
+class GoalBatchCreate(BaseModel):
+    goals: List[GoalCreate] = Field(..., min_length=1, max_length=500)
+
+
+class GoalBatchUpdateItem(GoalUpdate):
+    id: int
+
+
+class GoalBatchUpdate(BaseModel):
+    goals: List[GoalBatchUpdateItem] = Field(..., min_length=1, max_length=500)
+
+
 class GoalOut(BaseModel):
     id: int
     title: str
@@ -115,8 +127,12 @@ class GoalOut(BaseModel):
 class InvestmentCreate(BaseModel):
     asset_type: AssetTypeEnum
     symbol: str
-    units: float
-    avg_buy_price: float
+    units: float = Field(..., gt=0)
+    avg_buy_price: float = Field(..., gt=0)
+
+
+class InvestmentBatchCreate(BaseModel):
+    investments: List[InvestmentCreate] = Field(..., min_length=1, max_length=500)
 
 
 class InvestmentOut(BaseModel):
@@ -134,6 +150,16 @@ class InvestmentOut(BaseModel):
         from_attributes = True
 
 
+class PortfolioSnapshotOut(BaseModel):
+    snapshot_date: date
+    cost_basis: float
+    current_value: float
+    breakdown: Dict[str, Dict[str, float]]
+
+    class Config:
+        from_attributes = True
+
+
 # Transaction Schemas
 class TransactionCreate(BaseModel):
     symbol: str
@@ -143,6 +169,14 @@ class TransactionCreate(BaseModel):
     fees: Optional[float] = 0
     executed_at: Optional[datetime] = None
 
+    @field_validator("executed_at")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Stored timestamps are naive UTC; convert offset-aware input to match"""
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 
 class TransactionOut(BaseModel):
     id: int
@@ -189,6 +223,12 @@ class RecommendationOut(BaseModel):
         from_attributes = True
 
 
+class RebalancePlanRequest(BaseModel):
+    cash_available: float = 0
+    min_trade_value: float = 500
+    save: bool = False
+
+
 # Calculator Schemas
 class SIPCalculatorInput(BaseModel):
     monthly_investment: float
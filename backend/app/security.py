@@ -1,4 +1,9 @@
 import os
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import timedelta, datetime
@@ -7,9 +12,17 @@ from datetime import timedelta, datetime
 # PASSWORD HASHING
 # =========================
 
+# bcrypt cost factor; hashes made with any other cost are re-hashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Processes dedicated to bcrypt, so auth storms cannot starve request threads
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
 )
 
 def hash_password(password: str) -> str:
@@ -18,6 +31,48 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+def password_needs_rehash(hashed: str) -> bool:
+    """True when the hash was made with a different bcrypt cost than BCRYPT_ROUNDS"""
+    return pwd_context.needs_update(hashed)
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def _get_hash_pool(reset: bool = False) -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if reset and _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+        if _hash_pool is None:
+            # spawn: forking a threaded server process is not safe
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+async def _run_in_hash_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_hash_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed): start a fresh pool and retry once
+        return await loop.run_in_executor(_get_hash_pool(reset=True), fn, *args)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain, hashed)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
 # =========================
 # JWT
 # =========================
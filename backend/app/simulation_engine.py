@@ -1,5 +1,4 @@
 from typing import Dict, List
-import numpy as np
 from datetime import datetime, timedelta
 
 
@@ -84,6 +83,8 @@ class SimulationEngine:
             volatility: Annual volatility/standard deviation (%)
             simulations: Number of simulation runs
         """
+        import numpy as np  # only Monte Carlo needs it; kept off the API import path
+
         months = years * 12
         monthly_return = expected_return / 12 / 100
         monthly_volatility = volatility / np.sqrt(12) / 100
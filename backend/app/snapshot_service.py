@@ -0,0 +1,77 @@
+from typing import Dict, Optional
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+import logging
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models import Investment, PortfolioSnapshot
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+class SnapshotService:
+    """Materialize daily per-user portfolio valuations into portfolio_snapshots"""
+
+    @staticmethod
+    def materialize_snapshots(
+        db: Session,
+        snapshot_date: Optional[date] = None,
+        user_id: Optional[int] = None,
+    ) -> int:
+        """
+        Write one snapshot row per user for `snapshot_date` (today in IST by default).
+        Totals come from a single GROUP BY over investments; any snapshot already
+        written for that day is replaced, so re-running after an intraday refresh
+        simply moves the day's close forward.
+        """
+        snapshot_date = snapshot_date or datetime.now(IST).date()
+
+        query = db.query(
+            Investment.user_id,
+            Investment.asset_type,
+            func.coalesce(func.sum(Investment.cost_basis), 0),
+            func.coalesce(func.sum(Investment.current_value), 0),
+        )
+        if user_id:
+            query = query.filter(Investment.user_id == user_id)
+        rows = query.group_by(Investment.user_id, Investment.asset_type).all()
+
+        per_user: Dict[int, Dict] = {}
+        for uid, asset_type, cost_basis, current_value in rows:
+            snap = per_user.setdefault(uid, {
+                "user_id": uid,
+                "snapshot_date": snapshot_date,
+                "cost_basis": 0.0,
+                "current_value": 0.0,
+                "breakdown": {},
+                "created_at": datetime.utcnow(),
+            })
+            key = asset_type.value if hasattr(asset_type, "value") else str(asset_type)
+            snap["cost_basis"] += float(cost_basis)
+            snap["current_value"] += float(current_value)
+            snap["breakdown"][key] = {
+                "cost_basis": round(float(cost_basis), 2),
+                "current_value": round(float(current_value), 2),
+            }
+
+        delete_query = db.query(PortfolioSnapshot).filter(
+            PortfolioSnapshot.snapshot_date == snapshot_date
+        )
+        if user_id:
+            delete_query = delete_query.filter(PortfolioSnapshot.user_id == user_id)
+        delete_query.delete(synchronize_session=False)
+
+        snapshots = list(per_user.values())
+        for snap in snapshots:
+            snap["cost_basis"] = round(snap["cost_basis"], 2)
+            snap["current_value"] = round(snap["current_value"], 2)
+        if snapshots:
+            db.execute(insert(PortfolioSnapshot), snapshots)
+        db.commit()
+
+        logger.info(f"Materialized {len(snapshots)} portfolio snapshot(s) for {snapshot_date}")
+        return len(snapshots)
@@ -1,17 +1,68 @@
 """
 startup.py — runs automatically when the FastAPI app starts.
-Creates all database tables if they don't exist yet (safe to run multiple times).
+Schema changes are applied once per deploy by `python -m app.migrations`
+(see Dockerfile); at boot we only check the database is up to date.
+Set MIGRATE_ON_STARTUP=1 for local development to migrate at boot instead.
+
+Heavy subsystems (yfinance/pandas, reportlab, numpy, Celery) are imported
+where they are used rather than by app.main, so a cold start only loads
+what /health needs. Once the app is up, warm_imports() loads them on a
+background thread so the first report or price lookup does not pay for it.
 """
+import importlib
+import os
 import logging
-from app.database import Base, engine
+import threading
+import time
+from app.migrations import pending_migrations, upgrade
 
 logger = logging.getLogger(__name__)
 
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "0") == "1"
+WARMUP_IMPORTS = os.getenv("WARMUP_IMPORTS", "1") == "1"
+# Give the server time to start accepting connections before warming
+WARMUP_DELAY_SECONDS = float(os.getenv("WARMUP_DELAY_SECONDS", "2"))
+
+# Loaded lazily by the routes that need them
+WARMUP_MODULES = (
+    "yfinance",
+    "numpy",
+    "app.report_generator",
+    "app.celery_tasks",
+)
+
 def init_db():
-    """Create all tables defined in models.py — skips tables that already exist."""
+    """Check (or, with MIGRATE_ON_STARTUP, apply) pending schema migrations."""
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables ready.")
+        if MIGRATE_ON_STARTUP:
+            upgrade()
+            return
+
+        pending = pending_migrations()
+        if pending:
+            versions = ", ".join(f"{version:04d}" for version, _ in pending)
+            logger.warning(f"⚠️ Database schema is behind: pending migrations {versions}. Run `python -m app.migrations`.")
+        else:
+            logger.info("✅ Database schema up to date.")
     except Exception as e:
         logger.error(f"❌ Database init failed: {e}")
         raise e
+
+
+def warm_imports():
+    """Import WARMUP_MODULES on a daemon thread after WARMUP_DELAY_SECONDS"""
+    if not WARMUP_IMPORTS:
+        return
+
+    def run():
+        time.sleep(WARMUP_DELAY_SECONDS)
+        for name in WARMUP_MODULES:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logger.warning(f"⚠️ Warmup import of {name} failed: {e}")
+                continue
+            logger.info(f"✅ Warmed {name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    threading.Thread(target=run, name="import-warmup", daemon=True).start()
@@ -0,0 +1,312 @@
+"""
+statement_batch.py — monthly PDF statements for every user.
+
+Users are streamed in id-ordered chunks. Each chunk's holdings as of the
+end of the month (replayed from the ledger, valued with the month's last
+portfolio snapshot) and the month's transactions are loaded with a few IN
+queries, and PDFs are rendered across a process pool sized to the CPUs
+this process may run on into STATEMENT_ARCHIVE_DIR/<YYYY-MM>/user_<id>.pdf.
+
+A manifest in the month's directory records the last completed chunk and
+any failed users, so a rerun resumes where the previous one stopped and
+retries its failures. Existing statements are never re-rendered.
+
+Run from backend/:
+    python -m app.statement_batch [--period 2026-09] [--chunk-size 200] [--workers N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("STATEMENT_ARCHIVE_DIR", "/tmp/wealvix-statements")
+# Render processes; 0 sizes the pool to the CPUs this process may use
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", "0"))
+MANIFEST_NAME = "_manifest.json"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks and cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def previous_period(today: Optional[date] = None) -> str:
+    today = today or date.today()
+    year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return f"{year:04d}-{month:02d}"
+
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    year, month = (int(p) for p in period.split("-"))
+    start = datetime(year, month, 1)
+    end = datetime(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+
+def statement_path(period: str, user_id: int) -> str:
+    return os.path.join(ARCHIVE_DIR, period, f"user_{user_id}.pdf")
+
+
+def _render_statement(job: Dict) -> Tuple[int, int]:
+    """Process-pool worker: render one statement to disk, return (user_id, pages)"""
+    from app.report_generator import ReportGenerator
+
+    pdf = ReportGenerator.generate_portfolio_pdf(
+        job["user"],
+        job["investments"],
+        job["transactions"],
+        title=f"Monthly Statement — {job['period_label']}",
+        transactions_heading="Transactions This Month",
+        max_transactions=None,
+    )
+    path = job["path"]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf.getvalue())
+    os.replace(tmp_path, path)
+    return job["user_id"], pdf.page_count
+
+
+class StatementBatch:
+    """Resumable bulk statement run for one calendar month"""
+
+    def __init__(self, period: Optional[str] = None, chunk_size: int = 200, workers: Optional[int] = None):
+        self.period = period or previous_period()
+        self.chunk_size = chunk_size
+        self.workers = workers or STATEMENT_WORKERS or available_cpus()
+        self.start, self.end = period_bounds(self.period)
+        self.directory = os.path.join(ARCHIVE_DIR, self.period)
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self.manifest = {"period": self.period, "last_user_id": 0, "failed": {}, "completed": 0}
+
+    # ── Manifest ────────────────────────────────────────────────────────
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest.update(json.load(f))
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    # ── Data loading ────────────────────────────────────────────────────
+    def _user_chunks(self, db, after_id: int):
+        from app.models import User
+
+        while True:
+            users = db.query(
+                User.id, User.name, User.email, User.risk_profile
+            ).filter(User.id > after_id).order_by(User.id).limit(self.chunk_size).all()
+            if not users:
+                return
+            yield users
+            after_id = users[-1].id
+
+    def _prefetch(self, db, user_ids: List[int]) -> Tuple[Dict[int, list], Dict[int, list]]:
+        """Holdings at the end of the month and the month's transactions for a chunk"""
+        from app.models import Transaction
+
+        investments = self._period_end_holdings(db, user_ids)
+
+        transactions = defaultdict(list)
+        for tx in db.query(
+            Transaction.user_id, Transaction.symbol, Transaction.type, Transaction.quantity,
+            Transaction.price, Transaction.fees, Transaction.executed_at,
+        ).filter(
+            Transaction.user_id.in_(user_ids),
+            Transaction.executed_at >= self.start,
+            Transaction.executed_at < self.end,
+        ).order_by(Transaction.user_id, Transaction.executed_at.desc()):
+            transactions[tx.user_id].append({
+                'symbol': tx.symbol,
+                'type': tx.type.value,
+                'quantity': tx.quantity,
+                'price': tx.price,
+                'fees': tx.fees,
+                'executed_at': tx.executed_at,
+            })
+
+        return investments, transactions
+
+    def _period_end_holdings(self, db, user_ids: List[int]) -> Dict[int, list]:
+        """
+        Holdings as they stood at the end of the period: units and FIFO cost
+        from replaying the ledger up to then, valued with the period's last
+        portfolio snapshot. Snapshots hold value per asset type, so each
+        holding takes its asset type's value/cost ratio; without a snapshot
+        in the period holdings are shown at cost. Three queries per chunk.
+        """
+        from sqlalchemy import func
+
+        from app.ledger import POSITION_TYPES, position_key, replay
+        from app.models import Investment, PortfolioSnapshot, Transaction
+
+        history = defaultdict(list)
+        for tx in db.query(
+            Transaction.user_id, Transaction.symbol, Transaction.type,
+            Transaction.quantity, Transaction.price, Transaction.fees,
+        ).filter(
+            Transaction.user_id.in_(user_ids),
+            Transaction.type.in_(POSITION_TYPES),
+            Transaction.executed_at < self.end,
+        ).order_by(Transaction.user_id, Transaction.executed_at, Transaction.id):
+            history[(tx.user_id, position_key(tx.symbol))].append(tx)
+
+        # Display symbol and asset type come from the holding, where it still exists
+        known = {
+            (inv.user_id, position_key(inv.symbol)): (inv.symbol, inv.asset_type.value)
+            for inv in db.query(Investment.user_id, Investment.symbol, Investment.asset_type)
+            .filter(Investment.user_id.in_(user_ids))
+        }
+
+        last_snapshot = db.query(
+            PortfolioSnapshot.user_id, func.max(PortfolioSnapshot.snapshot_date).label("snapshot_date"),
+        ).filter(
+            PortfolioSnapshot.user_id.in_(user_ids),
+            PortfolioSnapshot.snapshot_date >= self.start.date(),
+            PortfolioSnapshot.snapshot_date < self.end.date(),
+        ).group_by(PortfolioSnapshot.user_id).subquery()
+        marks = {}
+        for snap in db.query(PortfolioSnapshot.user_id, PortfolioSnapshot.breakdown).join(
+            last_snapshot,
+            (PortfolioSnapshot.user_id == last_snapshot.c.user_id)
+            & (PortfolioSnapshot.snapshot_date == last_snapshot.c.snapshot_date),
+        ):
+            marks[snap.user_id] = {
+                asset_type: totals["current_value"] / totals["cost_basis"]
+                for asset_type, totals in (snap.breakdown or {}).items()
+                if totals.get("cost_basis")
+            }
+
+        holdings = defaultdict(list)
+        for (user_id, key), trades in sorted(history.items()):
+            state = replay(
+                [t.type for t in trades], [t.quantity for t in trades],
+                [t.price for t in trades], [t.fees or 0.0 for t in trades],
+            )
+            if state["units"] <= 0:
+                continue
+            symbol, asset_type = known.get((user_id, key), (trades[-1].symbol.strip(), "stock"))
+            mark = marks.get(user_id, {}).get(asset_type, 1.0)
+            holdings[user_id].append({
+                'symbol': symbol,
+                'asset_type': asset_type,
+                'units': state["units"],
+                'avg_buy_price': state["cost_basis"] / state["units"],
+                'cost_basis': state["cost_basis"],
+                'current_value': state["cost_basis"] * mark,
+            })
+        return holdings
+
+    def _jobs(self, db, users) -> List[Dict]:
+        pending = [u for u in users if not os.path.exists(statement_path(self.period, u.id))]
+        if not pending:
+            return []
+        investments, transactions = self._prefetch(db, [u.id for u in pending])
+        label = self.start.strftime("%B %Y")
+        return [
+            {
+                "user_id": u.id,
+                "path": statement_path(self.period, u.id),
+                "period_label": label,
+                "user": {
+                    'name': u.name,
+                    'email': u.email,
+                    'risk_profile': u.risk_profile.value if u.risk_profile else 'moderate',
+                },
+                "investments": investments.get(u.id, []),
+                "transactions": transactions.get(u.id, []),
+            }
+            for u in pending
+        ]
+
+    # ── Run ─────────────────────────────────────────────────────────────
+    def _render_chunk(self, pool, db, users, stats: Dict):
+        jobs = self._jobs(db, users)
+        stats["skipped"] += len(users) - len(jobs)
+
+        futures = {pool.submit(_render_statement, job): job["user_id"] for job in jobs}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                _, pages = future.result()
+                stats["rendered"] += 1
+                stats["pages"] += pages
+                self.manifest["completed"] += 1
+            except Exception as e:
+                logger.error(f"Statement for user {user_id} failed: {e}")
+                stats["failed"] += 1
+                self.manifest["failed"][str(user_id)] = str(e)
+
+    def run(self) -> Dict:
+        from app.database import ReadSessionLocal
+        from app.models import User
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_manifest()
+
+        stats = {"period": self.period, "rendered": 0, "pages": 0, "failed": 0, "skipped": 0}
+        started = time.perf_counter()
+
+        def progress() -> str:
+            elapsed = time.perf_counter() - started
+            rate = stats["pages"] / elapsed if elapsed > 0 else 0.0
+            return (f"{stats['rendered']} statements, {stats['pages']} pages "
+                    f"in {elapsed:.1f}s ({rate:.1f} pages/s), {stats['failed']} failed")
+
+        db = ReadSessionLocal()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                # Failures from a previous run are retried first
+                retry_ids = [int(uid) for uid in self.manifest["failed"]]
+                self.manifest["failed"] = {}
+                if retry_ids:
+                    users = db.query(
+                        User.id, User.name, User.email, User.risk_profile
+                    ).filter(User.id.in_(retry_ids)).order_by(User.id).all()
+                    self._render_chunk(pool, db, users, stats)
+                    self._save_manifest()
+
+                for users in self._user_chunks(db, self.manifest["last_user_id"]):
+                    self._render_chunk(pool, db, users, stats)
+                    self.manifest["last_user_id"] = users[-1].id
+                    self._save_manifest()
+                    logger.info(f"[{self.period}] through user {users[-1].id}: {progress()}")
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["pages_per_second"] = round(stats["pages"] / elapsed, 2) if elapsed > 0 else 0.0
+        logger.info(f"[{self.period}] done: {progress()}")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render monthly statements for all users")
+    parser.add_argument("--period", help="YYYY-MM (default: previous month)")
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = StatementBatch(args.period, args.chunk_size, args.workers).run()
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
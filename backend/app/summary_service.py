@@ -0,0 +1,166 @@
+from typing import Dict, Iterable, Optional
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update, exists
+from sqlalchemy.orm import Session
+
+from app.models import Investment, Goal, GoalStatus, User, UserSummary
+
+GOAL_STATUS_COLUMNS = {
+    GoalStatus.active.value: "goals_active",
+    GoalStatus.paused.value: "goals_paused",
+    GoalStatus.completed.value: "goals_completed",
+}
+
+
+class SummaryService:
+    """
+    Maintain user_summaries, the per-user totals behind /dashboard/summary.
+
+    Write paths call adjust() (or the goal/investment helpers) in the same
+    session before they commit, so the summary row changes atomically with
+    the rows it describes. Deltas are applied as `col = col + :delta` and
+    are safe under concurrent writers. Bulk price updates call
+    refresh_portfolio_totals() instead, which re-derives the investment
+    totals with one set-based UPDATE.
+    """
+
+    @staticmethod
+    def goal_contribution(goal: Goal, sign: int = 1) -> Dict[str, float]:
+        """Column deltas a goal adds to its owner's summary (negated with sign=-1)"""
+        deltas = {
+            "goals_total": sign,
+            "goal_target_total": sign * (goal.target_amount or 0),
+            "goal_saved_total": sign * (goal.saved_amount or 0),
+        }
+        status = goal.status or GoalStatus.active
+        column = GOAL_STATUS_COLUMNS.get(getattr(status, "value", status))
+        if column:
+            deltas[column] = sign
+        return deltas
+
+    @staticmethod
+    def investment_contribution(investment: Investment, sign: int = 1) -> Dict[str, float]:
+        return {
+            "holdings_count": sign,
+            "total_cost_basis": sign * (investment.cost_basis or 0),
+            "total_current_value": sign * (investment.current_value or 0),
+        }
+
+    @staticmethod
+    def merge(*deltas: Dict[str, float]) -> Dict[str, float]:
+        merged: Dict[str, float] = {}
+        for d in deltas:
+            for column, value in d.items():
+                merged[column] = merged.get(column, 0) + value
+        return merged
+
+    @staticmethod
+    def adjust(db: Session, user_id: int, deltas: Dict[str, float]):
+        """Add `deltas` to the user's summary row; builds the row if it is missing"""
+        deltas = {column: value for column, value in deltas.items() if value}
+        if not deltas:
+            return
+
+        result = db.execute(
+            update(UserSummary)
+            .where(UserSummary.user_id == user_id)
+            .values({column: getattr(UserSummary, column) + value for column, value in deltas.items()})
+        )
+        if result.rowcount == 0:
+            # No row yet: derive it from the (already flushed) source rows
+            db.flush()
+            SummaryService.recompute(db, [user_id])
+
+    @staticmethod
+    def refresh_portfolio_totals(db: Session, user_ids: Iterable[int]):
+        """Re-derive cost basis, value and holdings for `user_ids` after bulk price writes"""
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        db.flush()
+        SummaryService._ensure_rows(db, user_ids)
+        db.execute(
+            update(UserSummary)
+            .where(UserSummary.user_id.in_(user_ids))
+            .values(**SummaryService._portfolio_totals())
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def recompute(db: Session, user_ids: Optional[Iterable[int]] = None):
+        """Rebuild summary rows from scratch (all users by default); also fixes drift"""
+        user_ids = sorted(set(user_ids)) if user_ids is not None else None
+        SummaryService._ensure_rows(db, user_ids)
+
+        query = update(UserSummary).values(
+            **SummaryService._portfolio_totals(),
+            **SummaryService._goal_totals(),
+        ).execution_options(synchronize_session=False)
+        if user_ids is not None:
+            query = query.where(UserSummary.user_id.in_(user_ids))
+        db.execute(query)
+
+    @staticmethod
+    def get_summary(db: Session, user_id: int) -> Dict:
+        """The user's summary as a dict; computed read-only when no row exists yet"""
+        row = db.query(UserSummary).filter(UserSummary.user_id == user_id).first()
+        if row:
+            return {c.name: getattr(row, c.name) for c in UserSummary.__table__.columns}
+
+        portfolio = db.query(
+            func.coalesce(func.sum(Investment.cost_basis), 0),
+            func.coalesce(func.sum(Investment.current_value), 0),
+            func.count(Investment.id),
+        ).filter(Investment.user_id == user_id).one()
+        summary = {
+            "user_id": user_id,
+            "total_cost_basis": float(portfolio[0]),
+            "total_current_value": float(portfolio[1]),
+            "holdings_count": portfolio[2],
+            "goals_total": 0, "goals_active": 0, "goals_paused": 0, "goals_completed": 0,
+            "goal_target_total": 0.0, "goal_saved_total": 0.0,
+            "updated_at": datetime.utcnow(),
+        }
+        for goal in db.query(Goal.status, Goal.target_amount, Goal.saved_amount).filter(Goal.user_id == user_id):
+            for column, value in SummaryService.goal_contribution(goal).items():
+                summary[column] += value
+        return summary
+
+    @staticmethod
+    def _ensure_rows(db: Session, user_ids: Optional[list]):
+        missing = select(User.id).where(~exists().where(UserSummary.user_id == User.id))
+        if user_ids is not None:
+            missing = missing.where(User.id.in_(user_ids))
+        db.execute(insert(UserSummary).from_select(["user_id"], missing))
+
+    @staticmethod
+    def _portfolio_totals() -> Dict:
+        def per_user(expr):
+            return (
+                select(expr).where(Investment.user_id == UserSummary.user_id)
+                .correlate(UserSummary).scalar_subquery()
+            )
+
+        return {
+            "total_cost_basis": per_user(func.coalesce(func.sum(Investment.cost_basis), 0)),
+            "total_current_value": per_user(func.coalesce(func.sum(Investment.current_value), 0)),
+            "holdings_count": per_user(func.count(Investment.id)),
+        }
+
+    @staticmethod
+    def _goal_totals() -> Dict:
+        def per_user(expr, *criteria):
+            return (
+                select(expr).where(Goal.user_id == UserSummary.user_id, *criteria)
+                .correlate(UserSummary).scalar_subquery()
+            )
+
+        totals = {
+            "goals_total": per_user(func.count(Goal.id)),
+            "goal_target_total": per_user(func.coalesce(func.sum(Goal.target_amount), 0)),
+            "goal_saved_total": per_user(func.coalesce(func.sum(Goal.saved_amount), 0)),
+        }
+        for status, column in GOAL_STATUS_COLUMNS.items():
+            totals[column] = per_user(func.count(Goal.id), Goal.status == GoalStatus(status))
+        return totals
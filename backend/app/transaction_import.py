@@ -0,0 +1,200 @@
+from typing import Dict, IO, List, Optional
+from datetime import datetime, timezone
+from io import StringIO
+import csv
+import logging
+import math
+import os
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import disable_statement_timeout
+from app.models import Transaction, TransactionType
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "200000"))
+# Only the first few rejections are reported back row by row
+IMPORT_MAX_ERRORS = 100
+
+# Accepted header spellings -> column. Covers our own transactions.csv export
+# (Date, Symbol, Type, Quantity, Price, Fees, Total) and common broker variants.
+HEADER_ALIASES = {
+    "date": "executed_at",
+    "trade date": "executed_at",
+    "executed_at": "executed_at",
+    "symbol": "symbol",
+    "ticker": "symbol",
+    "type": "type",
+    "side": "type",
+    "quantity": "quantity",
+    "qty": "quantity",
+    "units": "quantity",
+    "price": "price",
+    "fees": "fees",
+    "brokerage": "fees",
+}
+REQUIRED_COLUMNS = ("symbol", "type", "quantity", "price")
+TRANSACTION_TYPES = {t.value for t in TransactionType}
+
+COPY_COLUMNS = ("user_id", "symbol", "type", "quantity", "price", "fees", "executed_at")
+
+
+class TransactionImportError(ValueError):
+    """The file as a whole cannot be imported (bad header, too many rows)"""
+
+
+class TransactionImporter:
+    """
+    Bulk-load transactions from a CSV stream.
+
+    Rows are parsed and validated one at a time and buffered into batches of
+    IMPORT_BATCH_ROWS, each written with a single COPY (PostgreSQL/psycopg2)
+    or executemany INSERT. Everything happens in the caller's transaction:
+    the caller commits once at the end, so an aborted upload leaves nothing
+    behind. Invalid rows are skipped and reported, not fatal.
+    """
+
+    @staticmethod
+    def import_csv(db: Session, user_id: int, stream: IO[str]) -> Dict:
+        started = time.perf_counter()
+        reader = csv.reader(stream)
+        columns = TransactionImporter._header_columns(next(reader, None))
+        use_copy = db.get_bind().dialect.driver == "psycopg2"
+        # A large file (and the ledger replay after it) may outlast the timeout
+        disable_statement_timeout(db.connection())
+
+        accepted = rejected = 0
+        errors: List[Dict] = []
+        batch: List[Dict] = []
+        now = datetime.utcnow()
+
+        # Header is line 1, so data starts on line 2
+        for line, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            if accepted + rejected >= IMPORT_MAX_ROWS:
+                raise TransactionImportError(f"Imports are limited to {IMPORT_MAX_ROWS} rows per file")
+
+            try:
+                row = TransactionImporter._parse_row(columns, values, now)
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"line": line, "error": str(e)})
+                continue
+
+            row["user_id"] = user_id
+            batch.append(row)
+            accepted += 1
+            if len(batch) >= IMPORT_BATCH_ROWS:
+                TransactionImporter._write_batch(db, batch, use_copy)
+                batch = []
+
+        if batch:
+            TransactionImporter._write_batch(db, batch, use_copy)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Imported {accepted} transaction(s) for user {user_id} "
+            f"({rejected} rejected) in {elapsed:.2f}s"
+        )
+        return {
+            "accepted": accepted,
+            "rejected": rejected,
+            "errors": errors,
+            "errors_truncated": rejected > len(errors),
+            "seconds": round(elapsed, 3),
+        }
+
+    @staticmethod
+    def _header_columns(header: Optional[List[str]]) -> List[Optional[str]]:
+        if not header:
+            raise TransactionImportError("The file is empty")
+        columns = [HEADER_ALIASES.get(h.strip().lower()) for h in header]
+        missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+        if missing:
+            raise TransactionImportError(f"Missing required column(s): {', '.join(missing)}")
+        return columns
+
+    @staticmethod
+    def _parse_row(columns: List[Optional[str]], values: List[str], now: datetime) -> Dict:
+        raw = {}
+        for column, value in zip(columns, values):
+            if column:
+                raw[column] = value.strip()
+
+        symbol = raw.get("symbol", "")
+        if not symbol:
+            raise ValueError("symbol is required")
+
+        tx_type = raw.get("type", "").lower()
+        if tx_type not in TRANSACTION_TYPES:
+            raise ValueError(f"unknown type {raw.get('type', '')!r}")
+
+        quantity = TransactionImporter._number(raw, "quantity")
+        price = TransactionImporter._number(raw, "price")
+        fees = TransactionImporter._number(raw, "fees") if raw.get("fees") else 0.0
+        if quantity <= 0:
+            raise ValueError("quantity must be positive")
+        if price < 0 or fees < 0:
+            raise ValueError("price and fees must not be negative")
+
+        executed_at = now
+        if raw.get("executed_at"):
+            try:
+                executed_at = datetime.fromisoformat(raw["executed_at"])
+            except ValueError:
+                raise ValueError(f"invalid date {raw['executed_at']!r} (expected YYYY-MM-DD)")
+            if executed_at.tzinfo is not None:
+                # Stored timestamps are naive UTC
+                executed_at = executed_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+        return {
+            "symbol": symbol,
+            "type": TransactionType(tx_type),
+            "quantity": quantity,
+            "price": price,
+            "fees": fees,
+            "executed_at": executed_at,
+        }
+
+    @staticmethod
+    def _number(raw: Dict, column: str) -> float:
+        value = raw.get(column, "").replace(",", "")
+        try:
+            number = float(value)
+        except ValueError:
+            number = math.nan
+        if not math.isfinite(number):
+            raise ValueError(f"{column} must be a number, got {raw.get(column, '')!r}")
+        return number
+
+    @staticmethod
+    def _write_batch(db: Session, batch: List[Dict], use_copy: bool):
+        if not use_copy:
+            # Core insert on the table: executemany without ORM bookkeeping
+            db.execute(insert(Transaction.__table__), batch)
+            return
+
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([
+                row["user_id"], row["symbol"], row["type"].name, row["quantity"],
+                row["price"], row["fees"], row["executed_at"].isoformat(sep=" "),
+            ])
+        buffer.seek(0)
+
+        # COPY on the session's own connection, so it shares the transaction
+        cursor = db.connection().connection.driver_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY transactions ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        finally:
+            cursor.close()
@@ -0,0 +1,135 @@
+"""
+Load test the async read endpoints against their threadpool equivalents.
+
+Run from backend/ (point DATABASE_URL at PostgreSQL for meaningful numbers;
+tables are created if missing and a throwaway user is seeded):
+    DATABASE_URL=postgresql://... SECRET_KEY=bench python -m benchmarks.bench_async_reads \\
+        [--concurrency 10 50 200] [--requests 2000]
+
+Serves the app with uvicorn on a local port. For each endpoint the async
+route (/portfolio, /goals, /transactions) is compared with a sync copy of
+the handler it replaced, mounted under /sync/..., which runs in Starlette's
+threadpool on a blocking session. Reports requests/s, p50 and p99 latency.
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import Depends, Response
+from sqlalchemy.orm import Session
+
+from app.database import Base, SessionLocal, engine
+from app.main import app, get_db, get_current_principal, keyset_page
+from app.models import Goal, Investment, Transaction, TransactionType, User, AssetType
+from app.schemas import GoalOut, InvestmentOut, TransactionOut
+from app.security import create_access_token
+
+PORT = 8765
+
+
+# Threadpool baselines: the handlers as they were before going async
+@app.get("/sync/portfolio", response_model=List[InvestmentOut])
+def sync_portfolio(db: Session = Depends(get_db), user=Depends(get_current_principal)):
+    return db.query(Investment).filter(Investment.user_id == user.id).all()
+
+
+@app.get("/sync/goals", response_model=List[GoalOut])
+def sync_goals(db: Session = Depends(get_db), user=Depends(get_current_principal)):
+    return db.query(Goal).filter(Goal.user_id == user.id).all()
+
+
+@app.get("/sync/transactions", response_model=List[TransactionOut])
+def sync_transactions(db: Session = Depends(get_db), user=Depends(get_current_principal)):
+    query = db.query(Transaction).filter(Transaction.user_id == user.id)
+    return keyset_page(query, Transaction.executed_at, Transaction.id, None, 50, Response())
+
+
+def seed() -> str:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(name="Load Bench", email=f"load-bench-{time.time_ns()}@example.com", password="x")
+        db.add(user)
+        db.flush()
+        now = datetime.utcnow()
+        for i in range(20):
+            db.add(Investment(
+                user_id=user.id, asset_type=AssetType.stock, symbol=f"SYM{i}.NS",
+                units=10, avg_buy_price=100, cost_basis=1000, current_value=1100, last_price=110,
+            ))
+            db.add(Goal(user_id=user.id, title=f"Goal {i}", target_amount=100000, saved_amount=1000 * i))
+        for i in range(500):
+            db.add(Transaction(
+                user_id=user.id, symbol=f"SYM{i % 20}.NS", type=TransactionType.buy,
+                quantity=1, price=100, fees=0, executed_at=now - timedelta(hours=i),
+            ))
+        db.commit()
+        return create_access_token({"sub": user.id})
+    finally:
+        db.close()
+
+
+async def hammer(path: str, token: str, concurrency: int, total: int):
+    latencies = []
+    remaining = total
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await client.get(path, headers=headers)  # warm the auth cache and pools
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    token = seed()
+    server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"{'endpoint':<14} {'conc':>5} {'sync rps':>9} {'async rps':>10} "
+          f"{'sync p50':>9} {'async p50':>10} {'sync p99':>9} {'async p99':>10}")
+    try:
+        for path in ("/portfolio", "/goals", "/transactions"):
+            for concurrency in args.concurrency:
+                sync = asyncio.run(hammer(f"/sync{path}", token, concurrency, args.requests))
+                fast = asyncio.run(hammer(path, token, concurrency, args.requests))
+                print(
+                    f"{path:<14} {concurrency:>5} {sync[0]:>9.0f} {fast[0]:>10.0f} "
+                    f"{sync[1] * 1000:>8.1f}ms {fast[1] * 1000:>9.1f}ms "
+                    f"{sync[2] * 1000:>8.1f}ms {fast[2] * 1000:>9.1f}ms"
+                )
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
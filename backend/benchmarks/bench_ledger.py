@@ -0,0 +1,73 @@
+"""
+Benchmark position rebuilds from the transaction ledger.
+
+Run from backend/:
+    DATABASE_URL=sqlite:////tmp/ledger-bench.db python -m benchmarks.bench_ledger [--trades 1000 100000] [--repeat 5]
+
+Replays a random buy/sell/dividend history for one symbol with the
+sequential FIFO engine (what LedgerService.apply does one trade at a time)
+and with the vectorized replay() used for full rebuilds, and checks the
+two agree.
+"""
+import argparse
+import random
+import time
+
+from app.ledger import apply_trade, empty_state, replay
+
+
+def make_history(trades: int):
+    rng = random.Random(trades)
+    kinds, quantity, price, fees = [], [], [], []
+    for _ in range(trades):
+        kinds.append(rng.choice(["buy", "buy", "sell", "dividend"]))
+        quantity.append(round(rng.uniform(1, 50), 4))
+        price.append(round(rng.uniform(10, 5000), 2))
+        fees.append(20.0)
+    # Keep every sale covered so the vectorized path is taken
+    held = 0.0
+    for i, kind in enumerate(kinds):
+        if kind == "buy":
+            held += quantity[i]
+        elif kind == "sell":
+            quantity[i] = min(quantity[i], held)
+            held -= quantity[i]
+    return kinds, quantity, price, fees
+
+
+def sequential(kinds, quantity, price, fees):
+    state = empty_state()
+    for args in zip(kinds, quantity, price, fees):
+        apply_trade(state, *args)
+    return state
+
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trades", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'trades':>8} {'sequential ms':>14} {'vectorized ms':>14} {'speedup':>8} {'max diff':>10}")
+    for trades in args.trades:
+        history = make_history(trades)
+        slow, expected = best_of(args.repeat, lambda: sequential(*history))
+        fast, actual = best_of(args.repeat, lambda: replay(*history))
+        diff = max(
+            abs(expected[k] - actual[k]) / max(1.0, abs(expected[k]))
+            for k in ("units", "cost_basis", "realized_pnl", "dividends", "fees")
+        )
+        print(f"{trades:>8} {slow * 1000:>14.2f} {fast * 1000:>14.2f} {slow / fast:>7.2f}x {diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark portfolio PDF rendering for growing holdings counts.
+
+Run from backend/:
+    python -m benchmarks.bench_report_render [--rows 10 1000 50000] [--repeat 3]
+
+Reports best-of-N wall time, pages and time per row; render time should
+grow linearly with the number of holdings rows.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.report_generator import ReportGenerator
+
+ASSET_TYPES = ["stock", "etf", "mutual_fund", "bond", "cash"]
+
+
+def make_portfolio(rows: int):
+    rng = random.Random(rows)
+    investments = []
+    for i in range(rows):
+        units = rng.uniform(1, 500)
+        price = rng.uniform(10, 5000)
+        investments.append({
+            "symbol": f"SYM{i:05d}.NS",
+            "asset_type": rng.choice(ASSET_TYPES),
+            "units": units,
+            "avg_buy_price": price,
+            "cost_basis": units * price,
+            "current_value": units * price * rng.uniform(0.7, 1.5),
+        })
+    now = datetime.utcnow()
+    transactions = [
+        {
+            "symbol": inv["symbol"],
+            "type": "buy",
+            "quantity": inv["units"],
+            "price": inv["avg_buy_price"],
+            "fees": 0.0,
+            "executed_at": now - timedelta(days=i),
+        }
+        for i, inv in enumerate(investments[:20])
+    ]
+    user = {"name": "Benchmark User", "email": "bench@example.com", "risk_profile": "moderate"}
+    return user, investments, transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'best_s':>9} {'pages':>6} {'us/row':>9} {'KiB':>8}")
+    for rows in args.rows:
+        user, investments, transactions = make_portfolio(rows)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            pdf = ReportGenerator.generate_portfolio_pdf(user, investments, transactions)
+            best = min(best, time.perf_counter() - start)
+        size_kib = len(pdf.getvalue()) / 1024
+        print(f"{rows:>8} {best:>9.3f} {pdf.page_count:>6} {best / rows * 1e6:>9.1f} {size_kib:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark response serialization and compression for the list endpoints.
+
+Run from backend/:
+    python -m benchmarks.bench_serialization [--rows 100 500] [--repeat 20]
+
+For /transactions and /simulations pages of --rows items, compares the
+stdlib JSONResponse FastAPI used before with ORJSONResponse (the app's
+default now). Both include the response_model validation FastAPI does
+for every route. Also reports payload size as identity, gzip and brotli
+at the levels CompressionMiddleware uses.
+"""
+import argparse
+import gzip
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.compression import GZIP_LEVEL, BROTLI_QUALITY, brotli
+from app.schemas import TransactionOut, SimulationOut
+from app.simulation_engine import SimulationEngine
+
+
+def make_transactions(rows: int):
+    rng = random.Random(rows)
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            user_id=1,
+            symbol=f"SYM{rng.randint(0, 200):03d}.NS",
+            type=rng.choice(["buy", "sell", "dividend"]),
+            quantity=rng.uniform(1, 100),
+            price=rng.uniform(10, 5000),
+            fees=rng.uniform(0, 20),
+            executed_at=now - timedelta(minutes=i * 37),
+        )
+        for i in range(rows)
+    ]
+
+
+def make_simulations(rows: int):
+    rng = random.Random(rows)
+    now = datetime.utcnow()
+    simulations = []
+    for i in range(rows):
+        assumptions = {
+            "current_amount": rng.uniform(0, 500000),
+            "target_amount": rng.uniform(500000, 5000000),
+            "monthly_contribution": rng.uniform(1000, 50000),
+            "expected_return": rng.uniform(6, 15),
+            "years": rng.randint(3, 20),
+        }
+        results = SimulationEngine.simulate_goal_achievement(
+            current_amount=assumptions["current_amount"],
+            target_amount=assumptions["target_amount"],
+            monthly_contribution=assumptions["monthly_contribution"],
+            expected_return_rate=assumptions["expected_return"],
+            years=assumptions["years"],
+        )
+        simulations.append(SimpleNamespace(
+            id=i + 1, scenario_name=f"Scenario {i}", goal_id=None,
+            assumptions=assumptions, results=results,
+            created_at=now - timedelta(hours=i),
+        ))
+    return simulations
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(name: str, schema, rows: List, repeat: int):
+    adapter = TypeAdapter(List[schema])
+
+    def render(response_class):
+        # What FastAPI does for a response_model route, then the response render
+        content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+        return response_class(content).body
+
+    stdlib_body = render(JSONResponse)
+    orjson_body = render(ORJSONResponse)
+    stdlib = best_of(repeat, lambda: render(JSONResponse))
+    fast = best_of(repeat, lambda: render(ORJSONResponse))
+
+    gz = len(gzip.compress(orjson_body, compresslevel=GZIP_LEVEL))
+    br = len(brotli.compress(orjson_body, quality=BROTLI_QUALITY)) if brotli else None
+
+    print(
+        f"{name:<14} {len(rows):>6} {stdlib * 1000:>10.2f} {fast * 1000:>10.2f} "
+        f"{stdlib / fast:>7.2f}x {len(stdlib_body) / 1024:>9.1f} {len(orjson_body) / 1024:>9.1f} "
+        f"{gz / 1024:>8.1f} {(br / 1024 if br else float('nan')):>8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<14} {'rows':>6} {'json ms':>10} {'orjson ms':>10} {'speedup':>8} "
+          f"{'json KiB':>9} {'orjson KiB':>9} {'gzip KiB':>8} {'br KiB':>8}")
+    for rows in args.rows:
+        bench("/transactions", TransactionOut, make_transactions(rows), args.repeat)
+        bench("/simulations", SimulationOut, make_simulations(rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
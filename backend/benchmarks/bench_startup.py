@@ -0,0 +1,96 @@
+"""
+Benchmark API cold start.
+
+Run from backend/ with the app's environment (DATABASE_URL, SECRET_KEY):
+    python -m benchmarks.bench_startup [--runs 3] [--top 15]
+
+Reports, each in a fresh interpreter:
+  * cumulative import time of app.main and of the heaviest modules it pulls
+    in (python -X importtime), and which heavy subsystems it loaded;
+  * time from spawning `uvicorn app.main:app` to the first 200 from /health.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HEAVY = ("numpy", "pandas", "yfinance", "reportlab", "celery", "pyarrow", "matplotlib")
+
+
+def import_profile():
+    """(total ms, [(cumulative ms, module)] for top-level-ish modules, heavy modules loaded)"""
+    probe = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            modules.append((int(cumulative) / 1000, name.strip()))
+    total = next(ms for ms, name in modules if name == "app.main")
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, modules, loaded
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(timeout: float = 60.0) -> float:
+    port = free_port()
+    env = {**os.environ, "WARMUP_IMPORTS": os.getenv("WARMUP_IMPORTS", "1")}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("/health did not come up")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total, modules, loaded = import_profile()
+    print(f"import app.main: {total:.0f} ms; heavy modules loaded: {', '.join(loaded) or 'none'}")
+    for ms, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    runs = [time_to_healthy() for _ in range(args.runs)]
+    print(
+        f"time to first healthy /health: median {statistics.median(runs) * 1000:.0f} ms "
+        f"(min {min(runs) * 1000:.0f}, max {max(runs) * 1000:.0f}, {args.runs} runs)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark bulk transaction import.
+
+Run from backend/ against a scratch database (tables are created if missing):
+    DATABASE_URL=sqlite:////tmp/import-bench.db python -m benchmarks.bench_transaction_import [--rows 100000]
+
+Generates a CSV in the /reports/transactions/csv layout with a sprinkling
+of invalid rows and loads it with TransactionImporter inside one
+transaction, which is rolled back afterwards.
+"""
+import argparse
+import csv
+import random
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+from app.transaction_import import TransactionImporter
+
+
+def make_csv(rows: int) -> str:
+    rng = random.Random(rows)
+    start = datetime(2015, 1, 1)
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Date", "Symbol", "Type", "Quantity", "Price", "Fees", "Total"])
+    for i in range(rows):
+        quantity = round(rng.uniform(1, 200), 4)
+        price = round(rng.uniform(10, 5000), 2)
+        row = [
+            (start + timedelta(minutes=37 * i)).strftime("%Y-%m-%d"),
+            f"SYM{rng.randint(0, 500):03d}.NS",
+            rng.choice(["buy", "buy", "sell", "dividend"]),
+            quantity, price, 20.0, quantity * price + 20.0,
+        ]
+        if i % 1000 == 999:
+            row[3] = "n/a"  # rejected row
+        writer.writerow(row)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    data = make_csv(args.rows)
+    print(f"CSV: {args.rows} rows, {len(data) / 1024 / 1024:.1f} MiB")
+
+    db = SessionLocal()
+    try:
+        user = User(name="Import Bench", email=f"import-bench-{time.time_ns()}@example.com", password="x")
+        db.add(user)
+        db.flush()
+
+        started = time.perf_counter()
+        result = TransactionImporter.import_csv(db, user.id, StringIO(data))
+        db.flush()
+        elapsed = time.perf_counter() - started
+        print(
+            f"accepted {result['accepted']}, rejected {result['rejected']} "
+            f"in {elapsed:.2f}s ({result['accepted'] / elapsed:,.0f} rows/s)"
+        )
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
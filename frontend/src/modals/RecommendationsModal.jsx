@@ -16,22 +16,47 @@ export default function RecommendationsModal({ open, onClose }) {
   const [recommendations, setRecommendations] = useState([]);
   const [allocation, setAllocation] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const token = localStorage.getItem('token');
 
   const loadData = async () => {
     try {
       const [recRes, allocRes] = await Promise.all([
-        fetch(`${API_BASE}/recommendations`, { headers: { Authorization: `Bearer ${token}` } }),
+        fetch(`${API_BASE}/recommendations?limit=100`, { headers: { Authorization: `Bearer ${token}` } }),
         fetch(`${API_BASE}/recommendations/allocation`, { headers: { Authorization: `Bearer ${token}` } }),
       ]);
-      if (recRes.ok) setRecommendations(await recRes.json());
+      if (recRes.ok) {
+        setRecommendations(await recRes.json());
+        setNextCursor(recRes.headers.get('X-Next-Cursor'));
+      }
       if (allocRes.ok) setAllocation(await allocRes.json());
     } catch (err) {
       console.error(err);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = new URLSearchParams({ limit: '100', cursor: nextCursor });
+      const res = await fetch(`${API_BASE}/recommendations?${params}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (res.ok) {
+        const rows = await res.json();
+        setRecommendations((prev) => [...prev, ...rows]);
+        setNextCursor(res.headers.get('X-Next-Cursor'));
+      }
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const generateRecommendations = async () => {
     setLoading(true);
     try {
@@ -141,6 +166,18 @@ export default function RecommendationsModal({ open, onClose }) {
                   <Typography variant="body2" sx={{ color: '#94a3b8' }}>{rec.recommendation_text}</Typography>
                 </Box>
               ))}
+              {nextCursor && (
+                <Box sx={{ textAlign: 'center' }}>
+                  <Button
+                    variant="outlined"
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    sx={{ borderColor: '#2563eb', color: '#2563eb', textTransform: 'none' }}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </Button>
+                </Box>
+              )}
             </Box>
           )}
         </Paper>
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import Dialog from '@mui/material/Dialog';
 import DialogContent from '@mui/material/DialogContent';
 import Box from '@mui/material/Box';
@@ -16,6 +16,9 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL;
 export default function SimulationsModal({ open, onClose }) {
   const [loading, setLoading] = useState(false);
   const [results, setResults] = useState(null);
+  const [savedSimulations, setSavedSimulations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [currentAmount, setCurrentAmount] = useState('100000');
   const [targetAmount, setTargetAmount] = useState('1000000');
   const [monthlyContribution, setMonthlyContribution] = useState('10000');
@@ -24,6 +27,35 @@ export default function SimulationsModal({ open, onClose }) {
 
   const token = localStorage.getItem('token');
 
+  const loadSaved = async (cursor) => {
+    const params = new URLSearchParams({ limit: '100' });
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE}/simulations?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (res.ok) {
+      const rows = await res.json();
+      setSavedSimulations((prev) => (cursor ? [...prev, ...rows] : rows));
+      setNextCursor(res.headers.get('X-Next-Cursor'));
+    }
+  };
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      await loadSaved(nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    if (open) loadSaved(null).catch((err) => console.error(err));
+  }, [open]);
+
   const runSimulation = async () => {
     setLoading(true);
     try {
@@ -47,6 +79,7 @@ export default function SimulationsModal({ open, onClose }) {
       if (res.ok) {
         const data = await res.json();
         setResults(data.results);
+        setSavedSimulations((prev) => [data, ...prev]);
       }
     } catch (err) {
       console.error(err);
@@ -155,6 +188,40 @@ export default function SimulationsModal({ open, onClose }) {
               )}
             </Paper>
           </Grid>
+
+          <Grid item xs={12}>
+            <Paper sx={{ p: 3, backgroundColor: 'rgba(2, 6, 23, 0.6)', borderRadius: 2 }}>
+              <Typography variant="h6" sx={{ mb: 2, color: 'white' }}>Saved Simulations</Typography>
+              {savedSimulations.length === 0 ? (
+                <Typography sx={{ color: '#94a3b8' }}>No saved simulations yet</Typography>
+              ) : (
+                <Box>
+                  {savedSimulations.map((sim) => (
+                    <Box
+                      key={sim.id}
+                      onClick={() => setResults(sim.results)}
+                      sx={{ p: 2, mb: 1, backgroundColor: '#020617', borderRadius: 2, cursor: 'pointer', display: 'flex', justifyContent: 'space-between' }}
+                    >
+                      <Typography sx={{ color: 'white' }}>{sim.scenario_name}</Typography>
+                      <Typography variant="body2" sx={{ color: '#94a3b8' }}>{new Date(sim.created_at).toLocaleString()}</Typography>
+                    </Box>
+                  ))}
+                  {nextCursor && (
+                    <Box sx={{ textAlign: 'center' }}>
+                      <Button
+                        variant="outlined"
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        sx={{ borderColor: '#2563eb', color: '#2563eb', textTransform: 'none' }}
+                      >
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                      </Button>
+                    </Box>
+                  )}
+                </Box>
+              )}
+            </Paper>
+          </Grid>
         </Grid>
       </DialogContent>
     </Dialog>
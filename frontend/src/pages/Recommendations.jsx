@@ -15,19 +15,27 @@ export default function Recommendations() {
   const [allocation, setAllocation] = useState(null);
   const [loading, setLoading] = useState(false);
   const [generating, setGenerating] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const token = localStorage.getItem('token');
 
+  const fetchPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: '100' });
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE}/recommendations?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error(`Failed to load recommendations (${res.status})`);
+    return { rows: await res.json(), next: res.headers.get('X-Next-Cursor') };
+  };
+
   const loadRecommendations = async () => {
     setLoading(true);
     try {
-      const res = await fetch(`${API_BASE}/recommendations`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (res.ok) {
-        const data = await res.json();
-        setRecommendations(data);
-      }
+      const { rows, next } = await fetchPage(null);
+      setRecommendations(rows);
+      setNextCursor(next);
     } catch (err) {
       console.error(err);
     } finally {
@@ -35,6 +43,20 @@ export default function Recommendations() {
     }
   };
 
+  const loadMoreRecommendations = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const { rows, next } = await fetchPage(nextCursor);
+      setRecommendations((prev) => [...prev, ...rows]);
+      setNextCursor(next);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadAllocationRecommendation = async () => {
     try {
       const res = await fetch(`${API_BASE}/recommendations/allocation`, {
@@ -77,6 +99,7 @@ export default function Recommendations() {
       
       if (res.ok) {
         setRecommendations([]);
+        setNextCursor(null);
         setAllocation(null);
         alert('Recommendations cleared successfully');
       }
@@ -298,6 +321,18 @@ export default function Recommendations() {
                     </Typography>
                   </Box>
                 ))}
+                {nextCursor && (
+                  <Box sx={{ textAlign: 'center', mt: 1 }}>
+                    <Button
+                      variant="outlined"
+                      onClick={loadMoreRecommendations}
+                      disabled={loadingMore}
+                      sx={{ borderColor: '#2563eb', color: '#2563eb', borderRadius: 2, px: 3 }}
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </Button>
+                  </Box>
+                )}
               </Box>
             )}
           </Paper>
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import Box from '@mui/material/Box';
 import Grid from '@mui/material/Grid';
 import Paper from '@mui/material/Paper';
@@ -15,6 +15,9 @@ export default function Simulations() {
   const [tab, setTab] = useState(0);
   const [loading, setLoading] = useState(false);
   const [results, setResults] = useState(null);
+  const [savedSimulations, setSavedSimulations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Goal Achievement Form
   const [currentAmount, setCurrentAmount] = useState('100000');
@@ -25,6 +28,44 @@ export default function Simulations() {
 
   const token = localStorage.getItem('token');
 
+  const fetchSavedPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: '100' });
+    if (cursor) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE}/simulations?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error(`Failed to load simulations (${res.status})`);
+    return { rows: await res.json(), next: res.headers.get('X-Next-Cursor') };
+  };
+
+  const loadSavedSimulations = async () => {
+    try {
+      const { rows, next } = await fetchSavedPage(null);
+      setSavedSimulations(rows);
+      setNextCursor(next);
+    } catch (err) {
+      console.error(err);
+    }
+  };
+
+  const loadMoreSimulations = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const { rows, next } = await fetchSavedPage(nextCursor);
+      setSavedSimulations((prev) => [...prev, ...rows]);
+      setNextCursor(next);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    loadSavedSimulations();
+  }, []);
+
   const runGoalSimulation = async () => {
     setLoading(true);
     try {
@@ -49,6 +90,7 @@ export default function Simulations() {
       if (res.ok) {
         const data = await res.json();
         setResults(data.results);
+        setSavedSimulations((prev) => [data, ...prev]);
       }
     } catch (err) {
       console.error(err);
@@ -436,6 +478,59 @@ export default function Simulations() {
             )}
           </Paper>
         </Grid>
+
+        {/* Saved goal simulations, newest first */}
+        <Grid item xs={12}>
+          <Paper sx={{ p: 3, backgroundColor: '#0b1220', borderRadius: 3 }}>
+            <Typography variant="h6" sx={{ mb: 2 }}>
+              Saved Simulations
+            </Typography>
+            {savedSimulations.length === 0 ? (
+              <Typography color="text.secondary">No saved simulations yet</Typography>
+            ) : (
+              <Box>
+                {savedSimulations.map((sim) => (
+                  <Box
+                    key={sim.id}
+                    sx={{
+                      p: 2,
+                      mb: 1,
+                      backgroundColor: '#020617',
+                      borderRadius: 2,
+                      display: 'flex',
+                      justifyContent: 'space-between',
+                      alignItems: 'center',
+                    }}
+                  >
+                    <Box>
+                      <Typography fontWeight={600}>{sim.scenario_name}</Typography>
+                      <Typography variant="caption" color="text.secondary">
+                        {new Date(sim.created_at).toLocaleString()}
+                      </Typography>
+                    </Box>
+                    {sim.results?.future_value != null && (
+                      <Typography fontWeight={700} color={sim.results.goal_achievable ? '#10b981' : '#ef4444'}>
+                        ₹{Number(sim.results.future_value).toLocaleString()}
+                      </Typography>
+                    )}
+                  </Box>
+                ))}
+                {nextCursor && (
+                  <Box sx={{ textAlign: 'center', mt: 2 }}>
+                    <Button
+                      variant="outlined"
+                      onClick={loadMoreSimulations}
+                      disabled={loadingMore}
+                      sx={{ borderColor: '#3b82f6', color: '#3b82f6', textTransform: 'none' }}
+                    >
+                      {loadingMore ? 'Loading...' : 'Load more'}
+                    </Button>
+                  </Box>
+                )}
+              </Box>
+            )}
+          </Paper>
+        </Grid>
       </Grid>
     </Box>
   );
@@ -21,6 +21,8 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL;
 export default function Transactions() {
   const [transactions, setTransactions] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // Form states
   const [symbol, setSymbol] = useState("");
@@ -31,16 +33,23 @@ export default function Transactions() {
 
   const token = localStorage.getItem("token");
 
+  const fetchPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: "100" });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${API_BASE}/transactions?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error(`Failed to load transactions (${res.status})`);
+    return { rows: await res.json(), next: res.headers.get("X-Next-Cursor") };
+  };
+
+  // The API pages newest-first; the first page replaces the list
   const loadTransactions = async () => {
     setLoading(true);
     try {
-      const res = await fetch(`${API_BASE}/transactions`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (res.ok) {
-        const data = await res.json();
-        setTransactions(data);
-      }
+      const { rows, next } = await fetchPage(null);
+      setTransactions(rows);
+      setNextCursor(next);
     } catch (err) {
       console.error(err);
     } finally {
@@ -48,6 +57,20 @@ export default function Transactions() {
     }
   };
 
+  const loadMoreTransactions = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const { rows, next } = await fetchPage(nextCursor);
+      setTransactions((prev) => [...prev, ...rows]);
+      setNextCursor(next);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadTransactions();
   }, []);
@@ -319,7 +342,7 @@ const formatDate = (dateString) => {
             <Box sx={{ display: 'flex', alignItems: 'center', gap: 2, mb: 3 }}>
               <AccountBalanceWalletIcon sx={{ color: '#3b82f6', fontSize: 32 }} />
               <Typography variant="h5" sx={{ color: 'white', fontWeight: 600 }}>
-                {transactions.length} {transactions.length === 1 ? 'Transaction' : 'Transactions'}
+                {transactions.length}{nextCursor ? '+' : ''} {transactions.length === 1 && !nextCursor ? 'Transaction' : 'Transactions'}
               </Typography>
             </Box>
 
@@ -445,6 +468,25 @@ const formatDate = (dateString) => {
                 })}
               </Grid>
             )}
+
+            {nextCursor && transactions.length > 0 && (
+              <Box sx={{ textAlign: 'center', mt: 3 }}>
+                <Button
+                  variant="outlined"
+                  onClick={loadMoreTransactions}
+                  disabled={loadingMore}
+                  startIcon={loadingMore ? <CircularProgress size={16} sx={{ color: '#3b82f6' }} /> : null}
+                  sx={{
+                    color: '#3b82f6',
+                    borderColor: '#3b82f6',
+                    textTransform: 'none',
+                    fontWeight: 600,
+                  }}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              </Box>
+            )}
           </Paper>
         </Grid>
       </Grid>